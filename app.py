@@ -6,10 +6,27 @@ import plotly.graph_objects as go
 
 sys.path.insert(0, str(Path(__file__).resolve().parent))
 
-from dashboard_code.read_csv import (
-	df, df_final_sorted, conteo_operador, conteo_tecnologia, porcentaje_tecnologia,
-	df_top, corr_matrix, df_cob_max_depto_4g, counties, df_comparativo
-)
+from dashboard_code.config import MOTOR, VARIANTE_GEOMETRIA
+from dashboard_code.read_csv import datos_actuales, filtrar_datos, nodos_filtrado, precalcular
+
+# Nodo que responde cada tipo de consulta (conteos y sumas, CPOB distintos, cuantiles y
+# correlación): cubo y resúmenes en memoria, o SQL sobre DuckDB para todas
+CONSULTAS = ['cubo', 'distintos', 'cuantiles', 'momentos']
+NODOS_CONSULTA = {consulta: 'motor_duckdb' if MOTOR == 'duckdb' else consulta for consulta in CONSULTAS}
+
+# DataFrames que usa el dashboard; se calculan juntos (en paralelo si COBERTURA_TRABAJADORES > 1)
+# y los intermedios (los hechos, el agregado del plan...) no se conservan. La tabla de registros
+# filtrados usa el DataFrame base y su índice de bitmaps (o lee las particiones de una base particionada)
+NODOS_APP = [
+	*nodos_filtrado(), 'opciones_sidebar', 'df_final_sorted', 'conteo_operador', 'conteo_tecnologia',
+	'porcentaje_tecnologia', 'df_top', 'df_cob_max_depto_4g', 'df_comparativo', 'dimensiones',
+	*dict.fromkeys(NODOS_CONSULTA.values())
+]
+precalcular(NODOS_APP)
+
+from dashboard_code.operadores import OPERADORES, PREFIJO_AREA
+from dashboard_code.resultados import clave_resultado
+from dashboard_code.geometria import ErrorGeometria, cargar as cargar_geometria
 from components.header import render_header
 from components.footer import render_footer
 from components.stat_card import stat_card
@@ -43,8 +60,22 @@ def main():
 	st.set_page_config(page_title="Dashboard Cobertura Móvil Colombia", layout="wide")
 	load_css()
 	
+	# Versión de los datos de esta ejecución: si una recarga publica otra versión
+	# mientras tanto, esta ejecución termina con la que tomó aquí
+	datos = datos_actuales()
+	opciones_sidebar, df_final_sorted, conteo_operador, conteo_tecnologia, porcentaje_tecnologia = (
+		datos.obtener(nombre) for nombre in
+		['opciones_sidebar', 'df_final_sorted', 'conteo_operador', 'conteo_tecnologia', 'porcentaje_tecnologia']
+	)
+	df_top, df_cob_max_depto_4g, df_comparativo, estrella = (
+		datos.obtener(nombre) for nombre in
+		['df_top', 'df_cob_max_depto_4g', 'df_comparativo', 'dimensiones']
+	)
+	# Con el motor DuckDB el mismo nodo responde todas las consultas
+	cubo, distintos, cuantiles, momentos = (datos.obtener(NODOS_CONSULTA[consulta]) for consulta in CONSULTAS)
+	
 	# Renderizar sidebar y obtener filtros
-	filtros = render_sidebar(df)
+	filtros = render_sidebar(opciones_sidebar)
 	ano_seleccionado = filtros['ano']
 	trimestre_seleccionado = filtros['trimestre']
 	departamento_seleccionado = filtros['departamentos']
@@ -53,53 +84,39 @@ def main():
 	st.markdown('<div id="header"></div>', unsafe_allow_html=True)
 	render_header()
 	
-	# Aplicar filtros a los datos
-	df_filtrado_base = df.copy()
-	
-	if ano_seleccionado != "Todos":
-		df_filtrado_base = df_filtrado_base[df_filtrado_base['ANNO'] == ano_seleccionado]
-	
-	if trimestre_seleccionado != "Todos":
-		df_filtrado_base = df_filtrado_base[df_filtrado_base['TRIMESTRE'] == trimestre_seleccionado]
-	
-	if departamento_seleccionado:
-		df_filtrado_base = df_filtrado_base[df_filtrado_base['DEPARTAMENTO'].isin(departamento_seleccionado)]
+	# Filtros del sidebar como llaves del cubo: filtros_cubo_base (año, trimestre y
+	# departamentos) y filtros_cubo (además tecnologías). Conteos y sumas salen del
+	# cubo y los CPOB distintos de la unión de los resúmenes por celda.
+	filtros_cubo_base = cubo.filtros_sidebar(
+		None if ano_seleccionado == "Todos" else ano_seleccionado,
+		None if trimestre_seleccionado == "Todos" else trimestre_seleccionado,
+		departamento_seleccionado
+	)
+	filtros_cubo = dict(filtros_cubo_base, **cubo.filtros_sidebar(tecnologias=tecnologia_seleccionada))
 	
-	# Recalcular estadísticas con los datos filtrados
-	if len(df_filtrado_base) > 0:
-		total_filtrado = (
-			df_filtrado_base[['DEPARTAMENTO', 'CPOB']]
-			.drop_duplicates()
-			.groupby('DEPARTAMENTO')
-			.size()
-			.reset_index(name='NUM_CPOB')
-		)
+	# Recalcular estadísticas con los datos filtrados (por código DIVIPOLA; los nombres se unen al final)
+	if cubo.totales(filtros_cubo_base)['FILAS'] > 0:
+		total_filtrado = distintos.contar(['ID_DEPARTAMENTO'], filtros_cubo_base, 'NUM_CPOB')
 		
-		con_internet_filtrado = (
-			df_filtrado_base[df_filtrado_base['TECNOLOGIA'].isin(['2G', '3G', '4G', '5G'])]
-			[['DEPARTAMENTO', 'CPOB']]
-			.drop_duplicates()
-			.groupby('DEPARTAMENTO')
-			.size()
-			.reset_index(name='CPOB_CON_INTERNET')
+		con_internet_filtrado = distintos.contar(
+			['ID_DEPARTAMENTO'],
+			dict(filtros_cubo_base, **cubo.filtros_sidebar(tecnologias=['2G', '3G', '4G', '5G'])),
+			'CPOB_CON_INTERNET'
 		)
 		
-		df_final_filtrado = total_filtrado.merge(con_internet_filtrado, on='DEPARTAMENTO', how='left')
+		df_final_filtrado = total_filtrado.merge(con_internet_filtrado, on='ID_DEPARTAMENTO', how='left')
 		df_final_filtrado['CPOB_SIN_INTERNET'] = df_final_filtrado['NUM_CPOB'] - df_final_filtrado['CPOB_CON_INTERNET'].fillna(0)
-		df_final_filtrado = df_final_filtrado.sort_values(by='CPOB_SIN_INTERNET', ascending=False)
+		df_final_filtrado = estrella.con_nombres(df_final_filtrado.sort_values(by='CPOB_SIN_INTERNET', ascending=False))
 	else:
 		df_final_filtrado = df_final_sorted
 		st.warning("No hay datos disponibles con los filtros seleccionados")
 	
-	df_filtrado = df_filtrado_base.copy()
-	if tecnologia_seleccionada:
-		df_filtrado = df_filtrado[df_filtrado['TECNOLOGIA'].isin(tecnologia_seleccionada)]
 	st.markdown('<div id="statistics"></div>', unsafe_allow_html=True)
 	
 	# Calcular métricas
-	total_registros = len(df_filtrado)
-	total_departamentos = df_filtrado['DEPARTAMENTO'].nunique()
-	total_cpob = df_filtrado['CPOB'].nunique()
+	total_registros = int(cubo.totales(filtros_cubo)['FILAS'])
+	total_departamentos = len(cubo.consultar(['ID_DEPARTAMENTO'], filtros_cubo, medidas=['FILAS']))
+	total_cpob = distintos.contar((), filtros_cubo)
 	
 	st.markdown('<div style="margin-bottom: 2rem;"></div>', unsafe_allow_html=True)
     # foto encabezado referencia 
@@ -117,7 +134,16 @@ def main():
 
 	st.markdown('<div style="margin: 0rem 0 2rem 0;"></div>', unsafe_allow_html=True)
 	st.markdown('<div id="charts"></div>', unsafe_allow_html=True)
-	tabla_html = df.head(100).to_html(index=False, border=0, classes='df-table')
+	# Primeros registros de la selección del sidebar, resueltos con el índice de bitmaps
+	df_seleccion = filtrar_datos(
+		datos,
+		None if ano_seleccionado == "Todos" else ano_seleccionado,
+		None if trimestre_seleccionado == "Todos" else trimestre_seleccionado,
+		departamento_seleccionado,
+		tecnologia_seleccionada,
+		limite=100
+	)
+	tabla_html = df_seleccion.to_html(index=False, border=0, classes='df-table')
 
 	st.markdown(
 			f"""
@@ -125,7 +151,7 @@ def main():
 			  <div style="font-weight:600;">Conjunto de datos obtenidos del Portal de Datos Abiertos del Gobierno Nacional de Colombia</div>
 			  <div style="font-size:12px; color:#666; margin-bottom:8px;">Disponible en: https://www.datos.gov.co/dataset/Cobertura-de-servicios-m-viles/hid4-zp69/about_data</div>
 			  <details style="margin-top:8px; text-align:left;">
-			    <summary style="cursor:pointer; font-weight:600;">Ver conjunto de datos completo</summary>
+			    <summary style="cursor:pointer; font-weight:600;">Ver registros de los filtros seleccionados</summary>
 			    <div style="margin-top:10px; overflow:auto; max-height:340px;">
 			      <style>
 			        .df-table {{ width:100%; border-collapse:collapse; font-size:13px; }}
@@ -140,16 +166,21 @@ def main():
 			unsafe_allow_html=True
 		)
 	# --- GRÁFICO 1: Distribución de Tecnologías en Top Departamentos ---
-	def preprocesar_top_departamentos(datos):
-		df_top_filtrado = datos[datos['DEPARTAMENTO'].isin(df_top['DEPARTAMENTO'].unique())]
-		# Aplicar filtro de tecnologías si está seleccionado
-		if tecnologia_seleccionada:
-			df_top_filtrado = df_top_filtrado[df_top_filtrado['TECNOLOGIA'].isin(tecnologia_seleccionada)]
-		return df_top_filtrado.groupby(['DEPARTAMENTO', 'TECNOLOGIA']).size().reset_index(name='CANTIDAD')
+	def preprocesar_top_departamentos(cubo):
+		# Conteo por departamento y tecnología desde el cubo, solo para los top departamentos
+		top_deptos = df_top['ID_DEPARTAMENTO'].unique()
+		if 'ID_DEPARTAMENTO' in filtros_cubo:
+			top_deptos = top_deptos[pd.Index(top_deptos).isin(filtros_cubo['ID_DEPARTAMENTO'])]
+		conteo = cubo.consultar(
+			['ID_DEPARTAMENTO', 'ID_TECNOLOGIA'],
+			dict(filtros_cubo, ID_DEPARTAMENTO=top_deptos),
+			medidas=['FILAS']
+		)
+		return estrella.con_nombres(conteo.rename(columns={'FILAS': 'CANTIDAD'}))
 	
 	grafico_generico(
 		tipo="bar",
-		datos=df_filtrado,
+		datos=cubo,
 		titulo="                                                      Distribución de Tecnologías por Departamento",
 		x="DEPARTAMENTO",
 		y="CANTIDAD",
@@ -159,6 +190,8 @@ def main():
 		height=600,
 		preprocesar=preprocesar_top_departamentos,
 		key="grafico_1_tecnologias",
+		cache_figura=True,
+		cache_clave=clave_resultado(datos.version, "grafico_1_tecnologias", filtros_cubo),
 		layout_updates={
 			'xaxis_tickangle': -45,
 			'margin': dict(l=60, r=60, t=80, b=120),
@@ -233,21 +266,17 @@ def main():
 	col1, col2 = st.columns([2, 3], gap="medium")
 	
 	with col1:
-		def preprocesar_operadores(datos):
+		def preprocesar_operadores(cubo):
+			totales = cubo.totales(filtros_cubo)
 			df_agg = pd.DataFrame({
-				'OPERADOR': ['CLARO', 'MOVISTAR', 'TIGO', 'WOM'],
-				'AREA_TOTAL': [
-					datos['AREA_COB_CLARO'].sum(),
-					datos['AREA_COB_MOVISTAR'].sum(),
-					datos['AREA_COB_TIGO'].sum(),
-					datos['AREA_COB_WOM'].sum()
-				]
+				'OPERADOR': OPERADORES,
+				'AREA_TOTAL': [totales[PREFIJO_AREA + operador] for operador in OPERADORES]
 			})
 			return df_agg
 		
 		grafico_generico(
 			tipo="bar",
-			datos=df_filtrado,
+			datos=cubo,
 			titulo="<br> Área Total de Cobertura por Operador",
 			x="OPERADOR",
 		y="AREA_TOTAL",
@@ -255,6 +284,8 @@ def main():
 			preprocesar=preprocesar_operadores,
 			height=610,
 		key="grafico_operadores",
+		cache_figura=True,
+		cache_clave=clave_resultado(datos.version, "grafico_operadores", filtros_cubo),
 		color_discrete_map=COLOR_OPERADORES
 	)
 	
@@ -277,6 +308,7 @@ def main():
             color_discrete_map=COLOR_TECNOLOGIAS,
             height=610,
             key="grafico_3_cpob_tecnologia",
+            cache_figura=True,
             custom_data=['PORCENTAJE'],
             trace_updates={
                 'texttemplate': '%{text}<br>(%{customdata[0]:.1f}%)',
@@ -311,6 +343,7 @@ def main():
 			y="CANTIDAD",
 			height=550,
 			key="grafico_5_operador_predominancia",
+			cache_figura=True,
 			hole=0.3,
 			color_discrete_map=COLOR_OPERADORES,
 			layout_updates={
@@ -335,14 +368,27 @@ def main():
 	
 	with col_b:
 		# --- GRÁFICO 5: Departamentos sin Cobertura ---
-		def preprocesar_sin_cobertura(datos):
-			# Recalcular con datos filtrados
-			df_sin_tec = datos[datos['TECNOLOGIA'] == 'Ninguna'].groupby(['ANNO', 'DEPARTAMENTO'])['CPOB'].nunique().reset_index(name='NUM_CPOB_SIN_TEC')
-			return df_sin_tec.nlargest(20, 'NUM_CPOB_SIN_TEC')
+		def preprocesar_sin_cobertura(distintos):
+			# CPOB distintos sin tecnología por año y departamento con los filtros del sidebar
+			periodo = estrella.dimensiones['periodo']
+			sin_tecnologia = cubo.filtros_sidebar(tecnologias=['Ninguna'])
+			por_anno = []
+			for anno, periodos_anno in periodo.groupby('ANNO', observed=True).groups.items():
+				if 'ID_PERIODO' in filtros_cubo_base:
+					periodos_anno = periodos_anno[periodos_anno.isin(filtros_cubo_base['ID_PERIODO'])]
+				conteo = distintos.contar(
+					['ID_DEPARTAMENTO'],
+					dict(filtros_cubo_base, ID_PERIODO=periodos_anno, **sin_tecnologia),
+					'NUM_CPOB_SIN_TEC'
+				)
+				conteo.insert(0, 'ANNO', anno)
+				por_anno.append(conteo)
+			df_sin_tec = pd.concat(por_anno, ignore_index=True)
+			return estrella.con_nombres(df_sin_tec.nlargest(20, 'NUM_CPOB_SIN_TEC'))
 		
 		grafico_generico(
 			tipo="bar",
-			datos=df_filtrado_base,
+			datos=distintos,
 			titulo="Departamentos con Más Cabeceras sin Cobertura Móvil",
 			x="DEPARTAMENTO",
 			y="NUM_CPOB_SIN_TEC",
@@ -352,6 +398,8 @@ def main():
 			barmode="group",
 			preprocesar=preprocesar_sin_cobertura,
 			key="grafico_6_sin_cobertura",
+			cache_figura=True,
+			cache_clave=clave_resultado(datos.version, "grafico_6_sin_cobertura", filtros_cubo_base),
 			layout_updates={
 				'xaxis_tickangle': -45,
 				'margin': dict(l=80, r=80, t=100, b=150),
@@ -376,13 +424,20 @@ def main():
 	
 	with col_x:
 		# --- GRÁFICO 6: Mapa de Correlación ---
-		# Usar corr_matrix precalculada que incluye AREA_CPOB y las 4 áreas de operadores
+		# Correlación de AREA_CPOB y las 4 áreas de operadores con los filtros del sidebar,
+		# armada uniendo los estadísticos suficientes de las celdas seleccionadas
+		def preprocesar_correlacion(momentos):
+			return momentos.correlacion(filtros_cubo)
+		
 		grafico_generico(
 			tipo="heatmap",
-		datos=corr_matrix,
+		datos=momentos,
+		preprocesar=preprocesar_correlacion,
 		titulo="     Mapa de Correlación entre Áreas de Cobertura",
 		height=550,
 		key="grafico_7_correlacion",
+		cache_figura=True,
+		cache_clave=clave_resultado(datos.version, "grafico_7_correlacion", filtros_cubo),
 			text_auto='.2f',
 			color_continuous_scale='RdBu_r',
 			layout_updates={
@@ -411,6 +466,8 @@ def main():
 		height=550,
 		preprocesar=preprocesar_top10_sin_cobertura,
 			key="grafico_9_top10_sin_cobertura",
+			cache_figura=True,
+			cache_clave=clave_resultado(datos.version, "grafico_9_top10_sin_cobertura", filtros_cubo_base),
 			color_continuous_scale='Reds',
 			layout_updates={
 				'xaxis_tickangle': -45,
@@ -420,28 +477,60 @@ def main():
 			}
 		)
 	
+	# --- GRÁFICO DISTRIBUCIÓN: Mediana y rango p10-p90 del % de cobertura por CPOB ---
+	st.markdown('<div id="distribucion"></div>', unsafe_allow_html=True)
+	def preprocesar_distribucion(cuantiles):
+		# Cuantiles de la unión de los histogramas de las celdas filtradas
+		df_cuantiles = estrella.con_nombres(cuantiles.cuantiles(['ID_DEPARTAMENTO'], filtros_cubo))
+		df_cuantiles['ERROR_SUPERIOR'] = df_cuantiles['P90'] - df_cuantiles['P50']
+		df_cuantiles['ERROR_INFERIOR'] = df_cuantiles['P50'] - df_cuantiles['P10']
+		return df_cuantiles.round(1)
+
+	grafico_generico(
+		tipo="bar",
+		datos=cuantiles,
+		titulo="Distribución del Porcentaje de Cobertura por CPOB (mediana y rango p10-p90)",
+		x="DEPARTAMENTO",
+		y="P50",
+		color="OPERADOR",
+		labels={'P50': 'Mediana de cobertura del CPOB (%)', 'DEPARTAMENTO': 'Departamento'},
+		color_discrete_map=COLOR_OPERADORES,
+		height=600,
+		barmode="group",
+		preprocesar=preprocesar_distribucion,
+		key="grafico_distribucion_cobertura",
+		cache_figura=True,
+		cache_clave=clave_resultado(datos.version, "grafico_distribucion_cobertura", filtros_cubo),
+		error_y='ERROR_SUPERIOR',
+		error_y_minus='ERROR_INFERIOR',
+		hover_data={'P10': True, 'P90': True, 'N': True, 'ERROR_SUPERIOR': False, 'ERROR_INFERIOR': False},
+		layout_updates={
+			'xaxis_tickangle': -45,
+			'margin': dict(l=60, r=60, t=80, b=120),
+			'xaxis': dict(tickfont=dict(size=11)),
+			'yaxis': dict(tickfont=dict(size=11), range=[0, 105])
+		}
+	)
+
 	# --- GRÁFICO 7: Evolución Temporal con Tabs por Operador ---
 	st.markdown('<div id="evolucion"></div>', unsafe_allow_html=True)
-	tab1, tab2, tab3, tab4 = st.tabs(["CLARO", "MOVISTAR", "TIGO", "WOM"])
+	tabs = st.tabs(OPERADORES)
 	
-	operadores_tabs = ["CLARO", "MOVISTAR", "TIGO", "WOM"]
-	tabs = [tab1, tab2, tab3, tab4]
-	
-	for tab, operador in zip(tabs, operadores_tabs):
+	for tab, operador in zip(tabs, OPERADORES):
 		with tab:
-			def preprocesar_operador_temporal(datos):
-				# Recalcular con datos filtrados
-				df_grouped = datos.groupby(['ANNO', 'TRIMESTRE', 'TECNOLOGIA']).agg({
-					f'AREA_COB_{operador}': 'sum'
-				}).reset_index()
-				df_grouped['PERIODO'] = df_grouped['ANNO'] + '-T' + df_grouped['TRIMESTRE']
+			def preprocesar_operador_temporal(cubo):
+				# Recalcular con los filtros del sidebar (sin el de tecnologías) desde el cubo
+				df_grouped = estrella.con_nombres(cubo.consultar(
+					['ID_PERIODO', 'ID_TECNOLOGIA'], filtros_cubo_base, medidas=[f'AREA_COB_{operador}']
+				))
+				df_grouped['PERIODO'] = df_grouped['ANNO'].astype(str) + '-T' + df_grouped['TRIMESTRE'].astype(str)
 				df_grouped['OPERADOR'] = operador
 				df_grouped['AREA_COBERTURA'] = df_grouped[f'AREA_COB_{operador}']
 				return df_grouped[['PERIODO', 'TECNOLOGIA', 'OPERADOR', 'AREA_COBERTURA']]
 			
 			grafico_generico(
 				tipo="line",
-				datos=df_filtrado_base,
+				datos=cubo,
 				titulo=f'Evolución Temporal de {operador} por Tecnología',
 				x='PERIODO',
 				y='AREA_COBERTURA',
@@ -452,6 +541,8 @@ def main():
 			markers=True,
 				preprocesar=preprocesar_operador_temporal,
 				key=f"grafico_8_{operador.lower()}_temporal",
+				cache_figura=True,
+				cache_clave=clave_resultado(datos.version, f"grafico_8_{operador.lower()}_temporal", filtros_cubo_base),
 				layout_updates={
 					'margin': dict(l=60, r=60, t=80, b=80),
 					'font': dict(size=11),
@@ -463,14 +554,16 @@ def main():
 	
 	# --- GRÁFICO 9: Mapas Coropléticos de Cobertura 4G por Operador ---
 	st.markdown('<div id="mapas"></div>', unsafe_allow_html=True)
+	# Las geometrías se cargan del almacén local solo al llegar a esta sección
+	try:
+		counties = cargar_geometria(VARIANTE_GEOMETRIA)
+	except ErrorGeometria as e:
+		counties = None
+		st.warning(f"No se pudieron cargar las geometrías de los departamentos: {e}")
 	if counties is not None:
-		tab_claro, tab_movistar, tab_tigo, tab_wom = st.tabs(["CLARO", "MOVISTAR", "TIGO", "WOM"])
-		
 		operadores_mapa = [
-			("CLARO", "PCT_MAX_PROMEDIO_CLARO", tab_claro, COLOR_OPERADORES['CLARO']),
-			("MOVISTAR", "PCT_MAX_PROMEDIO_MOVISTAR", tab_movistar, COLOR_OPERADORES['MOVISTAR']),
-			("TIGO", "PCT_MAX_PROMEDIO_TIGO", tab_tigo, COLOR_OPERADORES['TIGO']),
-			("WOM", "PCT_MAX_PROMEDIO_WOM", tab_wom, COLOR_OPERADORES['WOM'])
+			(operador, f"PCT_MAX_PROMEDIO_{operador}", tab, COLOR_OPERADORES.get(operador, COLOR_OPERADORES['OTRO']))
+			for operador, tab in zip(OPERADORES, st.tabs(OPERADORES))
 		]
 		
 		for operador, columna, tab, color in operadores_mapa:
@@ -481,6 +574,7 @@ def main():
 					titulo=f"Cobertura 4G Máxima Promedio de {operador}",
 					height=700,
 					key=f"grafico_10_mapa_{operador.lower()}",
+					cache_figura=True,
 					geojson=counties,
 					locations=df_cob_max_depto_4g['DEPARTAMENTO'],
 					z=df_cob_max_depto_4g[columna],
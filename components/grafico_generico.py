@@ -2,6 +2,14 @@ import streamlit as st
 import plotly.express as px
 import plotly.graph_objects as go
 
+from dashboard_code.config import PUNTOS_MAXIMOS
+from dashboard_code.figuras import compactar
+from dashboard_code.muestreo import binear, reducir_series
+from dashboard_code.resultados import FIGURAS, RESULTADOS, clave_figura
+
+# Argumentos de px.histogram con los que el histograma se puede calcular en el servidor
+ARGUMENTOS_HISTOGRAMA_SERVIDOR = {'nbins', 'histnorm', 'color_discrete_map', 'color_discrete_sequence', 'opacity'}
+
 def grafico_generico(
 	tipo="bar",
 	datos=None,
@@ -20,6 +28,9 @@ def grafico_generico(
 	barmode=None,
 	text=None,
 	hover_template=None,
+	cache_clave=None,
+	cache_figura=False,
+	puntos_maximos=PUNTOS_MAXIMOS,
 	**kwargs
 ):
 	"""
@@ -43,6 +54,9 @@ def grafico_generico(
 	- barmode: str - Modo de barras ('group', 'stack', etc.)
 	- text: str - Columna para mostrar como texto en el gráfico
 	- hover_template: str - Template personalizado para el hover
+	- cache_clave: ClaveResultado - Si se indica, el resultado de preprocesar se guarda en la caché compartida entre sesiones (ver dashboard_code/resultados.py)
+	- cache_figura: bool - Si es True la figura terminada se guarda en la caché de figuras y se reutiliza con los mismos datos y argumentos
+	- puntos_maximos: int - Con más filas, los histogramas se calculan en el servidor, las líneas y áreas se submuestrean con LTTB y la dispersión usa WebGL (0 lo desactiva; ver dashboard_code/muestreo.py)
 	- **kwargs: Argumentos adicionales para el gráfico específico
 	"""
 	
@@ -52,7 +66,80 @@ def grafico_generico(
 	
 	# Preprocesar datos si se proporciona una función
 	if preprocesar:
-		datos = preprocesar(datos)
+		if cache_clave is not None:
+			entrada = datos
+			datos = RESULTADOS.obtener_o_calcular(cache_clave, lambda: preprocesar(entrada))
+		else:
+			datos = preprocesar(datos)
+	
+	# Argumentos que definen la figura (width y key solo afectan cómo se dibuja)
+	argumentos = dict(
+		titulo=titulo, x=x, y=y, color=color, labels=labels, template=template,
+		category_orders=category_orders, height=height, orientation=orientation,
+		barmode=barmode, text=text, hover_template=hover_template,
+		puntos_maximos=puntos_maximos, **kwargs
+	)
+	# La figura se compacta (ver dashboard_code/figuras.py) antes de guardarla y de enviarla
+	construir = lambda: compactar(construir_figura(tipo, datos, **argumentos), key)
+	if cache_figura and tipo != "custom":
+		# Con los mismos datos y argumentos se reutiliza la figura ya construida y validada
+		clave = clave_figura(tipo, datos, argumentos, cache_clave if preprocesar else None)
+		fig = FIGURAS.obtener_o_calcular(clave, construir)
+	else:
+		fig = construir()
+	if fig is None:
+		return
+	
+	# Aplicar estilos de card con CSS
+	st.markdown("""
+		<style>
+		.stPlotlyChart {
+			background: white;
+			padding: 15px;
+			border-radius: 12px;
+			box-shadow: 0 2px 8px rgba(0, 0, 0, 0.1);
+		}
+		</style>
+	""", unsafe_allow_html=True)
+	
+	st.plotly_chart(
+		fig, 
+		width=width, 
+		key=key,
+		config={'displayModeBar': True}
+	)
+	
+	# Indicar cuántos puntos llegan al navegador cuando la serie se redujo
+	meta = fig.layout.meta
+	if isinstance(meta, dict) and 'puntos_enviados' in meta:
+		st.caption(
+			f"Puntos enviados: {meta['puntos_enviados']:,} de {meta['puntos_originales']:,} ({meta['reduccion']})"
+		)
+	
+
+
+def construir_figura(
+	tipo,
+	datos,
+	titulo=None,
+	x=None,
+	y=None,
+	color=None,
+	labels=None,
+	template="plotly_white",
+	category_orders=None,
+	height=None,
+	orientation=None,
+	barmode=None,
+	text=None,
+	hover_template=None,
+	puntos_maximos=PUNTOS_MAXIMOS,
+	**kwargs
+):
+	"""
+	Construye la figura de Plotly de grafico_generico sin dibujarla (mismos
+	parámetros). Retorna None si el tipo de gráfico no es válido.
+	"""
 	
 	# Extraer layout_updates y trace_updates antes de crear el gráfico
 	layout_updates = kwargs.pop('layout_updates', {})
@@ -62,6 +149,9 @@ def grafico_generico(
 	
 	# Crear el gráfico según el tipo
 	fig = None
+	# Puntos enviados y originales cuando la serie se reduce (se muestran bajo el gráfico)
+	meta = None
+	excede = tipo in ("histogram", "line", "scatter", "area") and bool(puntos_maximos) and len(datos) > puntos_maximos
 	
 	if tipo == "bar":
 		# Extraer color_discrete_map de kwargs si existe
@@ -87,17 +177,43 @@ def grafico_generico(
 		)
 	
 	elif tipo == "histogram":
-		fig = px.histogram(
-			datos,
-			x=x,
-			color=color,
-			category_orders=category_orders,
-			template=template,
-			**kwargs
-		)
+		if excede and set(kwargs) <= ARGUMENTOS_HISTOGRAMA_SERVIDOR:
+			# Histograma calculado en el servidor: al navegador solo llegan las barras
+			altura = kwargs.get('histnorm') or 'count'
+			barras = binear(datos, x, color, kwargs.pop('nbins', None), kwargs.pop('histnorm', None))
+			numerica = 'INICIO' in barras
+			fig = px.bar(
+				barras,
+				x=x,
+				y=altura,
+				color=color,
+				category_orders=category_orders,
+				template=template,
+				custom_data=['INICIO', 'FIN'] if numerica else None,
+				**kwargs
+			)
+			if numerica:
+				# Barras contiguas del ancho de la cubeta, con el rango en el hover
+				for traza in fig.data:
+					traza.hovertemplate = traza.hovertemplate.replace(
+						f"{x}=%{{x}}", f"{x}=%{{customdata[0]}} - %{{customdata[1]}}"
+					)
+				fig.update_traces(width=barras['FIN'].iloc[0] - barras['INICIO'].iloc[0])
+				fig.update_layout(bargap=0)
+			meta = {'puntos_enviados': len(barras), 'puntos_originales': len(datos), 'reduccion': 'histograma calculado en el servidor'}
+		else:
+			fig = px.histogram(
+				datos,
+				x=x,
+				color=color,
+				category_orders=category_orders,
+				template=template,
+				**kwargs
+			)
 	
 	elif tipo == "line":
 		markers = kwargs.pop('markers', False)
+		datos, meta = submuestrear(datos, x, y, color, puntos_maximos) if excede else (datos, None)
 		fig = px.line(
 			datos,
 			x=x,
@@ -128,6 +244,10 @@ def grafico_generico(
 			)
 	
 	elif tipo == "scatter":
+		if excede:
+			# Sin submuestrear: con muchos puntos se dibuja con WebGL
+			kwargs.setdefault('render_mode', 'webgl')
+			meta = {'puntos_enviados': len(datos), 'puntos_originales': len(datos), 'reduccion': 'WebGL'}
 		fig = px.scatter(
 			datos,
 			x=x,
@@ -139,6 +259,7 @@ def grafico_generico(
 		)
 	
 	elif tipo == "area":
+		datos, meta = submuestrear(datos, x, y, color, puntos_maximos) if excede else (datos, None)
 		fig = px.area(
 			datos,
 			x=x,
@@ -192,11 +313,14 @@ def grafico_generico(
 		fig = kwargs.pop('fig', None)
 		if fig is None:
 			st.error("Para tipo 'custom' debes proporcionar un objeto 'fig' en kwargs")
-			return
+			return None
 	
 	else:
 		st.error(f"Tipo de gráfico '{tipo}' no soportado")
-		return
+		return None
+	
+	if meta:
+		fig.update_layout(meta=meta)
 	
 	# Aplicar altura personalizada si se especifica
 	if height:
@@ -249,22 +373,18 @@ def grafico_generico(
 		plot_bgcolor='white'
 	)
 	
-	# Aplicar estilos de card con CSS
-	st.markdown("""
-		<style>
-		.stPlotlyChart {
-			background: white;
-			padding: 15px;
-			border-radius: 12px;
-			box-shadow: 0 2px 8px rgba(0, 0, 0, 0.1);
-		}
-		</style>
-	""", unsafe_allow_html=True)
-	
-	st.plotly_chart(
-		fig, 
-		width=width, 
-		key=key,
-		config={'displayModeBar': True}
-	)
+	return fig
+
+
+def submuestrear(datos, x, y, color, puntos_maximos):
+	"""
+	Submuestrea con LTTB las series de un gráfico de línea o área.
 	
+	Retorna:
+	- (datos, meta): datos reducidos y los puntos enviados y originales, o los
+	  mismos datos y None si `y` no es una sola columna
+	"""
+	if not isinstance(y, str):
+		return datos, None
+	reducidos = reducir_series(datos, x, y, color, puntos_maximos)
+	return reducidos, {'puntos_enviados': len(reducidos), 'puntos_originales': len(datos), 'reduccion': 'LTTB'}
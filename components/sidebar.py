@@ -5,7 +5,8 @@ def render_sidebar(df):
 	Renderiza el sidebar con filtros interactivos.
 	
 	Parámetros:
-	- df: DataFrame con los datos completos
+	- df: DataFrame con las columnas ANNO, TRIMESTRE, DEPARTAMENTO y TECNOLOGIA
+	  (basta una fila por combinación, en el orden de los datos)
 	
 	Retorna:
 	- dict con los filtros seleccionados: {
@@ -0,0 +1,124 @@
+"""
+Caché columnar en disco para el CSV de cobertura ya limpio.
+
+El DataFrame limpio se guarda en Parquet junto a un archivo JSON con la huella
+del CSV de origen (tamaño, fecha de modificación y hash del contenido). Si la
+huella coincide se lee el Parquet con sus tipos; si el CSV cambió, se vuelve a
+limpiar y se reescribe la caché.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import time
+from pathlib import Path
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Tamaño de bloque para calcular el hash sin cargar el archivo completo
+TAMANO_BLOQUE = 1 << 20
+
+
+def hash_contenido(ruta):
+    """Calcula el hash BLAKE2b del contenido del archivo leyendo por bloques."""
+    h = hashlib.blake2b(digest_size=20)
+    with open(ruta, 'rb') as archivo:
+        for bloque in iter(lambda: archivo.read(TAMANO_BLOQUE), b''):
+            h.update(bloque)
+    return h.hexdigest()
+
+
+def huella_archivo(ruta, con_hash=True):
+    """
+    Retorna la huella del archivo: dict con 'tamano', 'mtime_ns' y 'hash'.
+    Con con_hash=False se omite el hash (comparación rápida).
+    """
+    estado = os.stat(ruta)
+    huella = {'tamano': estado.st_size, 'mtime_ns': estado.st_mtime_ns}
+    if con_hash:
+        huella['hash'] = hash_contenido(ruta)
+    return huella
+
+
+def rutas_cache(ruta_csv, dir_cache):
+    """Retorna las rutas (parquet, metadatos) de la caché de un CSV."""
+    nombre = Path(ruta_csv).stem.replace(' ', '_')
+    dir_cache = Path(dir_cache)
+    return dir_cache / f'{nombre}.parquet', dir_cache / f'{nombre}.json'
+
+
+def leer_metadatos(ruta_meta):
+    try:
+        return json.loads(Path(ruta_meta).read_text(encoding='utf-8'))
+    except (OSError, ValueError):
+        return None
+
+
+def escribir_atomico(ruta, escribir):
+    """Escribe en un archivo temporal y lo renombra para no dejar cachés a medias."""
+    temporal = ruta.with_name(ruta.name + '.tmp')
+    escribir(temporal)
+    os.replace(temporal, ruta)
+
+
+def cargar_con_cache(ruta_csv, construir, dir_cache, version=''):
+    """
+    Carga el DataFrame limpio desde la caché o lo construye desde el CSV.
+
+    Parámetros:
+    - ruta_csv: ruta del CSV de origen
+    - construir: función que recibe ruta_csv y retorna el DataFrame limpio
+    - dir_cache: carpeta de la caché
+    - version: texto que invalida la caché cuando cambia la limpieza
+
+    Retorna:
+    - DataFrame limpio
+    """
+    inicio = time.perf_counter()
+    ruta_parquet, ruta_meta = rutas_cache(ruta_csv, dir_cache)
+    meta = leer_metadatos(ruta_meta)
+
+    # Primero se comparan tamaño y fecha; el hash solo se calcula si coinciden
+    huella = huella_archivo(ruta_csv, con_hash=False)
+    if (
+        meta is not None
+        and meta.get('version') == version
+        and meta.get('tamano') == huella['tamano']
+        and meta.get('mtime_ns') == huella['mtime_ns']
+        and ruta_parquet.exists()
+    ):
+        huella['hash'] = hash_contenido(ruta_csv)
+        if meta.get('hash') == huella['hash']:
+            try:
+                df = pd.read_parquet(ruta_parquet)
+                logger.info(
+                    "Caché HIT %s (%d filas) en %.3f s",
+                    ruta_parquet.name, len(df), time.perf_counter() - inicio
+                )
+                return df
+            except Exception as e:
+                logger.warning("No se pudo leer la caché %s: %s", ruta_parquet, e)
+
+    logger.info("Caché MISS %s, construyendo desde el CSV", ruta_parquet.name)
+    df = construir(ruta_csv)
+    tiempo_construccion = time.perf_counter() - inicio
+
+    try:
+        Path(dir_cache).mkdir(parents=True, exist_ok=True)
+        if 'hash' not in huella:
+            huella['hash'] = hash_contenido(ruta_csv)
+        escribir_atomico(ruta_parquet, lambda ruta: df.to_parquet(ruta, index=False))
+        meta = dict(huella, version=version, filas=len(df))
+        escribir_atomico(ruta_meta, lambda ruta: ruta.write_text(json.dumps(meta), encoding='utf-8'))
+    except Exception as e:
+        # Sin pyarrow o sin permisos de escritura el dashboard sigue funcionando
+        logger.warning("No se pudo escribir la caché %s: %s", ruta_parquet, e)
+
+    logger.info(
+        "CSV limpiado en %.3f s (total %.3f s con escritura de caché)",
+        tiempo_construccion, time.perf_counter() - inicio
+    )
+    return df
@@ -0,0 +1,92 @@
+"""
+Representación compacta en memoria de los DataFrames de cobertura.
+
+Las dimensiones de baja cardinalidad (año, trimestre, departamento, municipio,
+CPOB, tecnología) se guardan como categóricas, las áreas como float32 y las
+llaves enteras DIVIPOLA con el entero más pequeño que las contiene. Cada
+réplica de Streamlit mantiene el DataFrame completo y unos 15 DataFrames
+derivados, así que el ahorro se multiplica.
+"""
+
+import logging
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Columnas de texto que se convierten a categóricas
+COLUMNAS_DIMENSION = ['ANNO', 'TRIMESTRE', 'DEPARTAMENTO', 'MUNICIPIO', 'CPOB', 'TECNOLOGIA']
+
+# Proporción máxima de valores distintos para convertir una columna de texto a categórica
+MAX_PROPORCION_DISTINTOS = 0.5
+
+
+def bytes_en_memoria(obj):
+    """
+    Retorna los bytes que ocupa un DataFrame o Series (incluye el contenido de
+    los textos). Los dict suman sus valores y otros objetos pueden definir su
+    propio método bytes_en_memoria().
+    """
+    if isinstance(obj, pd.DataFrame):
+        return int(obj.memory_usage(index=True, deep=True).sum())
+    if isinstance(obj, pd.Series):
+        return int(obj.memory_usage(index=True, deep=True))
+    if isinstance(obj, dict):
+        return sum(bytes_en_memoria(valor) for valor in obj.values())
+    if hasattr(obj, 'bytes_en_memoria'):
+        return obj.bytes_en_memoria()
+    return 0
+
+
+def es_texto(serie):
+    return pd.api.types.is_object_dtype(serie) or pd.api.types.is_string_dtype(serie)
+
+
+def compactar_serie(serie, forzar_categoria=False):
+    """
+    Convierte una Series a categórica (si es texto repetido), a float32 (si es
+    float64) o al entero más pequeño posible (si es entera).
+    """
+    if isinstance(serie.dtype, pd.CategoricalDtype):
+        return serie
+    if es_texto(serie):
+        if forzar_categoria or serie.nunique() <= MAX_PROPORCION_DISTINTOS * max(len(serie), 1):
+            return serie.astype('category')
+        return serie
+    if serie.dtype == np.float64:
+        return serie.astype(np.float32)
+    if pd.api.types.is_integer_dtype(serie) and not pd.api.types.is_extension_array_dtype(serie):
+        return pd.to_numeric(serie, downcast='integer')
+    return serie
+
+
+def compactar(obj):
+    """
+    Retorna una versión compacta de un DataFrame o Series.
+
+    Las columnas de COLUMNAS_DIMENSION siempre pasan a categóricas; el resto de
+    columnas de texto solo si tienen muchos valores repetidos. Las columnas
+    float64 pasan a float32 y las enteras se reducen.
+    """
+    if isinstance(obj, pd.Series):
+        return compactar_serie(obj, forzar_categoria=obj.name in COLUMNAS_DIMENSION)
+    if not isinstance(obj, pd.DataFrame):
+        return obj
+    return obj.assign(**{
+        col: compactar_serie(obj[col], forzar_categoria=col in COLUMNAS_DIMENSION)
+        for col in obj.columns
+    })
+
+
+def registrar_reporte(reporte):
+    """Escribe en el log los bytes antes y después de compactar."""
+    total_antes = sum(antes for antes, _ in reporte.values())
+    total_despues = sum(despues for _, despues in reporte.values())
+    for nombre, (antes, despues) in sorted(reporte.items(), key=lambda item: -item[1][0]):
+        logger.info("Modo compacto %-28s %12d -> %12d bytes", nombre, antes, despues)
+    logger.info(
+        "Modo compacto total: %.1f MB -> %.1f MB",
+        total_antes / 1e6, total_despues / 1e6
+    )
+    return total_antes, total_despues
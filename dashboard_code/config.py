@@ -0,0 +1,86 @@
+"""
+Configuración del procesamiento de datos.
+
+Los valores por defecto reproducen el comportamiento original del dashboard y
+pueden ajustarse con variables de entorno en cada réplica:
+
+- COBERTURA_CSV: ruta del CSV de cobertura móvil.
+- COBERTURA_CACHE: '0' desactiva la caché columnar del CSV limpio.
+- COBERTURA_CACHE_DIR: carpeta donde se guarda la caché.
+- COBERTURA_COMPACTO: '1' guarda las dimensiones como categóricas y las áreas
+  como float32 en el DataFrame base y en los derivados.
+- COBERTURA_TRABAJADORES: número de hilos para calcular en paralelo las ramas
+  independientes de los DataFrames derivados (1 = en serie).
+- COBERTURA_FILAS_POR_BLOQUE: filas por bloque en la lectura por bloques
+  (dashboard_code/streaming.py).
+- COBERTURA_BASE_DIR: carpeta de la base particionada por periodo donde
+  dashboard_code/incremental.py agrega cada trimestre nuevo. Para que el
+  dashboard la use, COBERTURA_CSV debe apuntar a esa carpeta.
+- COBERTURA_GEOMETRIA_DIR: carpeta del almacén local de geometrías de los
+  departamentos (dashboard_code/geometria.py).
+- COBERTURA_GEOMETRIA_VARIANTE: variante simplificada que usan los mapas
+  ('original', 'alta', 'media' o 'baja').
+- COBERTURA_MOTOR: motor de las consultas de conteos, sumas y CPOB distintos
+  del dashboard: 'pandas' (cubo y resúmenes en memoria) o 'duckdb' (SQL sobre
+  DuckDB embebido, dashboard_code/motor_duckdb.py).
+- COBERTURA_DUCKDB: archivo de la base DuckDB (':memory:' la mantiene en memoria);
+  cada versión de los datos usa un archivo propio con la huella de la fuente en el nombre.
+- COBERTURA_INSTANTANEA: carpeta donde se publica la instantánea Arrow de los
+  DataFrames del dashboard, mapeada en memoria y compartida por todos los
+  procesos de la máquina (dashboard_code/instantanea.py). Sin definir, cada
+  proceso calcula sus propios DataFrames.
+- COBERTURA_RECARGA_SEGUNDOS: cada cuántos segundos se revisa si la fuente
+  cambió para recargar los datos sin reiniciar el servidor (0 = no se revisa).
+- COBERTURA_CACHE_RESULTADOS_MB: megabytes máximos de la caché de resultados
+  de los gráficos compartida entre sesiones (dashboard_code/resultados.py;
+  0 la desactiva).
+- COBERTURA_CACHE_FIGURAS_MB: megabytes máximos de la caché de figuras de
+  Plotly ya construidas (para los gráficos con cache_figura=True).
+- COBERTURA_DECIMALES_FIGURA: decimales con que se envían al navegador los
+  valores de las figuras (dashboard_code/figuras.py).
+- COBERTURA_PUNTOS_MAXIMOS: puntos por encima de los cuales los histogramas se
+  calculan en el servidor, las líneas y áreas se submuestrean con LTTB y los
+  diagramas de dispersión se dibujan con WebGL (dashboard_code/muestreo.py;
+  0 lo desactiva).
+"""
+
+import os
+from pathlib import Path
+
+# Carpeta raíz del proyecto (la que contiene app.py)
+RAIZ = Path(__file__).resolve().parent.parent
+
+RUTA_CSV = Path(os.environ.get(
+    'COBERTURA_CSV',
+    RAIZ / 'data' / 'Datos_Cobertura Movil_1T_2023 a 4T_2024.csv'
+))
+
+USAR_CACHE = os.environ.get('COBERTURA_CACHE', '1') != '0'
+DIR_CACHE = Path(os.environ.get('COBERTURA_CACHE_DIR', RAIZ / 'data' / 'cache'))
+
+COMPACTO = os.environ.get('COBERTURA_COMPACTO', '0') == '1'
+
+TRABAJADORES = max(1, int(os.environ.get('COBERTURA_TRABAJADORES', '1')))
+
+FILAS_POR_BLOQUE = max(1, int(os.environ.get('COBERTURA_FILAS_POR_BLOQUE', '500000')))
+
+DIR_BASE = Path(os.environ.get('COBERTURA_BASE_DIR', RAIZ / 'data' / 'base'))
+
+DIR_GEOMETRIA = Path(os.environ.get('COBERTURA_GEOMETRIA_DIR', RAIZ / 'data' / 'geometria'))
+VARIANTE_GEOMETRIA = os.environ.get('COBERTURA_GEOMETRIA_VARIANTE', 'media')
+
+MOTOR = os.environ.get('COBERTURA_MOTOR', 'pandas')
+if MOTOR not in ('pandas', 'duckdb'):
+    raise ValueError(f"COBERTURA_MOTOR debe ser 'pandas' o 'duckdb', no {MOTOR!r}")
+RUTA_DUCKDB = os.environ.get('COBERTURA_DUCKDB', ':memory:')
+
+DIR_INSTANTANEA = os.environ.get('COBERTURA_INSTANTANEA')
+DIR_INSTANTANEA = Path(DIR_INSTANTANEA) if DIR_INSTANTANEA else None
+
+RECARGA_SEGUNDOS = float(os.environ.get('COBERTURA_RECARGA_SEGUNDOS', '0'))
+
+MAX_BYTES_RESULTADOS = int(float(os.environ.get('COBERTURA_CACHE_RESULTADOS_MB', '64')) * 1e6)
+MAX_BYTES_FIGURAS = int(float(os.environ.get('COBERTURA_CACHE_FIGURAS_MB', '64')) * 1e6)
+
+DECIMALES_FIGURA = int(os.environ.get('COBERTURA_DECIMALES_FIGURA', '4'))
+PUNTOS_MAXIMOS = int(os.environ.get('COBERTURA_PUNTOS_MAXIMOS', '5000'))
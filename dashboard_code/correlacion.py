@@ -0,0 +1,117 @@
+"""
+Matriz de correlación de las áreas bajo cualquier combinación de filtros.
+
+Cada celda periodo x departamento x tecnología guarda estadísticos
+suficientes centrados de las columnas numéricas: conteo, medias, sumas de
+cuadrados de las desviaciones y comomentos. Una selección se arma uniendo
+las celdas con la fórmula de Chan et al. (se suman los momentos de cada
+celda más la corrección por la distancia de su media a la media conjunta),
+que no sufre la cancelación de restar sumas de cuadrados grandes.
+
+Como DataFrame.corr(), cada par de columnas usa solo las filas donde ambas
+tienen valor, así que los estadísticos se guardan por par.
+"""
+
+import numpy as np
+import pandas as pd
+
+from dashboard_code.cubo import ejes_y_celdas, indices_filtro
+
+
+class MomentosCubo:
+    """
+    Estadísticos suficientes por celda del cubo y par de columnas.
+
+    Parámetros:
+    - hechos: DataFrame con las llaves de DIMENSIONES y `columnas`
+    - columnas: columnas numéricas de la matriz de correlación
+
+    Para el par (i, j), n[..., i, j] es el número de filas con ambas columnas,
+    media[..., i, j] y m2[..., i, j] la media y la suma de cuadrados de las
+    desviaciones de la columna i en esas filas, y comomentos[..., i, j] la suma
+    de productos de las desviaciones de i y j.
+    """
+
+    def __init__(self, hechos, columnas):
+        self.columnas = list(columnas)
+        self.ejes, self.forma, celda = ejes_y_celdas(hechos)
+        celdas = int(np.prod(self.forma))
+        k = len(self.columnas)
+
+        valores = hechos[self.columnas].to_numpy(dtype=np.float64)
+        presentes = ~np.isnan(valores)
+
+        self.n = np.zeros((celdas, k, k))
+        self.media = np.zeros((celdas, k, k))
+        self.m2 = np.zeros((celdas, k, k))
+        self.comomentos = np.zeros((celdas, k, k))
+        for i in range(k):
+            for j in range(i, k):
+                filas = presentes[:, i] & presentes[:, j]
+                c = celda[filas]
+                n = np.bincount(c, minlength=celdas).astype(np.float64)
+                # Dos pasadas por celda: medias y luego momentos centrados
+                centrados = {}
+                for a, b in ((i, j), (j, i)):
+                    x = valores[filas, a]
+                    with np.errstate(invalid='ignore', divide='ignore'):
+                        media = np.where(n > 0, np.bincount(c, weights=x, minlength=celdas) / n, 0.0)
+                    centrados[a] = x - media[c]
+                    self.media[:, a, b] = media
+                    self.m2[:, a, b] = np.bincount(c, weights=centrados[a] ** 2, minlength=celdas)
+                self.n[:, i, j] = self.n[:, j, i] = n
+                self.comomentos[:, i, j] = self.comomentos[:, j, i] = np.bincount(
+                    c, weights=centrados[i] * centrados[j], minlength=celdas
+                )
+
+        forma = self.forma + (k, k)
+        self.n = self.n.reshape(forma)
+        self.media = self.media.reshape(forma)
+        self.m2 = self.m2.reshape(forma)
+        self.comomentos = self.comomentos.reshape(forma)
+
+    def bytes_en_memoria(self):
+        return self.n.nbytes + self.media.nbytes + self.m2.nbytes + self.comomentos.nbytes
+
+    def unir(self, filtros=None):
+        """
+        Une las celdas seleccionadas (fórmula de Chan et al. para varias particiones).
+
+        Retorna:
+        - (n, media, m2, comomentos): arrays k x k de la unión
+        """
+        indices = indices_filtro(self.ejes, filtros or {})
+        k = len(self.columnas)
+        seleccion = np.ix_(*indices, np.arange(k), np.arange(k))
+        n = self.n[seleccion].reshape(-1, k, k)
+        media = self.media[seleccion].reshape(-1, k, k)
+        m2 = self.m2[seleccion].reshape(-1, k, k)
+        comomentos = self.comomentos[seleccion].reshape(-1, k, k)
+
+        n_total = n.sum(axis=0)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            media_total = np.where(n_total > 0, (n * media).sum(axis=0) / n_total, 0.0)
+        delta = media - media_total
+        # Media de la columna j en las filas del par (i, j) es media[..., j, i]
+        delta_t = np.swapaxes(delta, 1, 2)
+        m2_total = (m2 + n * delta ** 2).sum(axis=0)
+        comomentos_total = (comomentos + n * delta * delta_t).sum(axis=0)
+        return n_total, media_total, m2_total, comomentos_total
+
+    def correlacion(self, filtros=None):
+        """
+        Matriz de correlación de Pearson de las filas seleccionadas, con los
+        mismos pares completos que DataFrame.corr().
+
+        Parámetros:
+        - filtros: dict {llave: códigos permitidos}
+
+        Retorna:
+        - DataFrame k x k indexado por `columnas` (NaN si un par tiene menos de
+          dos filas o una columna sin variación)
+        """
+        n, _, m2, comomentos = self.unir(filtros)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            corr = comomentos / np.sqrt(m2 * m2.T)
+        corr = np.where(n >= 2, np.clip(corr, -1, 1), np.nan)
+        return pd.DataFrame(corr, index=self.columnas, columns=self.columnas)
@@ -0,0 +1,123 @@
+"""
+Resúmenes de cuantiles unibles de los porcentajes de cobertura por CPOB.
+
+Los porcentajes de cobertura (área cubierta por el operador / área del CPOB)
+viven en un dominio acotado, 0 a 100, así que cada celda
+periodo x departamento x tecnología x operador guarda un histograma de
+BINS cubetas de ancho fijo. Dos histogramas se unen sumando conteos (sin
+pérdida), y un cuantil se obtiene recorriendo el acumulado e interpolando
+dentro de la cubeta donde el acumulado alcanza p: esa cubeta contiene el
+cuantil empírico (el menor porcentaje cuyo acumulado alcanza p), así que el
+error es a lo sumo el ancho de una cubeta (0.5 puntos porcentuales con 200
+cubetas), sin volver a ordenar filas. Con pocos CPOB el cuantil interpolado
+entre dos CPOB (np.quantile por defecto) puede quedar más lejos.
+
+Los porcentajes mayores a 100 (áreas de cobertura que se solapan) cuentan
+como 100, igual que en los mapas 4G; los CPOB con área 0 no se incluyen.
+"""
+
+import numpy as np
+import pandas as pd
+
+from dashboard_code.cubo import DIMENSIONES, ejes_y_celdas, indices_filtro
+from dashboard_code.operadores import OPERADORES, MatrizOperadores
+
+# Cubetas del histograma en [0, 100]
+BINS = 200
+ANCHO = 100 / BINS
+
+
+class HistogramaCuantiles:
+    """
+    Histogramas de porcentaje de cobertura por celda del cubo y operador.
+
+    Parámetros:
+    - resumen: DataFrame con una fila por periodo, CPOB y tecnología, con las
+      llaves de DIMENSIONES, AREA_CPOB y las áreas de OPERADORES
+    """
+
+    def __init__(self, resumen):
+        self.ejes, self.forma, celda = ejes_y_celdas(resumen)
+        celdas = int(np.prod(self.forma))
+        porcentajes = MatrizOperadores.desde_df(resumen).porcentajes(resumen['AREA_CPOB'])
+
+        conteos = np.zeros((celdas, len(OPERADORES), BINS), dtype=np.int64)
+        validos = np.isfinite(porcentajes)
+        fila, operador = np.nonzero(validos)
+        cubeta = np.minimum((np.clip(porcentajes[validos], 0, 100) / ANCHO).astype(np.int64), BINS - 1)
+        np.add.at(conteos, (celda[fila], operador, cubeta), 1)
+
+        # El tipo más pequeño que contiene los conteos de una celda
+        tipo = np.uint16 if conteos.max(initial=0) < np.iinfo(np.uint16).max else np.uint32
+        self.conteos = conteos.astype(tipo).reshape(self.forma + (len(OPERADORES), BINS))
+
+    def bytes_en_memoria(self):
+        return self.conteos.nbytes
+
+    def unir(self, por=(), filtros=None):
+        """
+        Une los histogramas de las celdas seleccionadas.
+
+        Retorna:
+        - (claves, histogramas): DataFrame con las llaves de `por` y un array
+          (grupos, operadores, BINS) con los conteos unidos de cada grupo
+        """
+        por = list(por)
+        indices = indices_filtro(self.ejes, filtros or {})
+        bloque = self.conteos[np.ix_(*indices, np.arange(len(OPERADORES)), np.arange(BINS))]
+        ejes_union = tuple(i for i, llave in enumerate(DIMENSIONES) if llave not in por)
+        bloque = bloque.sum(axis=ejes_union, dtype=np.int64)
+        restantes = [llave for llave in DIMENSIONES if llave in por]
+        bloque = np.moveaxis(bloque, [restantes.index(llave) for llave in por], range(len(por)))
+
+        histogramas = bloque.reshape(-1, len(OPERADORES), BINS)
+
+        rejilla = np.meshgrid(
+            *[self.ejes[llave][indices[DIMENSIONES.index(llave)]] for llave in por],
+            indexing='ij'
+        )
+        # Con `por` vacío hay un solo grupo (la unión de toda la selección)
+        claves = pd.DataFrame(
+            {llave: valores.ravel() for llave, valores in zip(por, rejilla)},
+            index=pd.RangeIndex(len(histogramas))
+        )
+        return claves, histogramas
+
+    def cuantiles(self, por=(), filtros=None, probabilidades=(0.1, 0.5, 0.9)):
+        """
+        Cuantiles del porcentaje de cobertura por operador.
+
+        Parámetros:
+        - por: llaves de DIMENSIONES por las que se agrupa
+        - filtros: dict {llave: códigos permitidos}
+        - probabilidades: cuantiles a calcular (entre 0 y 1)
+
+        Retorna:
+        - DataFrame con las llaves de `por`, OPERADOR, N (CPOB-periodo) y una
+          columna P<nn> por probabilidad; sin los grupos vacíos
+        """
+        claves, histogramas = self.unir(por, filtros)
+        acumulado = np.cumsum(histogramas, axis=-1)
+        total = acumulado[..., -1]
+
+        columnas = {}
+        for p in probabilidades:
+            # Rango objetivo y cubeta donde el acumulado lo alcanza
+            objetivo = p * total
+            cubeta = np.minimum((acumulado < objetivo[..., None]).sum(axis=-1), BINS - 1)
+            previo = np.where(cubeta > 0, np.take_along_axis(acumulado, np.maximum(cubeta - 1, 0)[..., None], -1)[..., 0], 0)
+            en_cubeta = np.take_along_axis(histogramas, cubeta[..., None], -1)[..., 0]
+            with np.errstate(divide='ignore', invalid='ignore'):
+                fraccion = np.where(en_cubeta > 0, (objetivo - previo) / en_cubeta, 0.0)
+            columnas[f'P{int(round(p * 100)):02d}'] = (cubeta + np.clip(fraccion, 0, 1)) * ANCHO
+
+        filas = []
+        for k, operador in enumerate(OPERADORES):
+            tabla = claves.copy()
+            tabla['OPERADOR'] = operador
+            tabla['N'] = total[:, k]
+            for nombre, valores in columnas.items():
+                tabla[nombre] = valores[:, k]
+            filas.append(tabla)
+        resultado = pd.concat(filas, ignore_index=True)
+        return resultado[resultado['N'] > 0].reset_index(drop=True)
@@ -0,0 +1,152 @@
+"""
+Cubo OLAP preagregado para los gráficos del dashboard.
+
+El cubo es un arreglo denso periodo x departamento x tecnología con el conteo
+de filas y las sumas de las cuatro áreas de cobertura. Se construye una vez
+al cargar los datos y responde cualquier combinación de filtros del sidebar
+agregando sobre las dimensiones que no se piden: unos cientos de celdas en
+lugar de recorrer todas las filas.
+
+Solo sirve para medidas aditivas (conteos y sumas). Los conteos de CPOB
+distintos no se pueden obtener del cubo.
+"""
+
+import numpy as np
+import pandas as pd
+
+from dashboard_code.operadores import COLUMNAS_AREA
+
+# Dimensiones del cubo (llaves enteras de la tabla de hechos), en el orden de los ejes
+DIMENSIONES = ['ID_PERIODO', 'ID_DEPARTAMENTO', 'ID_TECNOLOGIA']
+
+# Medidas: conteo de filas y sumas de áreas de cobertura
+COLUMNA_FILAS = 'FILAS'
+SUMAS = COLUMNAS_AREA
+MEDIDAS = [COLUMNA_FILAS] + SUMAS
+
+
+def ejes_y_celdas(hechos):
+    """
+    Ejes del cubo (códigos ordenados de cada llave de DIMENSIONES) y celda de
+    cada fila de `hechos`.
+
+    Retorna:
+    - (ejes, forma, celda): dict {llave: códigos}, tupla con el tamaño de cada
+      eje y array con el índice plano de la celda de cada fila
+    """
+    ejes = {}
+    posiciones = []
+    for llave in DIMENSIONES:
+        valores = hechos[llave].to_numpy()
+        eje = np.unique(valores)
+        ejes[llave] = eje
+        posiciones.append(np.searchsorted(eje, valores))
+    forma = tuple(len(eje) for eje in ejes.values())
+    celda = np.ravel_multi_index(posiciones, forma) if len(hechos) else np.zeros(0, dtype=np.int64)
+    return ejes, forma, celda
+
+
+def indices_filtro(ejes, filtros):
+    """Posiciones de cada eje permitidas por los filtros {llave: códigos} (todas si la llave no se filtra)."""
+    indices = []
+    for llave in DIMENSIONES:
+        eje = ejes[llave]
+        if llave in filtros:
+            indices.append(np.flatnonzero(np.isin(eje, np.asarray(filtros[llave]))))
+        else:
+            indices.append(np.arange(len(eje)))
+    return indices
+
+
+class Cubo:
+    """
+    Cubo denso de conteos y sumas por periodo, departamento y tecnología.
+
+    Parámetros:
+    - hechos: DataFrame con las llaves de DIMENSIONES y las columnas de SUMAS
+    - estrella: Estrella usada para traducir los filtros del sidebar (nombres) a llaves
+    """
+
+    def __init__(self, hechos, estrella):
+        self.estrella = estrella
+        self.ejes, forma, celda = ejes_y_celdas(hechos)
+        celdas = int(np.prod(forma))
+
+        # Misma semántica que DataFrame.sum(): los faltantes no suman
+        self.valores = np.empty(forma + (len(MEDIDAS),), dtype=np.float64)
+        self.valores[..., 0] = np.bincount(celda, minlength=celdas).reshape(forma)
+        for i, columna in enumerate(SUMAS, start=1):
+            pesos = np.nan_to_num(hechos[columna].to_numpy(dtype=np.float64))
+            self.valores[..., i] = np.bincount(celda, weights=pesos, minlength=celdas).reshape(forma)
+
+    def bytes_en_memoria(self):
+        return self.valores.nbytes + sum(eje.nbytes for eje in self.ejes.values())
+
+    def filtros_sidebar(self, anno=None, trimestre=None, departamentos=None, tecnologias=None):
+        """
+        Traduce una selección del sidebar (nombres; None o lista vacía = todos)
+        a filtros por llave {ID_*: códigos} para consultar().
+        """
+        filtros = {}
+        if anno is not None or trimestre is not None:
+            periodo = self.estrella.dimensiones['periodo']
+            mascara = np.ones(len(periodo), dtype=bool)
+            if anno is not None:
+                mascara &= (periodo['ANNO'] == anno).to_numpy()
+            if trimestre is not None:
+                mascara &= (periodo['TRIMESTRE'] == trimestre).to_numpy()
+            filtros['ID_PERIODO'] = periodo.index[mascara]
+        if departamentos:
+            filtros['ID_DEPARTAMENTO'] = self.estrella.ids('departamento', 'DEPARTAMENTO', departamentos)
+        if tecnologias:
+            filtros['ID_TECNOLOGIA'] = self.estrella.ids('tecnologia', 'TECNOLOGIA', tecnologias)
+        return filtros
+
+    def consultar(self, por=(), filtros=None, medidas=None):
+        """
+        Agrega el cubo sobre las dimensiones que no están en `por`.
+
+        Parámetros:
+        - por: llaves de DIMENSIONES que se conservan (en ese orden)
+        - filtros: dict {llave: códigos permitidos}
+        - medidas: columnas de MEDIDAS a retornar (todas si es None)
+
+        Retorna:
+        - DataFrame con las llaves de `por` y las medidas, ordenado por las
+          llaves y sin las combinaciones que no tienen filas (como un groupby)
+        """
+        por = list(por)
+        medidas = MEDIDAS if medidas is None else list(medidas)
+        filtros = filtros or {}
+
+        indices = indices_filtro(self.ejes, filtros)
+        bloque = self.valores[np.ix_(*indices, np.arange(len(MEDIDAS)))]
+
+        ejes_suma = tuple(i for i, llave in enumerate(DIMENSIONES) if llave not in por)
+        bloque = bloque.sum(axis=ejes_suma)
+        # Reordenar los ejes restantes según `por`
+        restantes = [llave for llave in DIMENSIONES if llave in por]
+        bloque = np.moveaxis(bloque, [restantes.index(llave) for llave in por], range(len(por)))
+
+        columnas = {}
+        if por:
+            rejilla = np.meshgrid(
+                *[self.ejes[llave][indices[DIMENSIONES.index(llave)]] for llave in por],
+                indexing='ij'
+            )
+            for llave, valores in zip(por, rejilla):
+                columnas[llave] = valores.ravel()
+        planos = bloque.reshape(-1, len(MEDIDAS))
+        for medida in medidas:
+            columnas[medida] = planos[:, MEDIDAS.index(medida)]
+        resultado = pd.DataFrame(columnas)
+        if COLUMNA_FILAS in resultado:
+            resultado[COLUMNA_FILAS] = resultado[COLUMNA_FILAS].astype(np.int64)
+        if por:
+            con_filas = planos[:, 0] > 0
+            resultado = resultado[con_filas].reset_index(drop=True)
+        return resultado
+
+    def totales(self, filtros=None, medidas=None):
+        """Retorna una Series con el total de cada medida para los filtros."""
+        return self.consultar((), filtros, medidas).iloc[0]
@@ -0,0 +1,136 @@
+"""
+Esquema declarativo del CSV de cobertura móvil.
+
+El esquema se construye a partir del diccionario de datos (tabla
+CAMPO | TIPO DE DATO | DESCRIPCIÓN) y se usa para leer el CSV en una sola
+pasada: tipos asignados por el parser de pandas, decimales con coma en las
+columnas flotantes y solo las columnas que usa el dashboard. Si el archivo
+publicado en datos.gov.co cambia de columnas o de tipos, la lectura falla
+de inmediato con ErrorEsquema.
+"""
+
+import hashlib
+
+import pandas as pd
+
+# Tipo de pandas para cada tipo del diccionario de datos
+TIPOS_PANDAS = {
+    'Entero': 'int64',
+    'Texto': 'str',
+    'Flotante': 'float64',
+}
+
+
+class ErrorEsquema(ValueError):
+    """El CSV no coincide con el diccionario de datos."""
+
+
+class Columna:
+    """Columna del diccionario de datos."""
+
+    def __init__(self, nombre, tipo, descripcion=''):
+        if tipo not in TIPOS_PANDAS:
+            raise ErrorEsquema(f"Tipo de dato desconocido para {nombre}: {tipo}")
+        self.nombre = nombre
+        self.tipo = tipo
+        self.descripcion = descripcion
+
+    def __repr__(self):
+        return f"Columna({self.nombre!r}, {self.tipo!r})"
+
+
+class Esquema:
+    """
+    Esquema del CSV de cobertura.
+
+    Parámetros:
+    - columnas: list de Columna, en el orden del diccionario
+    - usar: list con los nombres de las columnas a cargar (None = todas)
+    - como_texto: nombres de columnas enteras que el dashboard usa como etiquetas
+      y se leen directamente como texto
+    """
+
+    def __init__(self, columnas, usar=None, como_texto=()):
+        self.columnas = {c.nombre: c for c in columnas}
+        self.usar = list(usar) if usar is not None else list(self.columnas)
+        self.como_texto = set(como_texto)
+
+        desconocidas = (set(self.usar) | self.como_texto) - set(self.columnas)
+        if desconocidas:
+            raise ErrorEsquema(f"Columnas fuera del diccionario de datos: {sorted(desconocidas)}")
+
+    @classmethod
+    def desde_diccionario(cls, texto, usar=None, como_texto=()):
+        """Construye el esquema a partir de la tabla del diccionario de datos."""
+        columnas = []
+        for linea in texto.splitlines():
+            partes = [p.strip() for p in linea.split('|')]
+            if len(partes) != 3 or partes[1] not in TIPOS_PANDAS:
+                continue  # encabezado, separador o texto libre
+            columnas.append(Columna(*partes))
+        if not columnas:
+            raise ErrorEsquema("El diccionario de datos no declara ninguna columna")
+        return cls(columnas, usar=usar, como_texto=como_texto)
+
+    def dtype(self, nombre):
+        if nombre in self.como_texto:
+            return 'str'
+        return TIPOS_PANDAS[self.columnas[nombre].tipo]
+
+    def dtypes(self):
+        """Retorna el dict de tipos de pandas de las columnas a cargar."""
+        return {nombre: self.dtype(nombre) for nombre in self.usar}
+
+    def huella(self):
+        """Texto corto que cambia cuando cambia el esquema (sirve para invalidar cachés)."""
+        descripcion = ';'.join(f"{n}:{self.dtype(n)}" for n in self.usar)
+        return hashlib.blake2b(descripcion.encode('utf-8'), digest_size=8).hexdigest()
+
+    def validar_encabezado(self, encabezado):
+        """Lanza ErrorEsquema si el encabezado del CSV no coincide con el diccionario."""
+        encabezado = list(encabezado)
+        faltantes = [c for c in self.columnas if c not in encabezado]
+        nuevas = [c for c in encabezado if c not in self.columnas]
+        if faltantes or nuevas:
+            raise ErrorEsquema(
+                "El CSV no coincide con el diccionario de datos. "
+                f"Faltan: {faltantes}. Columnas nuevas: {nuevas}."
+            )
+
+    def leer(self, ruta_csv, sep=';', **kwargs):
+        """
+        Lee el CSV aplicando el esquema en una sola pasada.
+
+        Parámetros:
+        - ruta_csv: ruta del archivo
+        - sep: separador de columnas
+        - **kwargs: argumentos adicionales para pd.read_csv (por ejemplo chunksize)
+
+        Retorna:
+        - DataFrame con las columnas de self.usar y sus tipos
+        """
+        self.validar_encabezado(pd.read_csv(ruta_csv, sep=sep, nrows=0).columns)
+        try:
+            return pd.read_csv(
+                ruta_csv,
+                sep=sep,
+                usecols=self.usar,
+                dtype=self.dtypes(),
+                decimal=',',
+                **kwargs
+            )
+        except (TypeError, ValueError) as e:
+            raise ErrorEsquema(f"Valores con tipo distinto al del diccionario de datos: {e}") from e
+
+    def leer_por_bloques(self, ruta_csv, filas_por_bloque, sep=';'):
+        """Igual que leer() pero retorna un iterador de DataFrames de a lo sumo filas_por_bloque filas."""
+        lector = self.leer(ruta_csv, sep=sep, chunksize=filas_por_bloque)
+        with lector:
+            while True:
+                try:
+                    bloque = next(lector)
+                except StopIteration:
+                    return
+                except (TypeError, ValueError) as e:
+                    raise ErrorEsquema(f"Valores con tipo distinto al del diccionario de datos: {e}") from e
+                yield bloque
@@ -0,0 +1,158 @@
+"""
+Modelo estrella de la cobertura móvil con llaves enteras DIVIPOLA.
+
+Las agregaciones se hacen sobre una tabla de hechos con llaves enteras
+(periodo, departamento, municipio, CPOB, tecnología) y las medidas de área.
+Los nombres viven en tablas de dimensión indexadas por su código y solo se
+unen al final, cuando un DataFrame se va a mostrar. Así dos centros poblados
+con el mismo nombre no se mezclan.
+"""
+
+import numpy as np
+import pandas as pd
+
+from dashboard_code.operadores import COLUMNAS_AREA
+
+# Medidas de la tabla de hechos
+MEDIDAS = ['AREA_CPOB', *COLUMNAS_AREA]
+
+# Llave -> (dimensión, columnas de nombre que la reemplazan al mostrar)
+NOMBRES_POR_LLAVE = {
+    'ID_PERIODO': ('periodo', ['ANNO', 'TRIMESTRE']),
+    'ID_DEPARTAMENTO': ('departamento', ['DEPARTAMENTO']),
+    'ID_MUNICIPIO': ('municipio', ['MUNICIPIO']),
+    'ID_CPOB': ('cpob', ['CPOB']),
+    'ID_TECNOLOGIA': ('tecnologia', ['TECNOLOGIA']),
+}
+
+LLAVES = list(NOMBRES_POR_LLAVE)
+
+# Dimensión -> (llave, columnas de la tabla de dimensión)
+COLUMNAS_DIMENSIONES = {
+    'periodo': ('ID_PERIODO', ['ANNO', 'TRIMESTRE']),
+    'departamento': ('ID_DEPARTAMENTO', ['DEPARTAMENTO']),
+    'municipio': ('ID_MUNICIPIO', ['MUNICIPIO', 'ID_DEPARTAMENTO']),
+    'cpob': ('ID_CPOB', ['CPOB', 'ID_MUNICIPIO']),
+    'tecnologia': ('ID_TECNOLOGIA', ['TECNOLOGIA']),
+}
+
+
+def id_periodo(anno, trimestre):
+    """Llave entera del periodo: 2024 y trimestre 4 -> 20244."""
+    return int(anno) * 10 + int(trimestre)
+
+
+def agregar_id_periodo(df):
+    """Agrega la columna ID_PERIODO (AAAAT) al DataFrame de cobertura."""
+    df['ID_PERIODO'] = (
+        df['ANNO'].astype(int) * 10 + df['TRIMESTRE'].astype(int)
+    ).astype('int32')
+    return df
+
+
+def tabla_dimension(df, dimension):
+    """Tabla de una dimensión indexada por su llave; si un código tiene varios nombres se conserva el primero."""
+    llave, columnas = COLUMNAS_DIMENSIONES[dimension]
+    return (
+        df[[llave] + columnas]
+        .drop_duplicates(subset=[llave])
+        .set_index(llave)
+        .sort_index()
+    )
+
+
+def completar_periodo(tabla_periodo):
+    """Agrega la etiqueta PERIODO ('2024-T4') a la dimensión de periodo."""
+    tabla_periodo['PERIODO'] = tabla_periodo['ANNO'].astype(str) + '-T' + tabla_periodo['TRIMESTRE'].astype(str)
+    return tabla_periodo
+
+
+class Estrella:
+    """
+    Tablas de dimensión y tabla de hechos construidas a partir del DataFrame limpio.
+
+    Atributos:
+    - dimensiones: dict {nombre: DataFrame indexado por su llave}
+    - hechos: DataFrame con las llaves enteras y las medidas de área
+    """
+
+    def __init__(self, df):
+        if 'ID_PERIODO' not in df.columns:
+            agregar_id_periodo(df)
+
+        self.dimensiones = {
+            nombre: tabla_dimension(df, nombre) for nombre in COLUMNAS_DIMENSIONES
+        }
+        completar_periodo(self.dimensiones['periodo'])
+
+        # Con copy-on-write las medidas comparten memoria con el DataFrame original
+        self.hechos = df[LLAVES + MEDIDAS]
+        self._rangos = {}
+
+    @classmethod
+    def desde_dimensiones(cls, dimensiones, hechos=None):
+        """
+        Construye una Estrella a partir de tablas de dimensión ya calculadas
+        (por ejemplo acumuladas por bloques). Solo se pueden nombrar las llaves
+        cuyas dimensiones se incluyan.
+        """
+        estrella = cls.__new__(cls)
+        estrella.dimensiones = dict(dimensiones)
+        if 'periodo' in estrella.dimensiones:
+            completar_periodo(estrella.dimensiones['periodo'])
+        estrella.hechos = hechos
+        estrella._rangos = {}
+        return estrella
+
+    def bytes_en_memoria(self):
+        """Bytes de las tablas de dimensión (los hechos comparten memoria con el DataFrame base)."""
+        return sum(
+            int(tabla.memory_usage(index=True, deep=True).sum())
+            for tabla in self.dimensiones.values()
+        )
+
+    def ids(self, dimension, columna, valores):
+        """Retorna los códigos de una dimensión cuyos valores de `columna` están en `valores`."""
+        tabla = self.dimensiones[dimension]
+        return tabla.index[tabla[columna].isin(valores)]
+
+    def rango(self, llave):
+        """Posición de cada código de `llave` en el orden de sus nombres (Series indexada por el código)."""
+        if llave not in self._rangos:
+            dimension, nombres = NOMBRES_POR_LLAVE[llave]
+            tabla = self.dimensiones[dimension][nombres].astype(str)
+            orden = tabla.sort_values(nombres, kind='stable').index
+            self._rangos[llave] = pd.Series(np.arange(len(orden)), index=orden)
+        return self._rangos[llave]
+
+    def ordenar(self, frame):
+        """
+        Ordena las filas de `frame` por los nombres de sus llaves, en el orden
+        de las columnas: el orden de un groupby por nombres en lugar de por
+        códigos. El orden es estable y el índice se reinicia.
+        """
+        llaves = [col for col in frame.columns if col in NOMBRES_POR_LLAVE]
+        rangos = [self.rango(col).reindex(frame[col].to_numpy()).to_numpy() for col in llaves]
+        return frame.take(np.lexsort(rangos[::-1])).reset_index(drop=True)
+
+    def con_nombres(self, frame):
+        """
+        Reemplaza las llaves enteras de `frame` por sus nombres.
+
+        Parámetros:
+        - frame: DataFrame con columnas ID_* de LLAVES
+
+        Retorna:
+        - DataFrame con las columnas de nombre en la posición de cada llave
+        """
+        columnas = {}
+        for col in frame.columns:
+            if col not in NOMBRES_POR_LLAVE:
+                columnas[col] = frame[col]
+                continue
+            dimension, nombres = NOMBRES_POR_LLAVE[col]
+            tabla = self.dimensiones[dimension]
+            codigos = frame[col].to_numpy()
+            for nombre in nombres:
+                columnas[nombre] = tabla[nombre].reindex(codigos).set_axis(frame.index)
+        return pd.DataFrame(columnas, index=frame.index)
@@ -0,0 +1,191 @@
+"""
+Compactación de las figuras de Plotly antes de enviarlas al navegador.
+
+Cada gráfico viaja como el JSON de su figura. Plotly ya codifica los arrays
+de numpy como arrays binarios tipados (base64), pero las figuras llevan la
+plantilla completa (los valores por defecto de todos los tipos de traza y de
+subplots que el dashboard no usa), los flotantes viajan en float64 aunque se
+muestren con uno o dos decimales y cada mapa incluye el GeoJSON con todas sus
+propiedades.
+
+compactar() modifica la figura ya construida:
+
+- redondea los arrays flotantes a DECIMALES_FIGURA; los que quedan enteros se
+  envían con el tipo entero más pequeño que los contiene y los que se dibujan
+  sobre un eje o un mapa (ATRIBUTOS_FLOAT32) en float32. text y customdata
+  conservan float64 porque se pueden mostrar sin formato.
+- deja en la plantilla solo los valores por defecto de los tipos de traza y
+  de los subplots que usa la figura.
+- quita los atributos de traza que repiten el valor por defecto de plotly.js.
+- en los mapas deja solo los features de las ubicaciones dibujadas y, de sus
+  propiedades, solo la que sirve de llave.
+
+Los bytes de cada gráfico antes y después quedan en TAMANOS;
+reporte_tamanos() los muestra como DataFrame.
+"""
+
+import logging
+
+import numpy as np
+import pandas as pd
+
+from dashboard_code.config import DECIMALES_FIGURA
+from dashboard_code.resultados import bytes_figura
+
+logger = logging.getLogger(__name__)
+
+# Atributos que se dibujan sobre un eje o un mapa: float32 basta en pantalla
+ATRIBUTOS_FLOAT32 = {'x', 'y', 'z', 'lat', 'lon', 'array', 'arrayminus'}
+
+# Atributos de traza cuyo valor es el de plotly.js por defecto
+ATRIBUTOS_POR_DEFECTO = {
+    ('marker', 'pattern', 'shape'): '',
+    ('marker', 'symbol'): 'circle',
+    ('line', 'dash'): 'solid',
+}
+
+# Entradas de la plantilla que solo usan los tipos de traza de cada subplot
+SUBPLOTS = {
+    'geo': {'scattergeo', 'choropleth'},
+    'mapbox': {'scattermapbox', 'choroplethmapbox', 'densitymapbox'},
+    'map': {'scattermap', 'choroplethmap', 'densitymap'},
+    'scene': {'scatter3d', 'surface', 'mesh3d', 'cone', 'streamtube', 'volume', 'isosurface'},
+    'polar': {'scatterpolar', 'scatterpolargl', 'barpolar'},
+    'ternary': {'scatterternary'},
+}
+
+# Bytes de cada gráfico antes y después de compactar: {nombre: (antes, después)}
+TAMANOS = {}
+
+
+def entero_minimo(valores):
+    """Convierte un array de enteros al tipo entero más pequeño que contiene sus valores."""
+    if valores.size == 0:
+        return valores
+    minimo, maximo = valores.min(), valores.max()
+    for tipo in (np.int8, np.int16, np.int32):
+        info = np.iinfo(tipo)
+        if info.min <= minimo and maximo <= info.max:
+            return valores.astype(tipo)
+    return valores
+
+
+def compactar_array(valores, atributo, decimales=DECIMALES_FIGURA):
+    """
+    Versión compacta de un array numérico de una traza.
+
+    Parámetros:
+    - valores: array de numpy
+    - atributo: nombre del atributo de la traza (último nivel, p. ej. 'y')
+    - decimales: decimales que se conservan de los flotantes
+
+    Retorna:
+    - array entero del tipo más pequeño si los valores redondeados son
+      enteros; si no, float32 para ATRIBUTOS_FLOAT32 y float64 para el resto
+    """
+    if valores.dtype.kind in 'iu':
+        return entero_minimo(valores)
+    if valores.dtype.kind != 'f' or valores.size == 0:
+        return valores
+    redondeados = np.round(valores, decimales)
+    if np.isfinite(redondeados).all() and (redondeados == np.trunc(redondeados)).all():
+        if np.abs(redondeados).max() <= np.iinfo(np.int32).max:
+            return entero_minimo(redondeados.astype(np.int64))
+    if atributo in ATRIBUTOS_FLOAT32:
+        return redondeados.astype(np.float32)
+    return redondeados
+
+
+def _arrays(valor, ruta=()):
+    """Recorre el JSON de una traza y retorna [(ruta, array)] de sus arrays numéricos."""
+    encontrados = []
+    for llave, hijo in valor.items():
+        if isinstance(hijo, dict):
+            if llave != 'geojson':
+                encontrados.extend(_arrays(hijo, ruta + (llave,)))
+        elif isinstance(hijo, np.ndarray) and hijo.dtype.kind in 'iuf':
+            encontrados.append((ruta + (llave,), hijo))
+    return encontrados
+
+
+def _buscar(valor, ruta):
+    for llave in ruta:
+        if not isinstance(valor, dict) or llave not in valor:
+            return None
+        valor = valor[llave]
+    return valor
+
+
+def podar_geojson(traza):
+    """GeoJSON de un mapa con solo los features de sus ubicaciones y sin las propiedades que no son la llave."""
+    llave = traza.featureidkey or 'id'
+    propiedad = llave[len('properties.'):] if llave.startswith('properties.') else None
+    ubicaciones = {str(ubicacion) for ubicacion in traza.locations}
+    features = []
+    for feature in traza.geojson.get('features', []):
+        identificador = feature.get('properties', {}).get(propiedad) if propiedad else feature.get('id')
+        if str(identificador) not in ubicaciones:
+            continue
+        nuevo = {'type': 'Feature', 'geometry': feature['geometry']}
+        if propiedad:
+            nuevo['properties'] = {propiedad: identificador}
+        else:
+            nuevo['id'] = identificador
+        features.append(nuevo)
+    return {'type': 'FeatureCollection', 'features': features}
+
+
+def podar_plantilla(fig):
+    """Plantilla de la figura con solo los tipos de traza y los subplots que usa."""
+    plantilla = fig.layout.template.to_plotly_json()
+    tipos = {traza.type for traza in fig.data}
+    plantilla['data'] = {tipo: trazas for tipo, trazas in plantilla.get('data', {}).items() if tipo in tipos}
+    layout = plantilla.get('layout', {})
+    for subplot, tipos_subplot in SUBPLOTS.items():
+        if not tipos & tipos_subplot:
+            layout.pop(subplot, None)
+    return plantilla
+
+
+def compactar(fig, nombre=None, decimales=DECIMALES_FIGURA):
+    """
+    Reduce en el lugar los bytes que ocupa la figura en el navegador.
+
+    Parámetros:
+    - fig: figura de Plotly (o None)
+    - nombre: nombre del gráfico para TAMANOS (la key del gráfico)
+    - decimales: decimales que se conservan de los flotantes
+
+    Retorna:
+    - la misma figura
+    """
+    if fig is None:
+        return fig
+    antes = bytes_figura(fig)
+
+    fig.layout.template = podar_plantilla(fig)
+    for traza in fig.data:
+        contenido = traza.to_plotly_json()
+        for ruta, valores in _arrays(contenido):
+            traza['.'.join(ruta)] = compactar_array(valores, ruta[-1], decimales)
+        for ruta, defecto in ATRIBUTOS_POR_DEFECTO.items():
+            if _buscar(contenido, ruta) == defecto:
+                traza['.'.join(ruta)] = None
+        if isinstance(contenido.get('geojson'), dict) and contenido.get('locations') is not None:
+            traza.geojson = podar_geojson(traza)
+
+    despues = bytes_figura(fig)
+    if nombre is not None:
+        TAMANOS[nombre] = (antes, despues)
+    logger.info("Figura %s: %d -> %d bytes", nombre, antes, despues)
+    return fig
+
+
+def reporte_tamanos():
+    """DataFrame con los bytes de cada gráfico antes y después de compactar."""
+    reporte = pd.DataFrame(
+        [(nombre, antes, despues) for nombre, (antes, despues) in TAMANOS.items()],
+        columns=['GRAFICO', 'BYTES_ANTES', 'BYTES_DESPUES']
+    )
+    reporte['REDUCCION_PCT'] = (1 - reporte['BYTES_DESPUES'] / reporte['BYTES_ANTES']) * 100
+    return reporte
@@ -0,0 +1,319 @@
+"""
+Almacén local de geometrías de los departamentos para los mapas coropléticos.
+
+El GeoJSON de Colombia se descarga una sola vez al desplegar, se renombran los
+departamentos a los nombres del CSV de cobertura (NOMBRE_DPT y el id de cada
+feature) y se guardan variantes simplificadas con Douglas-Peucker y
+coordenadas cuantizadas (redondeadas a pocos decimales). El dashboard carga
+la variante configurada solo cuando se dibujan los mapas; si el almacén no se
+construyó al desplegar, lo construye (una vez) la primera vez que se pide.
+
+Uso:
+    python -m dashboard_code.geometria [origen]
+
+`origen` puede ser una URL o un archivo GeoJSON local (por defecto url_geojson).
+"""
+
+import json
+import logging
+import sys
+import threading
+import time
+from functools import lru_cache
+from pathlib import Path
+from urllib.request import urlopen
+
+import numpy as np
+import pandas as pd
+
+from dashboard_code.cache import escribir_atomico, huella_archivo
+from dashboard_code.config import DIR_GEOMETRIA
+
+logger = logging.getLogger(__name__)
+
+# GeoJSON de Colombia
+url_geojson = 'https://gist.githubusercontent.com/john-guerra/43c7656821069d00dcbc/raw/be6a6e239cd5b5b803c6e7c2ec405b793a9064dd/Colombia.geo.json'
+
+# Mapeo de nombres de departamentos
+mapeo_nombres = {
+    'ARCHIPIELAGO DE SAN ANDRES PROVIDENCIA Y SANTA CATALINA': 'SAN ANDRES',
+    'SANTAFE DE BOGOTA D.C': 'BOGOTÁ. D.C.',
+    'AMAZONAS': 'AMAZONAS',
+    'ANTIOQUIA': 'ANTIOQUIA',
+    'ARAUCA': 'ARAUCA',
+    'ATLANTICO': 'ATLÁNTICO',
+    'BOLIVAR': 'BOLÍVAR',
+    'BOYACA': 'BOYACÁ',
+    'CALDAS': 'CALDAS',
+    'CAQUETA': 'CAQUETÁ',
+    'CASANARE': 'CASANARE',
+    'CAUCA': 'CAUCA',
+    'CESAR': 'CESAR',
+    'CHOCO': 'CHOCÓ',
+    'CORDOBA': 'CÓRDOBA',
+    'CUNDINAMARCA': 'CUNDINAMARCA',
+    'GUAINIA': 'GUAINÍA',
+    'GUAVIARE': 'GUAVIARE',
+    'HUILA': 'HUILA',
+    'LA GUAJIRA': 'LA GUAJIRA',
+    'MAGDALENA': 'MAGDALENA',
+    'META': 'META',
+    'NARIÑO': 'NARIÑO',
+    'NORTE DE SANTANDER': 'NORTE DE SANTANDER',
+    'PUTUMAYO': 'PUTUMAYO',
+    'QUINDIO': 'QUINDÍO',
+    'RISARALDA': 'RISARALDA',
+    'SANTANDER': 'SANTANDER',
+    'SUCRE': 'SUCRE',
+    'TOLIMA': 'TOLIMA',
+    'VALLE DEL CAUCA': 'VALLE DEL CAUCA',
+    'VAUPES': 'VAUPÉS',
+    'VICHADA': 'VICHADA'
+}
+
+# Variante -> (tolerancia de Douglas-Peucker en grados, decimales de las coordenadas).
+# 0.001° son unos 110 m en Colombia; los decimales se eligen acordes a la tolerancia.
+VARIANTES = {
+    'original': (0.0, 6),
+    'alta': (0.001, 4),
+    'media': (0.005, 3),
+    'baja': (0.02, 2),
+}
+
+
+class ErrorGeometria(RuntimeError):
+    """No se pudo construir o cargar el almacén de geometrías."""
+
+
+def ruta_variante(variante, directorio=DIR_GEOMETRIA):
+    if variante not in VARIANTES:
+        raise ErrorGeometria(f"Variante desconocida: {variante}. Opciones: {list(VARIANTES)}")
+    return Path(directorio) / f'colombia_{variante}.geo.json'
+
+
+# ============================================================================
+# SIMPLIFICACIÓN Y CUANTIZACIÓN
+# ============================================================================
+
+def douglas_peucker(puntos, tolerancia):
+    """
+    Simplifica una línea (array N x 2) con Douglas-Peucker.
+
+    Retorna:
+    - array con los puntos conservados (siempre incluye el primero y el último)
+    """
+    n = len(puntos)
+    if tolerancia <= 0 or n < 3:
+        return puntos
+    conservar = np.zeros(n, dtype=bool)
+    conservar[0] = conservar[-1] = True
+    pendientes = [(0, n - 1)]
+    while pendientes:
+        inicio, fin = pendientes.pop()
+        if fin - inicio < 2:
+            continue
+        a, b = puntos[inicio], puntos[fin]
+        tramo = puntos[inicio + 1:fin]
+        direccion = b - a
+        largo = np.hypot(*direccion)
+        if largo == 0:
+            distancias = np.hypot(*(tramo - a).T)
+        else:
+            distancias = np.abs(direccion[0] * (tramo[:, 1] - a[1]) - direccion[1] * (tramo[:, 0] - a[0])) / largo
+        mayor = int(np.argmax(distancias))
+        if distancias[mayor] > tolerancia:
+            medio = inicio + 1 + mayor
+            conservar[medio] = True
+            pendientes.append((inicio, medio))
+            pendientes.append((medio, fin))
+    return puntos[conservar]
+
+
+def simplificar_anillo(anillo, tolerancia, decimales):
+    """Simplifica y cuantiza un anillo cerrado; si quedaría degenerado se conserva cuantizado sin simplificar."""
+    puntos = np.asarray(anillo, dtype=np.float64)
+    simplificado = douglas_peucker(puntos, tolerancia)
+    if len(simplificado) < 4:
+        simplificado = puntos
+    cuantizado = np.round(simplificado, decimales)
+    # Quitar puntos consecutivos repetidos que deja el redondeo
+    distinto = np.ones(len(cuantizado), dtype=bool)
+    distinto[1:] = np.any(cuantizado[1:] != cuantizado[:-1], axis=1)
+    cuantizado = cuantizado[distinto]
+    if len(cuantizado) < 4:
+        cuantizado = np.round(puntos, decimales)
+    return cuantizado.tolist()
+
+
+def simplificar_geometria(geometria, tolerancia, decimales):
+    tipo = geometria['type']
+    if tipo == 'Polygon':
+        poligonos = [geometria['coordinates']]
+    elif tipo == 'MultiPolygon':
+        poligonos = geometria['coordinates']
+    else:
+        return geometria
+    resultado = [[simplificar_anillo(anillo, tolerancia, decimales) for anillo in poligono] for poligono in poligonos]
+    if tipo == 'Polygon':
+        return {'type': tipo, 'coordinates': resultado[0]}
+    return {'type': tipo, 'coordinates': resultado}
+
+
+def contar_puntos(geojson):
+    total = 0
+    for feature in geojson['features']:
+        geometria = feature['geometry']
+        poligonos = [geometria['coordinates']] if geometria['type'] == 'Polygon' else geometria['coordinates']
+        total += sum(len(anillo) for poligono in poligonos for anillo in poligono)
+    return total
+
+
+# ============================================================================
+# CONSTRUCCIÓN DEL ALMACÉN
+# ============================================================================
+
+def leer_origen(origen):
+    """Lee el GeoJSON desde una URL o un archivo local."""
+    if str(origen).startswith(('http://', 'https://')):
+        with urlopen(origen, timeout=30) as response:
+            return json.load(response)
+    return json.loads(Path(origen).read_text(encoding='utf-8'))
+
+
+def nombrar_departamentos(geojson):
+    """Renombra NOMBRE_DPT a los nombres del CSV de cobertura y lo usa como id de cada feature."""
+    for feature in geojson['features']:
+        nombre_geojson = feature['properties']['NOMBRE_DPT']
+        if nombre_geojson in mapeo_nombres:
+            feature['properties']['NOMBRE_DPT'] = mapeo_nombres[nombre_geojson]
+        feature['id'] = feature['properties']['NOMBRE_DPT']
+    return geojson
+
+
+def construir(origen=url_geojson, directorio=DIR_GEOMETRIA):
+    """
+    Descarga (o lee) el GeoJSON una vez y escribe todas las variantes.
+
+    Solo se conservan las propiedades NOMBRE_DPT y DPTO, que son las que usan
+    los mapas.
+
+    Retorna:
+    - dict {variante: ruta del archivo escrito}
+    """
+    try:
+        geojson = nombrar_departamentos(leer_origen(origen))
+    except Exception as e:
+        raise ErrorGeometria(f"No se pudo leer el GeoJSON de {origen}: {e}") from e
+
+    directorio = Path(directorio)
+    directorio.mkdir(parents=True, exist_ok=True)
+    rutas = {}
+    for variante, (tolerancia, decimales) in VARIANTES.items():
+        variante_geojson = {
+            'type': 'FeatureCollection',
+            'features': [
+                {
+                    'type': 'Feature',
+                    'id': feature['id'],
+                    'properties': {
+                        k: v for k, v in feature['properties'].items() if k in ('NOMBRE_DPT', 'DPTO')
+                    },
+                    'geometry': simplificar_geometria(feature['geometry'], tolerancia, decimales),
+                }
+                for feature in geojson['features']
+            ],
+        }
+        texto = json.dumps(variante_geojson, ensure_ascii=False, separators=(',', ':'))
+        rutas[variante] = ruta_variante(variante, directorio)
+        escribir_atomico(rutas[variante], lambda r: r.write_text(texto, encoding='utf-8'))
+        logger.info(
+            "Geometría %-8s %8d puntos %10d bytes",
+            variante, contar_puntos(variante_geojson), rutas[variante].stat().st_size
+        )
+    return rutas
+
+
+# ============================================================================
+# CARGA
+# ============================================================================
+
+class GeoJSON(dict):
+    """
+    GeoJSON cargado del almacén. `huella` (ruta, tamaño y fecha del
+    archivo) lo identifica en la caché de figuras sin recorrer las coordenadas.
+    """
+
+    huella = None
+
+
+# Un solo hilo construye el almacén si falta
+_candado_construccion = threading.Lock()
+
+
+@lru_cache(maxsize=None)
+def _leer_variante(variante, directorio):
+    """
+    Lee una variante del almacén. Solo se recuerdan las lecturas exitosas
+    (lru_cache no guarda excepciones): si falla, la siguiente llamada lo
+    intenta de nuevo.
+    """
+    ruta = ruta_variante(variante, directorio)
+    inicio = time.perf_counter()
+    try:
+        geojson = GeoJSON(json.loads(ruta.read_text(encoding='utf-8')))
+        geojson.huella = {'ruta': str(ruta), **huella_archivo(ruta, con_hash=False)}
+    except (OSError, ValueError) as e:
+        raise ErrorGeometria(f"No se pudo leer {ruta}: {e}") from e
+    logger.info(
+        "Geometría %s cargada (%d bytes) en %.3f s",
+        variante, ruta.stat().st_size, time.perf_counter() - inicio
+    )
+    return geojson
+
+
+def cargar(variante='media', directorio=DIR_GEOMETRIA):
+    """
+    Carga una variante del almacén (una sola vez por proceso). Si el almacén
+    no se construyó al desplegar (`python -m dashboard_code.geometria`), se
+    construye aquí desde url_geojson antes de leerlo.
+
+    Lanza ErrorGeometria si la variante no se puede construir ni leer; el
+    fallo no se recuerda y la siguiente llamada lo intenta de nuevo.
+    """
+    ruta = ruta_variante(variante, directorio)
+    if not ruta.exists():
+        with _candado_construccion:
+            if not ruta.exists():
+                logger.warning("No existe %s: se construye el almacén de geometrías desde %s", ruta, url_geojson)
+                construir(url_geojson, directorio)
+    return _leer_variante(variante, str(directorio))
+
+
+def medir(directorio=DIR_GEOMETRIA):
+    """Retorna un DataFrame con el tamaño, los puntos y el tiempo de carga de cada variante guardada."""
+    filas = []
+    for variante, (tolerancia, decimales) in VARIANTES.items():
+        ruta = ruta_variante(variante, directorio)
+        if not ruta.exists():
+            continue
+        inicio = time.perf_counter()
+        geojson = json.loads(ruta.read_text(encoding='utf-8'))
+        filas.append({
+            'VARIANTE': variante,
+            'TOLERANCIA': tolerancia,
+            'DECIMALES': decimales,
+            'BYTES': ruta.stat().st_size,
+            'PUNTOS': contar_puntos(geojson),
+            'SEGUNDOS_CARGA': time.perf_counter() - inicio,
+        })
+    return pd.DataFrame(filas)
+
+
+def main(argumentos):
+    logging.basicConfig(level=logging.INFO, format='%(levelname)s %(name)s: %(message)s')
+    construir(argumentos[0] if argumentos else url_geojson)
+    print(medir().to_string(index=False))
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
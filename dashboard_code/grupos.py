@@ -0,0 +1,306 @@
+"""
+Kernels de NumPy por grupo para los análisis de predominancia.
+
+Reemplazan `groupby(...).idxmax()` seguido de `.loc` y las agregaciones con
+`lambda x: x.value_counts().idxmax()` (una llamada de Python por grupo):
+
+- Los códigos de grupo salen de un solo ordenamiento de una llave entera
+  compuesta (los códigos de cada columna en base mixta), en el orden de las
+  llaves como `groupby(sort=True)`.
+- argmax/argmin por grupo se resuelven con reducciones dispersas (ufunc.at)
+  en tiempo lineal: el extremo de cada grupo y luego la primera fila que lo
+  alcanza, sin ordenar.
+- La moda cuenta los pares (grupo, valor) (con bincount si caben en un
+  arreglo denso) y toma el par más frecuente de cada grupo.
+- top-k repite k veces el argmax sobre las filas que quedan.
+
+Uso (comparación con la implementación con pandas):
+    python -m dashboard_code.grupos [repeticiones]
+"""
+
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+# Máximo de la llave compuesta (si no cabe se ordena por columnas)
+MAX_LLAVE_COMPUESTA = 2 ** 62
+
+
+def _codigos_columna(serie):
+    """Códigos enteros (>= 0, en el orden de los valores) y cantidad de códigos de una columna."""
+    if isinstance(serie.dtype, pd.CategoricalDtype):
+        return serie.cat.codes.to_numpy().astype(np.int64), len(serie.cat.categories)
+    valores = serie.to_numpy()
+    if np.issubdtype(valores.dtype, np.integer) and len(valores):
+        minimo = int(valores.min())
+        return valores.astype(np.int64) - minimo, int(valores.max()) - minimo + 1
+    codigos, unicos = pd.factorize(serie, sort=True)
+    return codigos.astype(np.int64), len(unicos)
+
+
+def codigos_grupo(df, llaves):
+    """
+    Código de grupo de cada fila según las columnas `llaves`.
+
+    Retorna:
+    - (codigos, representantes): array con el grupo de cada fila (0..G-1, en
+      el orden de las llaves) y la posición de una fila de cada grupo (para
+      leer sus llaves con `df.iloc[representantes]`)
+    """
+    columnas = [_codigos_columna(df[llave]) for llave in llaves]
+    if np.prod([float(max(tamano, 1)) for _, tamano in columnas]) < MAX_LLAVE_COMPUESTA:
+        compuesta = np.zeros(len(df), dtype=np.int64)
+        for codigos, tamano in columnas:
+            compuesta = compuesta * tamano + codigos
+        orden = np.argsort(compuesta)
+        ordenadas = [compuesta[orden]]
+    else:
+        orden = np.lexsort([codigos for codigos, _ in columnas][::-1])
+        ordenadas = [codigos[orden] for codigos, _ in columnas]
+    cambio = np.ones(len(orden), dtype=bool)
+    cambio[1:] = np.any([ordenada[1:] != ordenada[:-1] for ordenada in ordenadas], axis=0)
+    codigos = np.empty(len(orden), dtype=np.int64)
+    codigos[orden] = np.cumsum(cambio) - 1
+    return codigos, orden[cambio]
+
+
+def _extremo(grupos, valores, n_grupos, maximo, desempate):
+    """
+    Posición del extremo de cada grupo (ignora faltantes): entre los empatados
+    gana el menor desempate y luego la primera posición. Los grupos sin
+    valores quedan con la posición len(valores).
+    """
+    extremo = np.full(n_grupos, -np.inf if maximo else np.inf)
+    (np.fmax if maximo else np.fmin).at(extremo, grupos, valores)
+    candidatas = np.flatnonzero(valores == extremo[grupos])
+
+    if desempate is not None:
+        clave = desempate[candidatas]
+        menor = np.full(n_grupos, np.iinfo(np.int64).max, dtype=np.int64)
+        np.minimum.at(menor, grupos[candidatas], clave)
+        candidatas = candidatas[clave == menor[grupos[candidatas]]]
+
+    posiciones = np.full(n_grupos, len(valores), dtype=np.int64)
+    np.minimum.at(posiciones, grupos[candidatas], candidatas)
+    return posiciones
+
+
+def _extremo_por_grupo(grupos, valores, maximo, desempate):
+    grupos = np.asarray(grupos, dtype=np.int64)
+    valores = np.asarray(valores, dtype=np.float64)
+    if desempate is not None:
+        desempate = np.asarray(desempate, dtype=np.int64)
+    n_grupos = int(grupos.max()) + 1 if len(grupos) else 0
+    posiciones = _extremo(grupos, valores, n_grupos, maximo, desempate)
+    # Como groupby().idxmax(): error si un grupo solo tiene faltantes
+    if (posiciones == len(valores)).any():
+        raise ValueError("Un grupo tiene todos los valores faltantes")
+    return posiciones
+
+
+def argmax_grupo(grupos, valores, desempate=None):
+    """
+    Posición del máximo de `valores` en cada grupo (ignora faltantes).
+
+    Parámetros:
+    - grupos: códigos de grupo de cada fila (0..G-1, todos presentes)
+    - valores: valores numéricos de cada fila
+    - desempate: clave entera entre filas con el mismo valor (gana la menor y
+      luego la primera); por defecto la posición, como idxmax()
+
+    Retorna:
+    - array de posiciones, una por grupo y en el orden de los códigos
+    """
+    return _extremo_por_grupo(grupos, valores, True, desempate)
+
+
+def argmin_grupo(grupos, valores, desempate=None):
+    """Posición del mínimo de `valores` en cada grupo (mismos parámetros que argmax_grupo)."""
+    return _extremo_por_grupo(grupos, valores, False, desempate)
+
+
+def top_k_grupo(grupos, valores, k):
+    """
+    Posiciones de los `k` mayores valores de cada grupo, ordenadas por grupo y
+    luego de mayor a menor (empates por posición y faltantes al final, como
+    `sort_values(kind='stable')` seguido de `groupby().head(k)`).
+
+    Son k pasadas de argmax sobre las filas que quedan, así que conviene
+    para k pequeño.
+    """
+    grupos = np.asarray(grupos, dtype=np.int64)
+    valores = np.asarray(valores, dtype=np.float64)
+    n = len(valores)
+    n_grupos = int(grupos.max()) + 1 if n else 0
+    # Los faltantes empatan en -inf y pierden el desempate con los valores reales
+    faltantes = np.isnan(valores)
+    llenos = np.where(faltantes, -np.inf, valores)
+    desempate = faltantes.astype(np.int64) * n + np.arange(n)
+
+    seleccion = np.full((n_grupos, k), n, dtype=np.int64)
+    disponibles = np.arange(n)
+    for paso in range(k):
+        if not len(disponibles):
+            break
+        posiciones = _extremo(
+            grupos[disponibles], llenos[disponibles], n_grupos, True, desempate[disponibles]
+        )
+        elegidas = posiciones[posiciones < len(disponibles)]
+        seleccion[posiciones < len(disponibles), paso] = disponibles[elegidas]
+        disponibles = np.delete(disponibles, elegidas)
+    plano = seleccion.ravel()
+    return plano[plano < n]
+
+
+def moda_grupo(grupos, valores):
+    """
+    Valor más frecuente de cada grupo; entre los empatados gana el que
+    aparece primero en el grupo.
+
+    Parámetros:
+    - grupos: códigos de grupo de cada fila (0..G-1, todos presentes)
+    - valores: códigos enteros (>= 0) de los valores de cada fila
+
+    Retorna:
+    - array con el código más frecuente de cada grupo
+    """
+    grupos = np.asarray(grupos, dtype=np.int64)
+    valores = np.asarray(valores, dtype=np.int64)
+    distintos = int(valores.max()) + 1 if len(valores) else 1
+    n_grupos = int(grupos.max()) + 1 if len(grupos) else 0
+    llave = grupos * distintos + valores
+    if n_grupos * distintos <= len(llave):
+        # Pocos pares posibles: conteos densos sin ordenar
+        conteos = np.bincount(llave, minlength=n_grupos * distintos)
+        primera = np.full(len(conteos), len(llave), dtype=np.int64)
+        np.minimum.at(primera, llave, np.arange(len(llave)))
+        pares = np.flatnonzero(conteos)
+        conteos, primera = conteos[pares], primera[pares]
+    else:
+        pares, primera, conteos = np.unique(llave, return_index=True, return_counts=True)
+    grupo_par, valor_par = np.divmod(pares, distintos)
+    return valor_par[argmax_grupo(grupo_par, conteos, primera)]
+
+
+def moda_serie(grupos, serie):
+    """
+    Moda de una Series por grupo, con el mismo desempate que
+    `serie.value_counts().idxmax()` sobre valores sin categorías: el valor que
+    aparece primero. Una Series categórica (modo compacto) da el mismo
+    resultado que sin compactar.
+
+    Retorna:
+    - array de valores (del mismo tipo que la Series), uno por grupo
+    """
+    if isinstance(serie.dtype, pd.CategoricalDtype):
+        moda = moda_grupo(grupos, serie.cat.codes.to_numpy())
+        return pd.Categorical.from_codes(moda, dtype=serie.dtype)
+    codigos, valores = pd.factorize(serie)
+    return valores.take(moda_grupo(grupos, codigos)).array
+
+
+# ============================================================================
+# COMPARACIÓN CON PANDAS
+# ============================================================================
+
+def _pandas_argmax(df, llaves, columna):
+    return df.loc[df.groupby(llaves, observed=True)[columna].idxmax()]
+
+
+def _numpy_argmax(df, llaves, columna):
+    codigos, _ = codigos_grupo(df, llaves)
+    return df.iloc[argmax_grupo(codigos, df[columna].to_numpy())]
+
+
+def _pandas_moda(df, llave, columna):
+    # El código original: value_counts() desempata por orden de aparición. Una
+    # columna categórica (modo compacto) se compara con sus valores sin
+    # compactar, que es lo que promete moda_serie
+    valores = df[columna]
+    if isinstance(valores.dtype, pd.CategoricalDtype):
+        valores = valores.astype(valores.cat.categories.dtype)
+    moda = valores.groupby(df[llave], observed=True).agg(lambda x: x.value_counts().idxmax())
+    return moda.astype(df[columna].dtype)
+
+
+def _numpy_moda(df, llave, columna):
+    codigos, representantes = codigos_grupo(df, [llave])
+    indice = pd.Index(df[llave].iloc[representantes], name=llave)
+    return pd.Series(moda_serie(codigos, df[columna]), index=indice, name=columna)
+
+
+def _pandas_top_k(df, llaves, columna, k):
+    return df.sort_values(columna, ascending=False, kind='stable').groupby(llaves, observed=True).head(k)
+
+
+def _numpy_top_k(df, llaves, columna, k):
+    codigos, _ = codigos_grupo(df, llaves)
+    return df.iloc[top_k_grupo(codigos, df[columna].to_numpy(), k)]
+
+
+def _tiempo(funcion, repeticiones):
+    mejor = float('inf')
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        resultado = funcion()
+        mejor = min(mejor, time.perf_counter() - inicio)
+    return mejor, resultado
+
+
+def medir(actual_por_cpob, repeticiones=5):
+    """
+    Compara los kernels con la implementación con pandas sobre el resumen por
+    CPOB y tecnología del periodo actual.
+
+    Retorna:
+    - DataFrame con el mejor tiempo de cada implementación, la aceleración y
+      si los resultados son idénticos
+    """
+    llaves_cpob = ['ID_PERIODO', 'ID_DEPARTAMENTO', 'ID_MUNICIPIO', 'ID_CPOB']
+    casos = {
+        'argmax por CPOB': (
+            lambda: _pandas_argmax(actual_por_cpob, llaves_cpob, 'AREA_COB_MAX'),
+            lambda: _numpy_argmax(actual_por_cpob, llaves_cpob, 'AREA_COB_MAX'),
+        ),
+        'moda por departamento': (
+            lambda: _pandas_moda(actual_por_cpob, 'ID_DEPARTAMENTO', 'OPERADOR_MAX'),
+            lambda: _numpy_moda(actual_por_cpob, 'ID_DEPARTAMENTO', 'OPERADOR_MAX'),
+        ),
+        'moda por municipio': (
+            lambda: _pandas_moda(actual_por_cpob, 'ID_MUNICIPIO', 'OPERADOR_MAX'),
+            lambda: _numpy_moda(actual_por_cpob, 'ID_MUNICIPIO', 'OPERADOR_MAX'),
+        ),
+        'top 3 por municipio': (
+            lambda: _pandas_top_k(actual_por_cpob, ['ID_DEPARTAMENTO', 'ID_MUNICIPIO'], 'AREA_COB_MAX', 3),
+            lambda: _numpy_top_k(actual_por_cpob, ['ID_DEPARTAMENTO', 'ID_MUNICIPIO'], 'AREA_COB_MAX', 3),
+        ),
+    }
+    filas = []
+    for caso, (con_pandas, con_numpy) in casos.items():
+        segundos_pandas, esperado = _tiempo(con_pandas, repeticiones)
+        segundos_numpy, obtenido = _tiempo(con_numpy, repeticiones)
+        if caso.startswith('top'):
+            # groupby().head() conserva el orden global; los kernels agrupan
+            esperado = esperado.sort_index()
+            obtenido = obtenido.sort_index()
+        filas.append({
+            'CASO': caso,
+            'FILAS': len(actual_por_cpob),
+            'SEGUNDOS_PANDAS': segundos_pandas,
+            'SEGUNDOS_NUMPY': segundos_numpy,
+            'ACELERACION': segundos_pandas / segundos_numpy,
+            'IDENTICO': esperado.equals(obtenido),
+        })
+    return pd.DataFrame(filas)
+
+
+def main(argumentos):
+    from dashboard_code.read_csv import registro
+    repeticiones = int(argumentos[0]) if argumentos else 5
+    print(medir(registro.obtener('actual_por_cpob'), repeticiones).to_string(index=False))
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,32 @@
+"""
+Carga incremental de un trimestre nuevo en la base particionada.
+
+Uso:
+    python -m dashboard_code.incremental <csv_nuevo> [carpeta_base]
+
+El CSV puede traer solo las filas del trimestre publicado (o todo el histórico
+la primera vez). Cada periodo se valida como nuevo, se guarda como una
+partición y se calculan solo sus agregados; los periodos ya cargados se
+reutilizan tal cual.
+"""
+
+import logging
+import sys
+
+from dashboard_code.config import DIR_BASE
+from dashboard_code.read_csv import actualizar_base
+
+
+def main(argumentos):
+    logging.basicConfig(level=logging.INFO, format='%(levelname)s %(name)s: %(message)s')
+    if not argumentos:
+        print(__doc__)
+        return 1
+    directorio = argumentos[1] if len(argumentos) > 1 else DIR_BASE
+    periodos = actualizar_base(argumentos[0], directorio)
+    print(f"Periodos agregados a {directorio}: {', '.join(f'{p // 10}-T{p % 10}' for p in periodos)}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
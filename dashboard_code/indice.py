@@ -0,0 +1,81 @@
+"""
+Índice invertido de bitmaps para los filtros del sidebar.
+
+Para cada valor de ANNO, TRIMESTRE, DEPARTAMENTO y TECNOLOGIA se guarda un
+bitmap empaquetado (np.packbits, un bit por fila). Una selección del sidebar
+se resuelve con OR entre los valores elegidos de una columna y AND entre
+columnas, y solo al final se convierte en posiciones de fila. El DataFrame se
+recorta una sola vez con esas posiciones, en lugar de copiarlo completo y
+aplicar una máscara por filtro.
+"""
+
+import numpy as np
+import pandas as pd
+
+# Columnas indexadas (las de los filtros del sidebar)
+COLUMNAS_INDICE = ['ANNO', 'TRIMESTRE', 'DEPARTAMENTO', 'TECNOLOGIA']
+
+
+class IndiceBitmap:
+    """
+    Bitmaps por valor de las columnas de filtro de un DataFrame.
+
+    Parámetros:
+    - df: DataFrame a indexar (el índice guarda posiciones, no etiquetas)
+    - columnas: columnas a indexar
+    """
+
+    def __init__(self, df, columnas=COLUMNAS_INDICE):
+        self.filas = len(df)
+        self.bitmaps = {}
+        for columna in columnas:
+            codigos, valores = pd.factorize(df[columna], sort=True)
+            self.bitmaps[columna] = {
+                valor: np.packbits(codigos == k) for k, valor in enumerate(valores)
+            }
+        self._todos = np.packbits(np.ones(self.filas, dtype=bool))
+        self._ninguno = np.zeros_like(self._todos)
+
+    def valores(self, columna):
+        """Valores distintos de una columna indexada, ordenados."""
+        return list(self.bitmaps[columna])
+
+    def bitmap(self, columna, valores):
+        """OR de los bitmaps de `valores` en `columna` (valores desconocidos no suman filas)."""
+        resultado = self._ninguno.copy()
+        por_valor = self.bitmaps[columna]
+        for valor in valores:
+            if valor in por_valor:
+                np.bitwise_or(resultado, por_valor[valor], out=resultado)
+        return resultado
+
+    def seleccion(self, filtros, inicial=None):
+        """
+        AND de los filtros {columna: valores}. Un filtro con valores None se
+        ignora (todas las filas). Retorna el bitmap empaquetado.
+        """
+        resultado = (self._todos if inicial is None else inicial).copy()
+        for columna, valores in filtros.items():
+            if valores is None:
+                continue
+            np.bitwise_and(resultado, self.bitmap(columna, valores), out=resultado)
+        return resultado
+
+    def posiciones(self, bitmap):
+        """Posiciones de fila (ordenadas) marcadas en un bitmap."""
+        return np.flatnonzero(np.unpackbits(bitmap, count=self.filas))
+
+    def completo(self, bitmap):
+        return bool(np.array_equal(bitmap, self._todos))
+
+    def aplicar(self, df, bitmap, limite=None):
+        """
+        Filas de df marcadas en el bitmap, las primeras `limite` si se indica.
+        Si están todas se retorna df (o sus primeras filas) sin copiar.
+        """
+        if self.completo(bitmap):
+            return df if limite is None else df.iloc[:limite]
+        return df.take(self.posiciones(bitmap)[:limite])
+
+    def bytes_en_memoria(self):
+        return sum(b.nbytes for por_valor in self.bitmaps.values() for b in por_valor.values())
@@ -0,0 +1,358 @@
+"""
+Instantánea de solo lectura de los DataFrames en Arrow IPC mapeados en memoria.
+
+Con varios procesos de Streamlit por máquina, cada uno guarda su propia copia
+del DataFrame base y de los derivados. La instantánea publica esos DataFrames
+una sola vez como archivos Arrow IPC sin comprimir (uno por nodo) en una
+carpeta compartida; cada proceso los abre con mmap y pandas usa directamente
+los buffers del archivo, así que las páginas quedan en la caché de páginas del
+sistema y se comparten entre procesos en lugar de duplicarse.
+
+La carpeta de cada instantánea se nombra con una clave que depende de la
+huella de la fuente, la versión de la limpieza, el modo compacto y los nodos
+incluidos: si algo cambia se publica una instantánea nueva. El primer proceso
+la construye (con un candado de archivo para que los demás esperen) y la
+renombra a su nombre final cuando está completa. Cada proceso que la usa
+tiene un candado compartido sobre ella; cuando la suelta (una recarga publicó
+otra versión) la carpeta se borra si ya ningún proceso la usa.
+
+Las columnas numéricas sin faltantes, las float (los NaN se guardan como
+valores y no como nulos de Arrow) y los textos se leen sin copiar; los
+códigos de las categóricas sí se copian. `python -m dashboard_code.instantanea
+[pid ...] [--carpeta ruta]` muestra la memoria de cada proceso y cuánta de
+ella son páginas de la instantánea compartidas.
+"""
+
+import contextlib
+import hashlib
+import json
+import logging
+import os
+import shutil
+import sys
+import threading
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from dashboard_code.cache import huella_archivo
+
+logger = logging.getLogger(__name__)
+
+EXTENSION = '.arrow'
+MANIFIESTO = 'manifiesto.json'
+
+# Cambia cuando cambia el formato de los archivos de la instantánea
+VERSION_FORMATO = 2
+
+# Campos de /proc/<pid>/smaps_rollup que se reportan (en kB en el archivo)
+CAMPOS_MEMORIA = ['Rss', 'Pss', 'Shared_Clean', 'Shared_Dirty', 'Private_Clean', 'Private_Dirty', 'Anonymous']
+
+# Candados compartidos de las instantáneas que usa este proceso: {carpeta: [archivo, ...]}
+_retenidas = {}
+_candado_retenidas = threading.Lock()
+
+
+def huella_fuente(ruta, con_hash=True):
+    """
+    Huella de la fuente: la del CSV (con_hash=False omite el hash del
+    contenido), o tamaño y fecha de cada archivo de una base particionada.
+    """
+    ruta = Path(ruta)
+    if ruta.is_dir():
+        return {
+            'archivos': [
+                [str(archivo.relative_to(ruta)), archivo.stat().st_size, archivo.stat().st_mtime_ns]
+                for archivo in sorted(ruta.rglob('*')) if archivo.is_file()
+            ]
+        }
+    return huella_archivo(ruta, con_hash=con_hash)
+
+
+def clave_instantanea(huella, version, compacto, nombres):
+    """Nombre de la carpeta de la instantánea para una fuente, una limpieza y un conjunto de nodos."""
+    contenido = json.dumps({
+        'formato': VERSION_FORMATO,
+        'huella': huella,
+        'version': version,
+        'compacto': compacto,
+        'nodos': sorted(nombres),
+    }, sort_keys=True)
+    return hashlib.blake2b(contenido.encode('utf-8'), digest_size=10).hexdigest()
+
+
+# ============================================================================
+# ESCRITURA Y LECTURA
+# ============================================================================
+
+def a_tabla(frame):
+    """
+    Convierte un DataFrame en tabla de Arrow. Las columnas float conservan los
+    NaN como valores (sin máscara de nulos) para que se lean sin copiar.
+    """
+    import pyarrow as pa
+
+    tabla = pa.Table.from_pandas(frame)
+    for nombre in frame.columns:
+        serie = frame[nombre]
+        if isinstance(serie.dtype, np.dtype) and serie.dtype.kind == 'f':
+            posicion = tabla.schema.get_field_index(str(nombre))
+            tabla = tabla.set_column(
+                posicion, tabla.schema.field(posicion), pa.array(serie.to_numpy(), from_pandas=False)
+            )
+    return tabla
+
+
+def escribir(ruta, valor):
+    """
+    Escribe un DataFrame o una Series en un archivo Arrow IPC.
+
+    Retorna:
+    - dict con el tipo ('frame' o 'serie') y el nombre de la Series
+    """
+    import pyarrow as pa
+
+    if isinstance(valor, pd.Series):
+        descripcion = {'tipo': 'serie', 'nombre': valor.name}
+        frame = valor.to_frame(name='__valores__')
+    else:
+        descripcion = {'tipo': 'frame'}
+        frame = valor
+    tabla = a_tabla(frame)
+    with pa.OSFile(str(ruta), 'wb') as archivo, pa.ipc.new_file(archivo, tabla.schema) as escritor:
+        escritor.write_table(tabla)
+    return descripcion
+
+
+def leer(ruta, descripcion):
+    """Abre un archivo de la instantánea con mmap y lo convierte a pandas sin copiar las columnas."""
+    import pyarrow as pa
+
+    tabla = pa.ipc.open_file(pa.memory_map(str(ruta))).read_all()
+    # split_blocks evita consolidar las columnas en bloques 2D (lo que copiaría)
+    frame = tabla.to_pandas(split_blocks=True)
+    if descripcion['tipo'] == 'serie':
+        return frame['__valores__'].rename(descripcion['nombre'])
+    return frame
+
+
+def publicar(carpeta, valores):
+    """
+    Escribe los DataFrames y Series de `valores` ({nodo: valor}) en `carpeta`.
+
+    Los archivos se escriben en una carpeta temporal que se renombra al final,
+    así un proceso nunca ve una instantánea a medias.
+    """
+    carpeta = Path(carpeta)
+    temporal = carpeta.with_name(f'.{carpeta.name}.{os.getpid()}.tmp')
+    shutil.rmtree(temporal, ignore_errors=True)
+    temporal.mkdir(parents=True)
+    manifiesto = {
+        nombre: escribir(temporal / f'{nombre}{EXTENSION}', valor)
+        for nombre, valor in valores.items()
+    }
+    (temporal / MANIFIESTO).write_text(json.dumps(manifiesto), encoding='utf-8')
+    try:
+        os.rename(temporal, carpeta)
+    except OSError:
+        # Otro proceso la publicó primero
+        shutil.rmtree(temporal, ignore_errors=True)
+        if not (carpeta / MANIFIESTO).exists():
+            raise
+
+
+def abrir(carpeta):
+    """Retorna {nodo: DataFrame o Series} con los archivos de la instantánea mapeados en memoria."""
+    carpeta = Path(carpeta)
+    manifiesto = json.loads((carpeta / MANIFIESTO).read_text(encoding='utf-8'))
+    return {
+        nombre: leer(carpeta / f'{nombre}{EXTENSION}', descripcion)
+        for nombre, descripcion in manifiesto.items()
+    }
+
+
+@contextlib.contextmanager
+def candado(ruta):
+    """Candado exclusivo entre procesos de la máquina (flock sobre un archivo)."""
+    import fcntl
+
+    with open(ruta, 'w') as archivo:
+        fcntl.flock(archivo, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(archivo, fcntl.LOCK_UN)
+
+
+def retener(ruta):
+    """
+    Marca un recurso compartido como en uso por este proceso con un candado
+    compartido sobre `ruta`. Retorna el archivo abierto: cerrarlo suelta el candado.
+    """
+    import fcntl
+
+    archivo = open(ruta, 'a')
+    fcntl.flock(archivo, fcntl.LOCK_SH)
+    return archivo
+
+
+def borrar_si_libre(ruta, borrar):
+    """
+    Ejecuta borrar() si ningún proceso retiene `ruta` (ver retener()).
+
+    Retorna:
+    - True si se borró
+    """
+    import fcntl
+
+    with open(ruta, 'a') as archivo:
+        try:
+            fcntl.flock(archivo, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return False
+        try:
+            borrar()
+        finally:
+            fcntl.flock(archivo, fcntl.LOCK_UN)
+    return True
+
+
+def _candado_publicacion(carpeta):
+    return carpeta.with_name(f'.{carpeta.name}.lock')
+
+
+def _uso(carpeta):
+    return carpeta.with_name(f'.{carpeta.name}.uso')
+
+
+def cargar_o_publicar(directorio, clave, construir):
+    """
+    Abre la instantánea `clave` de `directorio`, publicándola antes si no existe.
+    La instantánea queda en uso por este proceso hasta soltar_instantanea().
+
+    Parámetros:
+    - directorio: carpeta donde viven las instantáneas
+    - clave: nombre de la instantánea (ver clave_instantanea)
+    - construir: función sin argumentos que retorna {nodo: valor} a publicar
+
+    Retorna:
+    - (carpeta, valores): carpeta de la instantánea y {nodo: valor} mapeados
+    """
+    directorio = Path(directorio)
+    carpeta = directorio / clave
+    directorio.mkdir(parents=True, exist_ok=True)
+    with candado(_candado_publicacion(carpeta)):
+        # Otro proceso pudo publicarla mientras se esperaba el candado
+        if not (carpeta / MANIFIESTO).exists():
+            logger.info("Publicando la instantánea %s", carpeta)
+            publicar(carpeta, construir())
+        # En uso antes de soltar el candado: nadie la borra mientras este proceso la mapee
+        uso = retener(_uso(carpeta))
+    with _candado_retenidas:
+        _retenidas.setdefault(carpeta, []).append(uso)
+    valores = abrir(carpeta)
+    logger.info("Instantánea %s mapeada (%d nodos)", carpeta, len(valores))
+    return carpeta, valores
+
+
+def soltar_instantanea(carpeta):
+    """
+    Deja de usar una instantánea abierta con cargar_o_publicar() y borra su
+    carpeta si ningún proceso la usa (los que aún la mapean tienen su candado
+    compartido).
+
+    Retorna:
+    - True si se borró
+    """
+    carpeta = Path(carpeta)
+    with _candado_retenidas:
+        usos = _retenidas.get(carpeta)
+        if not usos:
+            return False
+        usos.pop().close()
+        if not usos:
+            del _retenidas[carpeta]
+
+    def borrar():
+        shutil.rmtree(carpeta, ignore_errors=True)
+        _uso(carpeta).unlink(missing_ok=True)
+
+    with candado(_candado_publicacion(carpeta)):
+        borrada = borrar_si_libre(_uso(carpeta), borrar)
+    if borrada:
+        logger.info("Instantánea %s borrada", carpeta)
+    return borrada
+
+
+# ============================================================================
+# MEMORIA POR PROCESO
+# ============================================================================
+
+def _leer_campos(lineas):
+    campos = {}
+    for linea in lineas:
+        partes = linea.split()
+        if len(partes) == 3 and partes[2] == 'kB' and partes[0].rstrip(':') in CAMPOS_MEMORIA:
+            campo = partes[0].rstrip(':')
+            campos[campo] = campos.get(campo, 0) + int(partes[1]) * 1024
+    return campos
+
+
+def memoria_proceso(pid='self', carpeta=None):
+    """
+    Memoria de un proceso según /proc (solo Linux).
+
+    Parámetros:
+    - pid: proceso a medir ('self' = el actual)
+    - carpeta: carpeta de instantáneas; si se indica se suman también las
+      páginas de sus archivos mapeados
+
+    Retorna:
+    - dict {campo: bytes} de CAMPOS_MEMORIA para el proceso completo y, con
+      `carpeta`, los mismos campos con el prefijo 'INSTANTANEA_'. Vacío si
+      /proc no está disponible.
+    """
+    try:
+        with open(f'/proc/{pid}/smaps_rollup') as archivo:
+            memoria = _leer_campos(archivo)
+    except OSError:
+        return {}
+    if carpeta is not None:
+        prefijo = str(Path(carpeta).resolve())
+        mapeados = []
+        dentro = False
+        with open(f'/proc/{pid}/smaps') as archivo:
+            for linea in archivo:
+                partes = linea.split(maxsplit=5)
+                if partes and '-' in partes[0] and not partes[0].endswith(':'):
+                    # Encabezado de un mapeo: dirección, permisos, desplazamiento, dispositivo, inodo y ruta
+                    ruta = partes[5].rstrip('\n') if len(partes) == 6 else ''
+                    dentro = ruta.startswith(prefijo) and ruta.endswith(EXTENSION)
+                elif dentro:
+                    mapeados.append(linea)
+        memoria.update({f'INSTANTANEA_{campo}': valor for campo, valor in _leer_campos(mapeados).items()})
+    return memoria
+
+
+def reporte_memoria(pids=('self',), carpeta=None):
+    """DataFrame con la memoria de cada proceso (una fila por pid, en MB)."""
+    filas = []
+    for pid in pids:
+        memoria = memoria_proceso(pid, carpeta)
+        filas.append({'PID': pid, **{campo: valor / 1e6 for campo, valor in memoria.items()}})
+    return pd.DataFrame(filas)
+
+
+def main(argumentos):
+    from dashboard_code.config import DIR_INSTANTANEA
+    carpeta = DIR_INSTANTANEA
+    if '--carpeta' in argumentos:
+        posicion = argumentos.index('--carpeta')
+        carpeta = argumentos[posicion + 1]
+        argumentos = argumentos[:posicion] + argumentos[posicion + 2:]
+    print(reporte_memoria(argumentos or ['self'], carpeta).to_string(index=False))
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,375 @@
+"""
+Motor de consultas sobre DuckDB embebido.
+
+Alternativa al cubo (dashboard_code/cubo.py), a los resúmenes de CPOB
+distintos (dashboard_code/distintos.py), a los histogramas de cuantiles
+(dashboard_code/cuantiles.py) y a los momentos de la correlación
+(dashboard_code/correlacion.py): la tabla de hechos se copia a una base DuckDB
+(en memoria o en un archivo por versión de los datos, COBERTURA_DUCKDB) y cada
+consulta del dashboard se traduce a SQL. Los filtros del sidebar (llaves
+enteras) se vuelven predicados IN sobre las llaves y las agregaciones un GROUP
+BY que DuckDB resuelve sobre sus columnas, sin materializar filas en pandas.
+Los CPOB distintos son COUNT(DISTINCT) y los cuantiles QUANTILE_CONT, siempre
+exactos.
+
+Con un archivo, cada versión de los datos tiene el suyo: el primer proceso lo
+escribe en un temporal que renombra al final y todos los procesos lo abren en
+solo lectura, así que una recarga nunca cambia los datos de una versión que
+otra ejecución sigue usando. Cuando la versión se libera su archivo se borra
+si ningún otro proceso lo tiene abierto.
+
+Expone la misma interfaz que Cubo y ConteoDistintos (filtros_sidebar,
+consultar, totales y contar), HistogramaCuantiles (cuantiles) y MomentosCubo
+(correlacion), así que los gráficos no cambian al elegir el motor con
+COBERTURA_MOTOR=duckdb.
+
+`python -m dashboard_code.motor_duckdb [muestras]` compara las respuestas con
+las del cubo y los resúmenes de distintos sobre filtros al azar.
+"""
+
+import logging
+import os
+import sys
+import weakref
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from dashboard_code.cubo import COLUMNA_FILAS, DIMENSIONES, MEDIDAS, SUMAS, Cubo
+from dashboard_code.instantanea import borrar_si_libre, candado, retener
+from dashboard_code.operadores import OPERADORES
+
+logger = logging.getLogger(__name__)
+
+TABLA = 'hechos'
+# Una fila por periodo, CPOB y tecnología con el área del CPOB y las áreas cubiertas (cuantiles)
+TABLA_CPOB = 'resumen_cpob'
+# Columnas de la matriz de correlación (las mismas que MomentosCubo en read_csv)
+COLUMNAS_CORRELACION = ['AREA_CPOB'] + SUMAS
+
+
+def predicado(filtros):
+    """
+    Cláusula WHERE para filtros {llave: códigos permitidos}.
+
+    Los códigos son llaves enteras, así que se escriben como literales. Una
+    llave con la lista vacía no deja pasar ninguna fila.
+    """
+    condiciones = []
+    for llave, codigos in filtros.items():
+        codigos = [int(codigo) for codigo in np.asarray(codigos).ravel()]
+        if not codigos:
+            condiciones.append('FALSE')
+        else:
+            condiciones.append(f'"{llave}" IN ({", ".join(map(str, codigos))})')
+    return 'WHERE ' + ' AND '.join(condiciones) if condiciones else ''
+
+
+def crear_tablas(conexion, hechos, columna_distintos):
+    """Copia los hechos a DuckDB y calcula el resumen por CPOB de los cuantiles."""
+    conexion.register('hechos_pandas', hechos[DIMENSIONES + [columna_distintos, 'AREA_CPOB'] + SUMAS])
+    conexion.execute(f'CREATE TABLE {TABLA} AS SELECT * FROM hechos_pandas')
+    conexion.unregister('hechos_pandas')
+
+    llaves = ', '.join(f'"{llave}"' for llave in DIMENSIONES + [columna_distintos])
+    sumas = ', '.join(f'COALESCE(SUM("{columna}"), 0) AS "{columna}"' for columna in SUMAS)
+    # Como el resumen por CPOB de read_csv: el área es la primera no nula en el orden de los hechos
+    conexion.execute(
+        f'CREATE TABLE {TABLA_CPOB} AS SELECT {llaves}, '
+        f'FIRST("AREA_CPOB" ORDER BY rowid) FILTER (WHERE "AREA_CPOB" IS NOT NULL) AS "AREA_CPOB", {sumas} '
+        f'FROM {TABLA} GROUP BY {llaves}'
+    )
+
+
+def _candado_version(ruta):
+    return ruta.with_name(f'.{ruta.name}.lock')
+
+
+def _uso_version(ruta):
+    return ruta.with_name(f'.{ruta.name}.uso')
+
+
+def abrir_version(ruta, crear):
+    """
+    Abre en solo lectura el archivo DuckDB de una versión de los datos,
+    escribiéndolo antes si no existe.
+
+    Parámetros:
+    - ruta: archivo de la versión
+    - crear: función (conexión) que crea las tablas en una base vacía
+
+    Retorna:
+    - (conexión, archivo del candado compartido que marca la versión en uso)
+    """
+    import duckdb
+
+    ruta = Path(ruta)
+    ruta.parent.mkdir(parents=True, exist_ok=True)
+    with candado(_candado_version(ruta)):
+        # Otro proceso pudo escribirla mientras se esperaba el candado
+        if not ruta.exists():
+            temporal = ruta.with_name(f'.{ruta.name}.{os.getpid()}.tmp')
+            temporal.unlink(missing_ok=True)
+            conexion = duckdb.connect(str(temporal))
+            try:
+                crear(conexion)
+            finally:
+                conexion.close()
+            os.replace(temporal, ruta)
+            logger.info("Base DuckDB %s escrita", ruta)
+        uso = retener(_uso_version(ruta))
+    try:
+        return duckdb.connect(str(ruta), read_only=True), uso
+    except Exception:
+        uso.close()
+        raise
+
+
+def cerrar_version(conexion, uso, ruta):
+    """Cierra la conexión y borra el archivo de la versión si ningún proceso lo usa."""
+    conexion.close()
+    uso.close()
+    ruta = Path(ruta)
+
+    def borrar():
+        ruta.unlink(missing_ok=True)
+        _uso_version(ruta).unlink(missing_ok=True)
+
+    with candado(_candado_version(ruta)):
+        if borrar_si_libre(_uso_version(ruta), borrar):
+            logger.info("Base DuckDB %s borrada", ruta)
+
+
+class MotorDuckDB:
+    """
+    Tabla de hechos en DuckDB con la interfaz de consulta de Cubo, ConteoDistintos,
+    HistogramaCuantiles y MomentosCubo.
+
+    Parámetros:
+    - hechos: DataFrame con las llaves de DIMENSIONES, ID_CPOB, AREA_CPOB y las columnas de SUMAS
+    - estrella: Estrella usada para traducir los filtros del sidebar (nombres) a llaves
+    - ruta: archivo DuckDB de esta versión de los datos o ':memory:'
+    - columna_distintos: llave que cuenta contar()
+    """
+
+    # Misma traducción de la selección del sidebar que el cubo
+    filtros_sidebar = Cubo.filtros_sidebar
+
+    def __init__(self, hechos, estrella, ruta=':memory:', columna_distintos='ID_CPOB'):
+        import duckdb
+
+        self.estrella = estrella
+        self.columna_distintos = columna_distintos
+        self.tipos = {llave: hechos[llave].dtype for llave in DIMENSIONES}
+
+        if str(ruta) == ':memory:':
+            self.conexion = duckdb.connect(':memory:')
+            crear_tablas(self.conexion, hechos, columna_distintos)
+        else:
+            self.conexion, uso = abrir_version(ruta, lambda conexion: crear_tablas(conexion, hechos, columna_distintos))
+            # El archivo se borra cuando se libera la versión, no al terminar el proceso
+            weakref.finalize(self, cerrar_version, self.conexion, uso, ruta).atexit = False
+
+    def bytes_en_memoria(self):
+        """Bytes que ocupa la base DuckDB en memoria (según duckdb_memory())."""
+        return int(self._ejecutar('SELECT COALESCE(SUM(memory_usage_bytes), 0) FROM duckdb_memory()')[0][0])
+
+    def _ejecutar(self, sql):
+        # Un cursor por consulta: las sesiones de Streamlit consultan desde hilos distintos
+        with self.conexion.cursor() as cursor:
+            return cursor.execute(sql).fetchall()
+
+    def _consulta(self, sql, por):
+        with self.conexion.cursor() as cursor:
+            resultado = cursor.execute(sql).df()
+        # Llaves con el mismo tipo que en la tabla de hechos (como en el cubo)
+        for llave in por:
+            resultado[llave] = resultado[llave].astype(self.tipos[llave])
+        return resultado
+
+    def consultar(self, por=(), filtros=None, medidas=None):
+        """
+        Agrega los hechos con GROUP BY sobre `por`, como Cubo.consultar().
+
+        Parámetros:
+        - por: llaves de DIMENSIONES que se conservan (en ese orden)
+        - filtros: dict {llave: códigos permitidos}
+        - medidas: columnas de MEDIDAS a retornar (todas si es None)
+
+        Retorna:
+        - DataFrame con las llaves de `por` y las medidas, ordenado por las
+          llaves y sin las combinaciones que no tienen filas
+        """
+        por = list(por)
+        medidas = MEDIDAS if medidas is None else list(medidas)
+        # Misma semántica que el cubo: los faltantes no suman y una suma vacía es 0
+        expresiones = [
+            f'COUNT(*) AS "{COLUMNA_FILAS}"' if medida == COLUMNA_FILAS
+            else f'COALESCE(SUM("{medida}"), 0)::DOUBLE AS "{medida}"'
+            for medida in medidas
+        ]
+        llaves = ', '.join(f'"{llave}"' for llave in por)
+        sql = f'SELECT {", ".join(([llaves] if por else []) + expresiones)} FROM {TABLA} {predicado(filtros or {})}'
+        if por:
+            sql += f' GROUP BY {llaves} ORDER BY {llaves}'
+        resultado = self._consulta(sql, por)
+        if COLUMNA_FILAS in resultado:
+            resultado[COLUMNA_FILAS] = resultado[COLUMNA_FILAS].astype(np.int64)
+        return resultado
+
+    def totales(self, filtros=None, medidas=None):
+        """Retorna una Series con el total de cada medida para los filtros."""
+        return self.consultar((), filtros, medidas).iloc[0]
+
+    def contar(self, por=(), filtros=None, nombre='DISTINTOS'):
+        """
+        Cuenta los valores distintos de `columna_distintos`, como ConteoDistintos.contar().
+
+        Retorna:
+        - DataFrame con las llaves de `por` y el conteo (sin grupos vacíos),
+          o un int si `por` está vacío
+        """
+        por = list(por)
+        donde = predicado(filtros or {})
+        conteo = f'COUNT(DISTINCT "{self.columna_distintos}")'
+        if not por:
+            return int(self._ejecutar(f'SELECT {conteo} FROM {TABLA} {donde}')[0][0])
+        llaves = ', '.join(f'"{llave}"' for llave in por)
+        resultado = self._consulta(
+            f'SELECT {llaves}, {conteo} AS "{nombre}" FROM {TABLA} {donde} GROUP BY {llaves} ORDER BY {llaves}',
+            por
+        )
+        resultado[nombre] = resultado[nombre].astype(np.int64)
+        return resultado
+
+    def cuantiles(self, por=(), filtros=None, probabilidades=(0.1, 0.5, 0.9)):
+        """
+        Cuantiles del porcentaje de cobertura por operador, como
+        HistogramaCuantiles.cuantiles() pero exactos.
+
+        Retorna:
+        - DataFrame con las llaves de `por`, OPERADOR, N (CPOB-periodo) y una
+          columna P<nn> por probabilidad; sin los grupos vacíos
+        """
+        por = list(por)
+        llaves = ', '.join(f'"{llave}"' for llave in por)
+        # Mismo dominio que los histogramas: los porcentajes mayores a 100 cuentan como 100
+        # y los CPOB con área 0 no se incluyen
+        donde = predicado(filtros or {})
+        validos = '"AREA_CPOB" IS NOT NULL AND "AREA_CPOB" <> 0'
+        donde = f'{donde} AND {validos}' if donde else f'WHERE {validos}'
+
+        consultas = []
+        for orden, (operador, columna) in enumerate(zip(OPERADORES, SUMAS)):
+            porcentaje = f'LEAST(GREATEST(100 * "{columna}" / "AREA_CPOB", 0), 100)'
+            expresiones = [f'{orden} AS _ORDEN', f"'{operador}' AS OPERADOR", 'COUNT(*) AS N'] + [
+                f'QUANTILE_CONT({porcentaje}, {p}) AS "P{int(round(p * 100)):02d}"' for p in probabilidades
+            ]
+            sql = f'SELECT {", ".join(([llaves] if por else []) + expresiones)} FROM {TABLA_CPOB} {donde}'
+            consultas.append(f'({sql} GROUP BY {llaves})' if por else f'({sql})')
+        orden = ', '.join(['_ORDEN'] + [f'"{llave}"' for llave in por])
+        resultado = self._consulta(f'{" UNION ALL ".join(consultas)} ORDER BY {orden}', por)
+        resultado = resultado.drop(columns='_ORDEN')
+        resultado['N'] = resultado['N'].astype(np.int64)
+        return resultado[resultado['N'] > 0].reset_index(drop=True)
+
+    def correlacion(self, filtros=None, columnas=COLUMNAS_CORRELACION):
+        """
+        Matriz de correlación de Pearson de las filas seleccionadas, como
+        MomentosCubo.correlacion(): cada par usa solo las filas donde las dos
+        columnas tienen valor.
+
+        Retorna:
+        - DataFrame k x k indexado por `columnas` (NaN si un par tiene menos de
+          dos filas o una columna sin variación)
+        """
+        columnas = list(columnas)
+        pares = [(i, j) for i in range(len(columnas)) for j in range(i, len(columnas))]
+        expresiones = [f'CORR("{columnas[i]}", "{columnas[j]}")' for i, j in pares]
+        fila = self._ejecutar(f'SELECT {", ".join(expresiones)} FROM {TABLA} {predicado(filtros or {})}')[0]
+        corr = np.full((len(columnas), len(columnas)), np.nan)
+        for (i, j), valor in zip(pares, fila):
+            corr[i, j] = corr[j, i] = np.nan if valor is None else valor
+        return pd.DataFrame(np.clip(corr, -1, 1), index=columnas, columns=columnas)
+
+
+# ============================================================================
+# PARIDAD CON EL CUBO
+# ============================================================================
+
+def filtros_al_azar(ejes, generador):
+    """Filtros {llave: códigos} con un subconjunto al azar de algunas llaves de DIMENSIONES."""
+    filtros = {}
+    for llave in DIMENSIONES:
+        if generador.random() < 0.5:
+            eje = ejes[llave]
+            filtros[llave] = np.sort(generador.choice(eje, size=generador.integers(1, len(eje) + 1), replace=False))
+    return filtros
+
+
+def comparar(motor, cubo, distintos, muestras=50, semilla=0):
+    """
+    Compara el motor DuckDB con el cubo y los resúmenes de distintos.
+
+    Parámetros:
+    - motor: MotorDuckDB
+    - cubo: Cubo sobre los mismos hechos
+    - distintos: ConteoDistintos sobre los mismos hechos
+    - muestras: número de combinaciones de filtros al azar
+    - semilla: semilla del generador
+
+    Retorna:
+    - DataFrame con una fila por consulta (CONSULTA, POR, FILTROS, IGUAL); las
+      sumas se comparan con tolerancia relativa de 1e-9 y los distintos en
+      modo HyperLogLog con tres veces el error relativo típico
+    """
+    generador = np.random.default_rng(semilla)
+    agrupaciones = [[]] + [[llave] for llave in DIMENSIONES] + [
+        ['ID_PERIODO', 'ID_TECNOLOGIA'], ['ID_DEPARTAMENTO', 'ID_TECNOLOGIA']
+    ]
+    tolerancia = 3 * distintos.error_relativo()
+    filas = []
+    for _ in range(muestras):
+        filtros = filtros_al_azar(cubo.ejes, generador)
+        por = agrupaciones[generador.integers(len(agrupaciones))]
+
+        esperado = cubo.consultar(por, filtros)
+        obtenido = motor.consultar(por, filtros)
+        igual = (
+            list(esperado.columns) == list(obtenido.columns)
+            and len(esperado) == len(obtenido)
+            and all(esperado[llave].equals(obtenido[llave]) for llave in por + [COLUMNA_FILAS])
+            and np.allclose(esperado[SUMAS], obtenido[SUMAS], rtol=1e-9, atol=1e-9)
+        )
+        filas.append({'CONSULTA': 'consultar', 'POR': ','.join(por), 'FILTROS': len(filtros), 'IGUAL': bool(igual)})
+
+        esperado = distintos.contar(por, filtros)
+        obtenido = motor.contar(por, filtros)
+        if not por:
+            igual = abs(esperado - obtenido) <= tolerancia * obtenido
+        else:
+            igual = (
+                len(esperado) == len(obtenido)
+                and all(esperado[llave].equals(obtenido[llave]) for llave in por)
+                and np.all(np.abs(esperado['DISTINTOS'] - obtenido['DISTINTOS']) <= tolerancia * obtenido['DISTINTOS'])
+            )
+        filas.append({'CONSULTA': 'contar', 'POR': ','.join(por), 'FILTROS': len(filtros), 'IGUAL': bool(igual)})
+    return pd.DataFrame(filas)
+
+
+def main(argumentos):
+    from dashboard_code.read_csv import registro
+    muestras = int(argumentos[0]) if argumentos else 50
+    resultado = comparar(
+        registro.obtener('motor_duckdb'), registro.obtener('cubo'), registro.obtener('distintos'), muestras
+    )
+    diferencias = resultado[~resultado['IGUAL']]
+    print(f'{len(resultado)} consultas, {len(diferencias)} diferencias')
+    if len(diferencias):
+        print(diferencias.to_string(index=False))
+    return 1 if len(diferencias) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
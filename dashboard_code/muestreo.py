@@ -0,0 +1,154 @@
+"""
+Reducción de las series grandes antes de graficarlas.
+
+Los gráficos de histograma, línea y área de grafico_generico reciben filas
+sin agregar; con varios años de datos (o con df_melt, cuatro filas por
+registro) Plotly recibiría cada punto. Por encima de un presupuesto de puntos
+(COBERTURA_PUNTOS_MAXIMOS):
+
+- binear() calcula el histograma en el servidor con NumPy y al navegador solo
+  llegan las barras.
+- reducir_series() submuestrea cada serie con LTTB (Largest-Triangle-Three-
+  Buckets), que conserva la forma de la línea: de cada cubeta se queda con el
+  punto que forma el triángulo más grande con el punto elegido en la cubeta
+  anterior y el promedio de la siguiente.
+
+Los diagramas de dispersión no se submuestrean: se dibujan con WebGL.
+"""
+
+import numpy as np
+import pandas as pd
+
+from dashboard_code.config import PUNTOS_MAXIMOS
+
+# Máximo de cubetas de un histograma con la regla automática de NumPy
+MAX_CUBETAS = 1000
+
+
+def lttb(x, y, umbral):
+    """
+    Índices de los puntos que conserva LTTB.
+
+    Parámetros:
+    - x: posiciones de los puntos (crecientes)
+    - y: valores de los puntos (sin faltantes)
+    - umbral: número de puntos a conservar (incluye el primero y el último)
+
+    Retorna:
+    - array con los índices elegidos, en orden
+    """
+    n = len(x)
+    if umbral >= n or umbral < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    indices = np.empty(umbral, dtype=np.int64)
+    indices[0], indices[-1] = 0, n - 1
+
+    # Las n - 2 posiciones intermedias se reparten en umbral - 2 cubetas
+    cada = (n - 2) / (umbral - 2)
+    elegido = 0
+    for i in range(umbral - 2):
+        inicio, fin = int(i * cada) + 1, int((i + 1) * cada) + 1
+        # Promedio de la cubeta siguiente (la última usa el punto final)
+        fin_siguiente = min(int((i + 2) * cada) + 1, n)
+        media_x, media_y = x[fin:fin_siguiente].mean(), y[fin:fin_siguiente].mean()
+        areas = np.abs(
+            (x[elegido] - media_x) * (y[inicio:fin] - y[elegido])
+            - (x[elegido] - x[inicio:fin]) * (media_y - y[elegido])
+        )
+        elegido = inicio + int(np.argmax(areas))
+        indices[i + 1] = elegido
+    return indices
+
+
+def posiciones(serie):
+    """Posiciones numéricas del eje x: los valores si son números o fechas, el orden de las filas si no."""
+    if pd.api.types.is_datetime64_any_dtype(serie):
+        return serie.to_numpy(dtype='datetime64[ns]').astype(np.int64).astype(np.float64)
+    if pd.api.types.is_numeric_dtype(serie) and not isinstance(serie.dtype, pd.CategoricalDtype):
+        return serie.to_numpy(dtype=np.float64)
+    return np.arange(len(serie), dtype=np.float64)
+
+
+def reducir_series(datos, x, y, color=None, puntos_maximos=PUNTOS_MAXIMOS):
+    """
+    Submuestrea con LTTB cada serie (un valor de `color`) de un gráfico de línea.
+
+    El presupuesto se reparte por igual entre las series y las filas sin valor
+    en `y` se descartan. LTTB recorre cada serie ordenada por `x`; las filas
+    elegidas conservan su orden original.
+
+    Parámetros:
+    - datos: DataFrame del gráfico
+    - x, y: columnas de los ejes
+    - color: columna que separa las series, o None
+    - puntos_maximos: puntos que se envían en total
+
+    Retorna:
+    - DataFrame con las filas elegidas
+    """
+    grupos = [datos] if color is None else [
+        grupo for _, grupo in datos.groupby(color, sort=False, observed=True)
+    ]
+    por_serie = max(puntos_maximos // max(len(grupos), 1), 3)
+    partes = []
+    for grupo in grupos:
+        grupo = grupo[grupo[y].notna()]
+        x_grupo = posiciones(grupo[x])
+        orden = np.argsort(x_grupo, kind='stable')
+        elegidos = lttb(x_grupo[orden], grupo[y].to_numpy(dtype=np.float64)[orden], por_serie)
+        partes.append(grupo.iloc[np.sort(orden[elegidos])])
+    return pd.concat(partes) if partes else datos.iloc[:0]
+
+
+def binear(datos, x, color=None, nbins=None, histnorm=None):
+    """
+    Histograma calculado en el servidor, con las mismas normalizaciones de px.histogram.
+
+    Parámetros:
+    - datos: DataFrame del gráfico
+    - x: columna a contar (numérica: cubetas comunes a todas las series;
+      categórica: un conteo por valor)
+    - color: columna que separa las series, o None
+    - nbins: número de cubetas (None = regla automática de NumPy)
+    - histnorm: None, 'percent', 'probability', 'density' o 'probability density'
+
+    Retorna:
+    - DataFrame con `x` (centro de la cubeta o valor), `color`, INICIO y FIN
+      de la cubeta (solo si x es numérica) y la columna de la altura, que se
+      llama como histnorm o 'count'
+    """
+    altura = histnorm or 'count'
+    grupos = [(None, datos)] if color is None else list(datos.groupby(color, sort=False, observed=True))
+    numerica = pd.api.types.is_numeric_dtype(datos[x]) and not isinstance(datos[x].dtype, pd.CategoricalDtype)
+
+    partes = []
+    if numerica:
+        valores = datos[x].dropna().to_numpy(dtype=np.float64)
+        bordes = np.histogram_bin_edges(valores, bins=nbins or 'auto')
+        if len(bordes) > MAX_CUBETAS + 1:
+            bordes = np.histogram_bin_edges(valores, bins=MAX_CUBETAS)
+        for llave, grupo in grupos:
+            conteos, _ = np.histogram(grupo[x].dropna().to_numpy(dtype=np.float64), bordes)
+            parte = pd.DataFrame({
+                x: (bordes[:-1] + bordes[1:]) / 2, 'INICIO': bordes[:-1], 'FIN': bordes[1:], altura: conteos
+            })
+            partes.append((llave, parte))
+    else:
+        for llave, grupo in grupos:
+            conteos = grupo[x].value_counts(sort=False, dropna=True)
+            partes.append((llave, pd.DataFrame({x: conteos.index, altura: conteos.to_numpy()})))
+
+    resultado = []
+    for llave, parte in partes:
+        total = parte[altura].sum()
+        parte[altura] = parte[altura].astype(np.float64) if histnorm else parte[altura]
+        if histnorm in ('percent', 'probability', 'probability density') and total:
+            parte[altura] = parte[altura] / total * (100 if histnorm == 'percent' else 1)
+        if histnorm in ('density', 'probability density') and numerica:
+            parte[altura] = parte[altura] / (parte['FIN'] - parte['INICIO'])
+        if color is not None:
+            parte.insert(1, color, llave)
+        resultado.append(parte)
+    return pd.concat(resultado, ignore_index=True)
@@ -0,0 +1,86 @@
+"""
+Matriz de cobertura por operador.
+
+Las áreas cubiertas por los operadores se guardan como un arreglo contiguo
+(N, K) junto al eje con los nombres de los operadores. El máximo por fila,
+el operador del máximo, los porcentajes sobre AREA_CPOB (con tope) y el
+número de operadores que cubren al menos un porcentaje son operaciones
+vectorizadas sobre ese arreglo. Agregar un operador es agregarlo a
+OPERADORES (y su columna AREA_COB_<operador> al diccionario de datos).
+"""
+
+import numpy as np
+
+# Operadores, en el orden de las columnas del CSV
+OPERADORES = ['CLARO', 'MOVISTAR', 'TIGO', 'WOM']
+
+PREFIJO_AREA = 'AREA_COB_'
+PREFIJO_PCT = 'PCT_'
+
+# Columnas de área y de porcentaje por operador
+COLUMNAS_AREA = [PREFIJO_AREA + operador for operador in OPERADORES]
+COLUMNAS_PCT = [PREFIJO_PCT + operador for operador in OPERADORES]
+
+
+class MatrizOperadores:
+    """
+    Áreas de cobertura (N filas x K operadores) y el eje de operadores.
+
+    Parámetros:
+    - areas: array N x K con el área cubierta por cada operador (se conserva
+      el tipo flotante, float32 en el modo compacto)
+    - operadores: nombres de los K operadores (en el orden de las columnas)
+    """
+
+    def __init__(self, areas, operadores=OPERADORES):
+        areas = np.asarray(areas)
+        tipo = areas.dtype if np.issubdtype(areas.dtype, np.floating) else np.float64
+        self.areas = np.ascontiguousarray(areas, dtype=tipo)
+        self.operadores = np.asarray(operadores)
+
+    @classmethod
+    def desde_df(cls, df, operadores=OPERADORES):
+        """Matriz a partir de las columnas AREA_COB_<operador> de un DataFrame."""
+        columnas = df[[PREFIJO_AREA + operador for operador in operadores]]
+        return cls(columnas.to_numpy(dtype=np.result_type(*columnas.dtypes, np.float32)), operadores)
+
+    def columnas(self, valores, prefijo):
+        """dict {prefijo + operador: columna de `valores`} para DataFrame.assign()."""
+        return {prefijo + operador: valores[:, k] for k, operador in enumerate(self.operadores)}
+
+    def maximo(self):
+        """Área máxima de cada fila (ignora faltantes; NaN si la fila no tiene valores)."""
+        return np.fmax.reduce(self.areas, axis=1)
+
+    def argmax(self):
+        """
+        Código (posición en el eje) del operador con mayor área en cada fila:
+        el primero en empates y sin contar faltantes, como idxmax(axis=1).
+        """
+        faltantes = np.isnan(self.areas)
+        if faltantes.all(axis=1).any():
+            raise ValueError("Una fila no tiene áreas de cobertura")
+        return np.argmax(np.where(faltantes, -np.inf, self.areas), axis=1)
+
+    def operador_max(self):
+        """Nombre del operador con mayor área en cada fila."""
+        return self.operadores[self.argmax()]
+
+    def porcentajes(self, area_cpob, tope=None):
+        """
+        Porcentaje del área del CPOB cubierta por cada operador.
+
+        Parámetros:
+        - area_cpob: área de cada fila (N)
+        - tope: máximo del porcentaje (por ejemplo 100), o None
+
+        Retorna:
+        - array N x K
+        """
+        area = np.asarray(area_cpob)[:, None]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            porcentajes = (self.areas / area) * 100
+        if tope is not None:
+            np.minimum(porcentajes, tope, out=porcentajes)
+        return porcentajes
+
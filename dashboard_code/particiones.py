@@ -0,0 +1,179 @@
+"""
+Base de datos de cobertura particionada por periodo.
+
+Cada trimestre publicado se guarda como una partición Parquet independiente
+con la estructura ANNO=<año>/TRIMESTRE=<trimestre>/parte.parquet. Junto a los
+datos se guardan agregados por periodo (sumas de la serie temporal, CPOB sin
+tecnología, tablas de dimensión...) en agregados/<nombre>/ID_PERIODO=<id>.parquet.
+
+Agregar un trimestre nuevo escribe solo su partición y sus agregados; los
+periodos ya cargados no se vuelven a leer ni a calcular.
+"""
+
+import logging
+import re
+import time
+from pathlib import Path
+
+import pandas as pd
+
+from dashboard_code.cache import escribir_atomico
+from dashboard_code.estrella import id_periodo
+
+logger = logging.getLogger(__name__)
+
+# Nombre del archivo de datos dentro de cada partición
+ARCHIVO_PARTE = 'parte.parquet'
+
+PATRON_ANNO = re.compile(r'^ANNO=(\d+)$')
+PATRON_TRIMESTRE = re.compile(r'^TRIMESTRE=(\d+)$')
+
+
+class ErrorPeriodo(ValueError):
+    """Los datos a agregar no corresponden a un periodo nuevo."""
+
+
+def periodos_de(df):
+    """Retorna los pares (ANNO, TRIMESTRE) distintos de un DataFrame de cobertura, ordenados."""
+    pares = df[['ANNO', 'TRIMESTRE']].drop_duplicates()
+    return sorted((int(a), int(t)) for a, t in pares.itertuples(index=False))
+
+
+class BaseParticionada:
+    """
+    Base de datos de cobertura en disco, una partición por periodo.
+
+    Parámetros:
+    - directorio: carpeta raíz de la base (se crea al agregar el primer periodo)
+    """
+
+    def __init__(self, directorio):
+        self.directorio = Path(directorio)
+        self.dir_datos = self.directorio / 'datos'
+        self.dir_agregados = self.directorio / 'agregados'
+
+    @staticmethod
+    def es_base(ruta):
+        """True si la ruta es una carpeta con la estructura de una BaseParticionada."""
+        return (Path(ruta) / 'datos').is_dir()
+
+    def ruta_periodo(self, anno, trimestre):
+        return self.dir_datos / f'ANNO={int(anno)}' / f'TRIMESTRE={int(trimestre)}'
+
+    def ruta_agregado(self, nombre, periodo):
+        return self.dir_agregados / nombre / f'ID_PERIODO={periodo}.parquet'
+
+    def periodos(self):
+        """Retorna los ID_PERIODO cargados en la base, ordenados."""
+        periodos = []
+        if not self.dir_datos.is_dir():
+            return periodos
+        for dir_anno in self.dir_datos.iterdir():
+            anno = PATRON_ANNO.match(dir_anno.name)
+            if not anno:
+                continue
+            for dir_trimestre in dir_anno.iterdir():
+                trimestre = PATRON_TRIMESTRE.match(dir_trimestre.name)
+                if trimestre and (dir_trimestre / ARCHIVO_PARTE).exists():
+                    periodos.append(id_periodo(anno.group(1), trimestre.group(1)))
+        return sorted(periodos)
+
+    def periodos_para(self, anno=None, trimestre=None):
+        """
+        Poda de particiones: retorna los ID_PERIODO cargados que corresponden
+        al año y trimestre indicados (None = cualquiera).
+        """
+        return [
+            p for p in self.periodos()
+            if (anno is None or p // 10 == int(anno)) and (trimestre is None or p % 10 == int(trimestre))
+        ]
+
+    def validar_nuevos(self, df):
+        """Lanza ErrorPeriodo si algún periodo de df ya está en la base."""
+        existentes = set(self.periodos())
+        repetidos = [f'{a}-T{t}' for a, t in periodos_de(df) if id_periodo(a, t) in existentes]
+        if repetidos:
+            raise ErrorPeriodo(f"Los periodos {repetidos} ya están cargados en {self.directorio}")
+
+    def agregar_periodo(self, df, agregados=None):
+        """
+        Agrega a la base las filas de un único periodo nuevo.
+
+        Parámetros:
+        - df: DataFrame limpio con las filas de un solo ANNO y TRIMESTRE
+        - agregados: dict {nombre: función(df) -> DataFrame} con los agregados
+          por periodo que se guardan junto a los datos
+
+        Retorna:
+        - ID_PERIODO agregado
+        """
+        periodos = periodos_de(df)
+        if len(periodos) != 1:
+            raise ErrorPeriodo(f"Se esperaba un solo periodo y llegaron {len(periodos)}: {periodos}")
+        self.validar_nuevos(df)
+        anno, trimestre = periodos[0]
+        periodo = id_periodo(anno, trimestre)
+
+        inicio = time.perf_counter()
+        # Los agregados se escriben antes que los datos: el periodo solo cuenta
+        # como cargado cuando existe su parte de datos
+        for nombre, funcion in (agregados or {}).items():
+            self.escribir_agregado(nombre, periodo, funcion(df))
+        ruta = self.ruta_periodo(anno, trimestre)
+        ruta.mkdir(parents=True, exist_ok=True)
+        escribir_atomico(ruta / ARCHIVO_PARTE, lambda r: df.to_parquet(r, index=False))
+        logger.info(
+            "Periodo %d-T%d agregado (%d filas) en %.3f s",
+            anno, trimestre, len(df), time.perf_counter() - inicio
+        )
+        return periodo
+
+    def escribir_agregado(self, nombre, periodo, frame):
+        ruta = self.ruta_agregado(nombre, periodo)
+        ruta.parent.mkdir(parents=True, exist_ok=True)
+        escribir_atomico(ruta, lambda r: frame.to_parquet(r, index=False))
+
+    def ruta_parte(self, periodo):
+        anno, trimestre = divmod(int(periodo), 10)
+        return self.ruta_periodo(anno, trimestre) / ARCHIVO_PARTE
+
+    def leer_periodo(self, periodo):
+        return pd.read_parquet(self.ruta_parte(periodo))
+
+    def vacio(self):
+        """DataFrame sin filas con las columnas de la base (solo se lee el esquema de una partición)."""
+        import pyarrow.parquet as pq
+
+        periodos = self.periodos()
+        if not periodos:
+            raise ErrorPeriodo(f"La base {self.directorio} no tiene periodos cargados")
+        return pq.read_schema(self.ruta_parte(periodos[0])).empty_table().to_pandas()
+
+    def leer(self, periodos=None):
+        """Retorna el DataFrame con las filas de los periodos indicados (todos si es None)."""
+        periodos = self.periodos() if periodos is None else periodos
+        partes = [self.leer_periodo(p) for p in periodos]
+        if not partes:
+            raise ErrorPeriodo(f"La base {self.directorio} no tiene periodos cargados")
+        return pd.concat(partes, ignore_index=True)
+
+    def leer_agregado(self, nombre, funcion=None):
+        """
+        Retorna la unión de las particiones por periodo de un agregado.
+
+        Si se pasa `funcion`, los periodos que aún no tienen el agregado (por
+        ejemplo un agregado definido después de cargarlos) se calculan desde
+        su partición de datos y se guardan; el resto se reutiliza tal cual.
+        """
+        partes = []
+        for periodo in self.periodos():
+            ruta = self.ruta_agregado(nombre, periodo)
+            if ruta.exists():
+                partes.append(pd.read_parquet(ruta))
+            elif funcion is not None:
+                frame = funcion(self.leer_periodo(periodo))
+                self.escribir_agregado(nombre, periodo, frame)
+                partes.append(frame)
+            else:
+                raise ErrorPeriodo(f"Falta el agregado {nombre} del periodo {periodo}")
+        return pd.concat(partes, ignore_index=True)
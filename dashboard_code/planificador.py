@@ -0,0 +1,127 @@
+"""
+Planificador de agregaciones compartidas sobre la tabla de hechos.
+
+Cada DataFrame derivado se describe como una Consulta (llaves, medidas y
+filtro). El planificador calcula el grano más fino que cubre todas las
+consultas, recorre los datos crudos una sola vez para obtener ese agregado
+intermedio y resuelve cada consulta como un reagrupamiento de esa tabla
+pequeña. Agregar un nuevo DataFrame derivado cuesta un reagrupamiento, no
+otro recorrido completo.
+
+Agregaciones soportadas y cómo se reagrupan desde el intermedio:
+- 'sum', 'size': suma de las sumas / de los conteos de filas
+- 'max', 'min', 'first': máximo, mínimo o primero del intermedio
+  ('first' supone que el valor es constante dentro del grupo, como AREA_CPOB)
+- 'nunique': la columna se incluye en el grano y se cuentan sus valores distintos
+"""
+
+# Cómo se combina en el reagrupamiento cada agregación calculada en el intermedio
+COMBINAR = {'sum': 'sum', 'size': 'sum', 'max': 'max', 'min': 'min', 'first': 'first'}
+
+# Nombre de la columna del intermedio con el conteo de filas crudas
+COLUMNA_FILAS = '_FILAS'
+
+
+class Consulta:
+    """
+    Especificación de un agregado.
+
+    Parámetros:
+    - nombre: identificador de la consulta
+    - llaves: list de columnas de agrupación
+    - medidas: dict {columna_salida: agregacion} o {columna_salida: (columna, agregacion)}
+    - filtro: dict {columna: valores} que deben estar presentes (isin)
+    - excluir: dict {columna: valores} que se descartan (~isin)
+    """
+
+    def __init__(self, nombre, llaves, medidas=None, filtro=None, excluir=None):
+        self.nombre = nombre
+        self.llaves = list(llaves)
+        self.medidas = {}
+        for salida, definicion in (medidas or {}).items():
+            columna, agregacion = definicion if isinstance(definicion, tuple) else (salida, definicion)
+            if agregacion not in COMBINAR and agregacion != 'nunique':
+                raise ValueError(f"Agregación no soportada en {nombre}: {agregacion}")
+            self.medidas[salida] = (columna, agregacion)
+        self.filtro = dict(filtro or {})
+        self.excluir = dict(excluir or {})
+
+    def columnas_grano(self):
+        """Columnas que deben estar en el grano del intermedio para resolver la consulta."""
+        columnas = list(self.llaves) + list(self.filtro) + list(self.excluir)
+        columnas += [col for col, agregacion in self.medidas.values() if agregacion == 'nunique']
+        return columnas
+
+    def filtrar(self, datos):
+        """Aplica filtro y excluir de la consulta a un DataFrame que tenga esas columnas."""
+        mascara = None
+        for columna, valores in self.filtro.items():
+            condicion = datos[columna].isin(valores)
+            mascara = condicion if mascara is None else mascara & condicion
+        for columna, valores in self.excluir.items():
+            condicion = ~datos[columna].isin(valores)
+            mascara = condicion if mascara is None else mascara & condicion
+        return datos if mascara is None else datos[mascara]
+
+
+class Planificador:
+    """
+    Plan compartido para un conjunto de consultas.
+
+    Uso:
+    - intermedio = plan.escanear(hechos)   # un solo recorrido de los datos crudos
+    - plan.resolver('nombre', intermedio)  # reagrupamiento de la tabla pequeña
+    """
+
+    def __init__(self, consultas):
+        self.consultas = {c.nombre: c for c in consultas}
+
+        # Grano común: unión de las llaves, columnas de filtro y columnas de nunique
+        self.grano = []
+        for consulta in self.consultas.values():
+            for columna in consulta.columnas_grano():
+                if columna not in self.grano:
+                    self.grano.append(columna)
+
+        # Agregaciones que se calculan en el intermedio: {(columna, agregacion): nombre_intermedio}
+        self.agregados = {}
+        for consulta in self.consultas.values():
+            for columna, agregacion in consulta.medidas.values():
+                if agregacion == 'nunique':
+                    continue
+                if agregacion == 'size':
+                    self.agregados[(None, 'size')] = COLUMNA_FILAS
+                elif (columna, agregacion) not in self.agregados:
+                    nombre = columna if agregacion == 'sum' else f'{columna}__{agregacion}'
+                    self.agregados[(columna, agregacion)] = nombre
+
+    def escanear(self, hechos):
+        """Recorre los datos crudos una vez y retorna el agregado al grano común."""
+        agregaciones = {}
+        for (columna, agregacion), nombre in self.agregados.items():
+            if agregacion == 'size':
+                agregaciones[nombre] = (self.grano[0], 'size')
+            else:
+                agregaciones[nombre] = (columna, agregacion)
+        if not agregaciones:
+            return hechos[self.grano].drop_duplicates().sort_values(self.grano).reset_index(drop=True)
+        return hechos.groupby(self.grano, as_index=False, observed=True).agg(**agregaciones)
+
+    def resolver(self, nombre, intermedio):
+        """Resuelve una consulta a partir del agregado intermedio."""
+        consulta = self.consultas[nombre]
+        datos = consulta.filtrar(intermedio)
+
+        if not consulta.medidas:
+            return datos[consulta.llaves].drop_duplicates().reset_index(drop=True)
+
+        agregaciones = {}
+        for salida, (columna, agregacion) in consulta.medidas.items():
+            if agregacion == 'nunique':
+                agregaciones[salida] = (columna, 'nunique')
+            elif agregacion == 'size':
+                agregaciones[salida] = (COLUMNA_FILAS, 'sum')
+            else:
+                agregaciones[salida] = (self.agregados[(columna, agregacion)], COMBINAR[agregacion])
+
+        return datos.groupby(consulta.llaves, as_index=False, observed=True).agg(**agregaciones)
@@ -20,332 +20,905 @@ AREA_COB_TIGO        | Flotante     | Área en km² cubierta por TIGO.
 AREA_COB_WOM         | Flotante     | Área en km² cubierta por WOM.
 """
 
+import logging
+import threading
+import time
+import weakref
+from functools import lru_cache
+from pathlib import Path
+
+import numpy as np
 import pandas as pd
 
+from dashboard_code.config import (
+    RUTA_CSV, USAR_CACHE, DIR_CACHE, COMPACTO, TRABAJADORES, RUTA_DUCKDB, DIR_INSTANTANEA,
+    RECARGA_SEGUNDOS, MOTOR
+)
+from dashboard_code.cache import cargar_con_cache
+from dashboard_code.esquema import Esquema
+from dashboard_code.compacto import bytes_en_memoria, compactar, registrar_reporte
+from dashboard_code.estrella import Estrella, agregar_id_periodo, id_periodo, tabla_dimension
+from dashboard_code.registro import Grafo, Registro
+from dashboard_code.planificador import Consulta, Planificador
+from dashboard_code.particiones import BaseParticionada
+from dashboard_code.cubo import Cubo
+from dashboard_code.distintos import ConteoDistintos
+from dashboard_code.indice import IndiceBitmap
+from dashboard_code.motor_duckdb import MotorDuckDB
+from dashboard_code.cuantiles import HistogramaCuantiles
+from dashboard_code.correlacion import MomentosCubo
+from dashboard_code.grupos import argmax_grupo, codigos_grupo, moda_serie
+from dashboard_code.operadores import COLUMNAS_AREA, COLUMNAS_PCT, PREFIJO_PCT, MatrizOperadores
+from dashboard_code.instantanea import (
+    cargar_o_publicar, clave_instantanea, huella_fuente, memoria_proceso, soltar_instantanea
+)
+from dashboard_code.recarga import Vigilante
+
+logger = logging.getLogger(__name__)
+
+# Los DataFrames de este módulo son nodos de un grafo que se calculan la
+# primera vez que se importan (por ejemplo `from dashboard_code.read_csv import
+# df_top` calcula solo df_top y sus dependencias). `registro.reporte()` muestra
+# qué nodos se han calculado y cuánto costó cada uno.
+grafo = Grafo()
+
 # ============================================================================
 # CARGA Y LIMPIEZA DE DATOS
 # ============================================================================
 
-# Leer base de datos
-df = pd.read_csv('./data/Datos_Cobertura Movil_1T_2023 a 4T_2024.csv', sep=';')
+# Columnas que usa el dashboard (NIVEL_SENAL no se carga)
+COLUMNAS_USADAS = [
+    'ANNO', 'TRIMESTRE', 'ID_DEPARTAMENTO', 'DEPARTAMENTO', 'ID_MUNICIPIO', 'MUNICIPIO',
+    'ID_CPOB', 'CPOB', 'AREA_CPOB', 'ID_TECNOLOGIA', 'TECNOLOGIA',
+    *COLUMNAS_AREA
+]
+
+# Esquema construido a partir del diccionario de datos de este módulo.
+# Año y trimestre se usan como etiquetas y se leen como texto; los códigos
+# DIVIPOLA se leen como enteros para usarlos como llaves.
+ESQUEMA = Esquema.desde_diccionario(
+    __doc__,
+    usar=COLUMNAS_USADAS,
+    como_texto=['ANNO', 'TRIMESTRE']
+)
+
+# Versión de la limpieza: cambiarla (o cambiar el esquema) invalida la caché columnar
+VERSION_LIMPIEZA = '3-' + ESQUEMA.huella()
 
-# Convertir los tipos de datos de las columnas de área
-cols = ['AREA_COB_CLARO', 'AREA_COB_MOVISTAR', 'AREA_COB_TIGO', 'AREA_COB_WOM', 'AREA_CPOB']
 
-df[cols] = (
-    df[cols]
-    .apply(lambda x: x.str.replace(',', '.', regex=False))  # Reemplaza coma por punto
-    .astype(float)  # Convierte a número decimal
-)
+def limpiar_datos(ruta_csv):
+    """Lee el CSV de cobertura con los tipos del diccionario de datos."""
+    return agregar_id_periodo(ESQUEMA.leer(ruta_csv))
+
+
+@grafo.nodo('df', depende=['ruta_csv'])
+def cargar_df(ruta_csv):
+    # La fuente también puede ser una base particionada por periodo (ver actualizar_base)
+    if BaseParticionada.es_base(ruta_csv):
+        return BaseParticionada(ruta_csv).leer()
+    # Leer desde la caché columnar si el CSV no ha cambiado
+    if USAR_CACHE:
+        return cargar_con_cache(ruta_csv, limpiar_datos, DIR_CACHE, version=VERSION_LIMPIEZA)
+    return limpiar_datos(ruta_csv)
+
+
+# Combinaciones distintas de las columnas del sidebar (en el orden en que
+# aparecen), para no tener que conservar el DataFrame base solo por las opciones
+COLUMNAS_SIDEBAR = ['ANNO', 'TRIMESTRE', 'DEPARTAMENTO', 'TECNOLOGIA']
+
+
+@grafo.nodo('opciones_sidebar', depende=['df'])
+def calcular_opciones_sidebar(df):
+    return df[COLUMNAS_SIDEBAR].drop_duplicates().reset_index(drop=True)
+
+
+# Índice de bitmaps por valor de los filtros del sidebar (ver filtrar_datos)
+@grafo.nodo('indice', depende=['df'])
+def construir_indice(df):
+    return IndiceBitmap(df)
+
+
+def nodos_filtrado(ruta_csv=RUTA_CSV):
+    """
+    Nodos que filtrar_datos necesita en memoria: el DataFrame base y su índice.
+    Con una base particionada no hace falta ninguno (se leen sus particiones).
+    """
+    return [] if BaseParticionada.es_base(ruta_csv) else ['df', 'indice']
+
+
+def filtrar_datos(datos, anno=None, trimestre=None, departamentos=None, tecnologias=None, limite=None):
+    """
+    Filas de cobertura que cumplen los filtros del sidebar (None o lista vacía = sin filtro).
+
+    La selección se resuelve con el índice de bitmaps (OR entre los valores de
+    una columna y AND entre columnas) y el DataFrame se recorta una sola vez
+    con las posiciones elegidas; sin filtros se retorna sin copiar. Con una
+    base particionada como fuente, año y trimestre eligen qué particiones se
+    leen (ver filtrar_particiones).
+
+    Parámetros:
+    - datos: registro de la versión de los datos (ver datos_actuales)
+    - anno, trimestre: valores del año y el trimestre
+    - departamentos, tecnologias: listas de nombres
+    - limite: número máximo de filas (None = todas)
+
+    Retorna:
+    - DataFrame con las columnas de `df` (puede ser una vista: no modificarlo)
+    """
+    filtros = {'DEPARTAMENTO': departamentos or None, 'TECNOLOGIA': tecnologias or None}
+    ruta = datos.parametros['ruta_csv']
+    if BaseParticionada.es_base(ruta):
+        return filtrar_particiones(BaseParticionada(ruta), anno, trimestre, filtros, limite)
+
+    indice = datos.obtener('indice')
+    seleccion = indice.seleccion({
+        'ANNO': None if anno is None else [anno],
+        'TRIMESTRE': None if trimestre is None else [trimestre],
+        **filtros,
+    })
+    return indice.aplicar(datos.obtener('df'), seleccion, limite)
+
+
+def filtrar_particiones(base, anno, trimestre, filtros, limite=None):
+    """
+    filtrar_datos sobre una base particionada: solo se leen las particiones del
+    año y trimestre elegidos (poda de particiones), en orden de periodo y hasta
+    completar `limite` filas. Los demás filtros usan el índice de cada partición.
+    """
+    periodos = base.periodos_para(anno, trimestre)
+    partes = []
+    faltan = limite
+    for periodo in periodos:
+        ruta = base.ruta_parte(periodo)
+        estado = ruta.stat()
+        filas, indice = particion_indexada(str(ruta), estado.st_size, estado.st_mtime_ns)
+        partes.append(indice.aplicar(filas, indice.seleccion(filtros), faltan))
+        if faltan is not None:
+            faltan -= len(partes[-1])
+            if faltan <= 0:
+                break
+    logger.debug("Filtro del sidebar: %d particiones leídas de %d", len(partes), len(base.periodos()))
+    if not partes:
+        return base.vacio()
+    return partes[0] if len(partes) == 1 else pd.concat(partes, ignore_index=True)
+
+
+@lru_cache(maxsize=8)
+def particion_indexada(ruta, tamano, modificado):
+    """
+    Filas de una partición y su índice de bitmaps. Se recuerdan las últimas
+    leídas; el tamaño y la fecha del archivo forman parte de la llave.
+    """
+    filas = pd.read_parquet(ruta)
+    if COMPACTO:
+        filas = compactar(filas)
+    return filas, IndiceBitmap(filas)
+
+
+# ============================================================================
+# MODELO ESTRELLA
+# ============================================================================
+
+# Dimensiones indexadas por código DIVIPOLA y tabla de hechos con llaves enteras.
+# Las agregaciones se hacen sobre `hechos`; los nombres se unen al final con
+# estrella.con_nombres().
+@grafo.nodo('estrella', depende=['df'])
+def construir_estrella(df):
+    return Estrella(df)
 
-# Convertir los tipos de datos de las columnas categóricas
-df['ANNO'] = df['ANNO'].astype(str)
-df['TRIMESTRE'] = df['TRIMESTRE'].astype(str)
-df['ID_DEPARTAMENTO'] = df['ID_DEPARTAMENTO'].astype(str)
-df['DEPARTAMENTO'] = df['DEPARTAMENTO'].astype(str)
-df['ID_MUNICIPIO'] = df['ID_MUNICIPIO'].astype(str)
-df['MUNICIPIO'] = df['MUNICIPIO'].astype(str)
-df['CPOB'] = df['CPOB'].astype(str)
-df['ID_TECNOLOGIA'] = df['ID_TECNOLOGIA'].astype(str)
+
+@grafo.nodo('hechos', depende=['estrella'])
+def obtener_hechos(estrella):
+    return estrella.hechos
+
+
+# Estrella solo con las tablas de dimensión para las estructuras que el dashboard
+# conserva: `estrella.hechos` comparte memoria con el DataFrame base y lo retendría
+@grafo.nodo('dimensiones', depende=['estrella'])
+def obtener_dimensiones(estrella):
+    return Estrella.desde_dimensiones(estrella.dimensiones)
+
+
+# Cubo periodo x departamento x tecnología con conteos y sumas de áreas para los gráficos
+@grafo.nodo('cubo', depende=['hechos', 'dimensiones'])
+def construir_cubo(hechos, dimensiones):
+    return Cubo(hechos, dimensiones)
+
+
+# Resúmenes unibles de CPOB distintos por celda del cubo (bitsets exactos o HyperLogLog)
+@grafo.nodo('distintos', depende=['hechos'])
+def construir_distintos(hechos):
+    return ConteoDistintos(hechos)
+
+
+def ruta_duckdb(ruta_csv):
+    """
+    Archivo DuckDB de una versión de los datos: COBERTURA_DUCKDB con la clave de
+    la fuente, la limpieza y el modo compacto (':memory:' se usa tal cual).
+    """
+    if RUTA_DUCKDB == ':memory:':
+        return RUTA_DUCKDB
+    base = Path(RUTA_DUCKDB)
+    clave = clave_instantanea(huella_fuente(ruta_csv), VERSION_LIMPIEZA, COMPACTO, ['motor_duckdb'])
+    return base.with_name(f'{base.stem}-{clave}{base.suffix}')
+
+
+# Alternativa al cubo, a los resúmenes de distintos, a los cuantiles y a los momentos:
+# consultas SQL sobre DuckDB (COBERTURA_MOTOR=duckdb)
+@grafo.nodo('motor_duckdb', depende=['hechos', 'dimensiones', 'ruta_csv'])
+def construir_motor_duckdb(hechos, dimensiones, ruta_csv):
+    return MotorDuckDB(hechos, dimensiones, ruta_duckdb(ruta_csv))
+
+
+# Nodos que dependen de un motor de consultas opcional: solo se calculan por
+# defecto (ver nodos_por_defecto) cuando COBERTURA_MOTOR elige ese motor
+MOTOR_DE_NODO = {'motor_duckdb': 'duckdb'}
+
+
+def nodos_por_defecto():
+    """Nodos que se calculan cuando no se indican nombres: todos menos los de otro motor."""
+    return [nombre for nombre in grafo.nodos if MOTOR_DE_NODO.get(nombre, MOTOR) == MOTOR]
+
+
+# Llaves de un registro por periodo, CPOB y tecnología
+LLAVES_CPOB = ['ID_PERIODO', 'ID_DEPARTAMENTO', 'ID_MUNICIPIO', 'ID_CPOB', 'ID_TECNOLOGIA']
+
+# Código de tecnología de las zonas sin cobertura (diccionario de datos)
+ID_SIN_TECNOLOGIA = 0
 
 # ============================================================================
 # DATAFRAMES PROCESADOS PARA ANÁLISIS
 # ============================================================================
 
 # Columnas de operadores
-cols_operadores = ['AREA_COB_CLARO', 'AREA_COB_MOVISTAR', 'AREA_COB_TIGO', 'AREA_COB_WOM']
+cols_operadores = COLUMNAS_AREA
+
+# Periodo del análisis específico (2024 - trimestre 4)
+ID_PERIODO_ACTUAL = id_periodo(2024, 4)
+
+# Agregaciones compartidas: los hechos se recorren una sola vez al grano común
+# de todas las consultas (periodo, departamento, municipio, CPOB, tecnología) y
+# cada DataFrame derivado se obtiene reagrupando ese intermedio.
+SUMAS_OPERADORES = {col: 'sum' for col in cols_operadores}
+
+PLAN = Planificador([
+    Consulta('sennal', LLAVES_CPOB, SUMAS_OPERADORES),
+    Consulta(
+        'resumen_cpob',
+        ['ID_PERIODO', 'ID_DEPARTAMENTO', 'ID_CPOB', 'ID_TECNOLOGIA'],
+        {'AREA_CPOB': 'first', **SUMAS_OPERADORES}
+    ),
+    Consulta(
+        'actual', LLAVES_CPOB, {'AREA_CPOB': 'first', **SUMAS_OPERADORES},
+        filtro={'ID_PERIODO': [ID_PERIODO_ACTUAL]}
+    ),
+    Consulta(
+        'registros_actual', ['ID_DEPARTAMENTO'], {'REGISTROS': ('ID_CPOB', 'size')},
+        filtro={'ID_PERIODO': [ID_PERIODO_ACTUAL]}
+    ),
+    Consulta('cpob_por_depto', ['ID_DEPARTAMENTO'], {'NUM_CPOB': ('ID_CPOB', 'nunique')}),
+    Consulta(
+        'cpob_con_internet', ['ID_DEPARTAMENTO'], {'CPOB_CON_INTERNET': ('ID_CPOB', 'nunique')},
+        excluir={'ID_TECNOLOGIA': [ID_SIN_TECNOLOGIA]}
+    ),
+    Consulta(
+        'cpob_sin_tecnologia', ['ID_PERIODO', 'ID_DEPARTAMENTO', 'ID_CPOB'],
+        filtro={'ID_TECNOLOGIA': [ID_SIN_TECNOLOGIA]}
+    ),
+    Consulta('temporal', ['ID_PERIODO', 'ID_TECNOLOGIA'], SUMAS_OPERADORES),
+])
+
+
+@grafo.nodo('agregado_base', depende=['hechos'])
+def escanear_hechos(hechos):
+    # Único recorrido de los hechos para todas las consultas del plan
+    return PLAN.escanear(hechos)
+
 
 # --- DataFrame de cobertura por señal ---
-df_sennal = (
-    df.groupby(['ANNO', 'TRIMESTRE', 'DEPARTAMENTO', 'MUNICIPIO', 'CPOB', 'TECNOLOGIA'], as_index=False)
-      [cols_operadores]
-      .sum()
-)
+@grafo.nodo('df_sennal', depende=['agregado_base', 'estrella'])
+def calcular_sennal(agregado_base, estrella):
+    return estrella.con_nombres(estrella.ordenar(PLAN.resolver('sennal', agregado_base)))
 
-# --- DataFrame resumen por CPOB y tecnología ---
-df_resumen = (
-    df.groupby(['ANNO', 'TRIMESTRE', 'DEPARTAMENTO', 'CPOB', 'TECNOLOGIA'], as_index=False)
-    .agg({
-        'AREA_CPOB': 'first',
-        'AREA_COB_CLARO': 'sum',
-        'AREA_COB_MOVISTAR': 'sum',
-        'AREA_COB_TIGO': 'sum',
-        'AREA_COB_WOM': 'sum'
-    })
-)
 
-# Calcular porcentajes de cobertura por operador
-df_resumen['PCT_CLARO'] = (df_resumen['AREA_COB_CLARO'] / df_resumen['AREA_CPOB']) * 100
-df_resumen['PCT_MOVISTAR'] = (df_resumen['AREA_COB_MOVISTAR'] / df_resumen['AREA_CPOB']) * 100
-df_resumen['PCT_TIGO'] = (df_resumen['AREA_COB_TIGO'] / df_resumen['AREA_CPOB']) * 100
-df_resumen['PCT_WOM'] = (df_resumen['AREA_COB_WOM'] / df_resumen['AREA_CPOB']) * 100
-df_resumen['PCT_PROMEDIO'] = df_resumen[['PCT_CLARO', 'PCT_MOVISTAR', 'PCT_TIGO', 'PCT_WOM']].mean(axis=1)
-df_resumen = df_resumen.round(2)
+# --- DataFrame resumen por CPOB y tecnología (también alimenta los mapas 4G) ---
+@grafo.nodo('resumen_por_cpob', depende=['agregado_base', 'estrella'])
+def calcular_resumen_por_cpob(agregado_base, estrella):
+    return estrella.ordenar(PLAN.resolver('resumen_cpob', agregado_base))
+
+
+# Histogramas unibles del % de cobertura por celda del cubo y operador (p10, mediana, p90)
+@grafo.nodo('cuantiles', depende=['resumen_por_cpob'])
+def construir_cuantiles(resumen_por_cpob):
+    return HistogramaCuantiles(resumen_por_cpob)
+
+
+@grafo.nodo('df_resumen', depende=['resumen_por_cpob', 'estrella'])
+def calcular_resumen(resumen_por_cpob, estrella):
+    # Calcular porcentajes de cobertura por operador
+    matriz = MatrizOperadores.desde_df(resumen_por_cpob)
+    df_resumen = resumen_por_cpob.assign(
+        **matriz.columnas(matriz.porcentajes(resumen_por_cpob['AREA_CPOB']), PREFIJO_PCT)
+    )
+    df_resumen['PCT_PROMEDIO'] = df_resumen[COLUMNAS_PCT].mean(axis=1)
+    return estrella.con_nombres(df_resumen.round(2))
+
 
 # --- DataFrame de cobertura general (con/sin internet) ---
-total = (
-    df[['DEPARTAMENTO', 'CPOB']]
-    .drop_duplicates()
-    .groupby('DEPARTAMENTO')
-    .size()
-    .reset_index(name='NUM_CPOB')
-)
+@grafo.nodo('df_final', depende=['agregado_base'])
+def calcular_final(agregado_base):
+    return combinar_final(
+        PLAN.resolver('cpob_por_depto', agregado_base),
+        PLAN.resolver('cpob_con_internet', agregado_base)
+    )
 
-con_internet = (
-    df[df['TECNOLOGIA'].isin(['2G', '3G', '4G', '5G'])]
-    [['DEPARTAMENTO', 'CPOB']]
-    .drop_duplicates()
-    .groupby('DEPARTAMENTO')
-    .size()
-    .reset_index(name='CPOB_CON_INTERNET')
-)
 
-df_final = total.merge(con_internet, on='DEPARTAMENTO', how='left')
-df_final['CPOB_SIN_INTERNET'] = df_final['NUM_CPOB'] - df_final['CPOB_CON_INTERNET'].fillna(0)
-df_final['%_CON_INTERNET'] = (df_final['CPOB_CON_INTERNET'] / df_final['NUM_CPOB']) * 100
-df_final['%_SIN_INTERNET'] = (df_final['CPOB_SIN_INTERNET'] / df_final['NUM_CPOB']) * 100
+def combinar_final(total, con_internet):
+    """Une el total de CPOB y los CPOB con internet por departamento y calcula los porcentajes."""
+    df_final = total.merge(con_internet, on='ID_DEPARTAMENTO', how='left')
+    df_final['CPOB_SIN_INTERNET'] = df_final['NUM_CPOB'] - df_final['CPOB_CON_INTERNET'].fillna(0)
+    df_final['%_CON_INTERNET'] = (df_final['CPOB_CON_INTERNET'] / df_final['NUM_CPOB']) * 100
+    df_final['%_SIN_INTERNET'] = (df_final['CPOB_SIN_INTERNET'] / df_final['NUM_CPOB']) * 100
+    return df_final
+
+
+@grafo.nodo('df_final_sorted', depende=['df_final', 'estrella'])
+def ordenar_final(df_final, estrella):
+    return estrella.con_nombres(estrella.ordenar(df_final).sort_values(by='CPOB_SIN_INTERNET', ascending=False))
 
-df_final_sorted = df_final.sort_values(by='CPOB_SIN_INTERNET', ascending=False)
 
 # ============================================================================
 # ANÁLISIS ESPECÍFICO PARA EL AÑO 2024 - TRIMESTRE 4
 # ============================================================================
 
-# Filtrar datos para el año 2024 y trimestre 4
-df_actual = df[(df['ANNO'] == '2024') & (df['TRIMESTRE'] == '4')].copy()
-
-# Agrupar por DEPARTAMENTO, MUNICIPIO, CPOB y TECNOLOGIA y sumar las áreas de cobertura
-df_actual = (
-    df_actual.groupby(['ANNO', 'TRIMESTRE', 'DEPARTAMENTO', 'MUNICIPIO', 'CPOB', 'TECNOLOGIA'], as_index=False)
-    .agg({
-        'AREA_CPOB': 'first',  # el área total urbana es la misma
-        'AREA_COB_CLARO': 'sum',
-        'AREA_COB_MOVISTAR': 'sum',
-        'AREA_COB_TIGO': 'sum',
-        'AREA_COB_WOM': 'sum'
-    })
-)
+# Filtrar 2024 - T4, agrupar por CPOB y TECNOLOGIA y sumar las áreas de cobertura (con llaves enteras)
+@grafo.nodo('actual_por_cpob', depende=['agregado_base', 'estrella'])
+def calcular_actual(agregado_base, estrella):
+    # Filas en el orden de los nombres (departamento, municipio, CPOB, tecnología)
+    df_actual = estrella.ordenar(PLAN.resolver('actual', agregado_base))
 
-# Calcular el área de cobertura máxima entre los operadores para cada fila
-df_actual["AREA_COB_MAX"] = df_actual[["AREA_COB_CLARO", "AREA_COB_MOVISTAR", "AREA_COB_TIGO", "AREA_COB_WOM"]].max(axis=1)
+    matriz = MatrizOperadores.desde_df(df_actual)
 
-# Identificar de qué operador es ese máximo
-df_actual["OPERADOR_MAX"] = (
-    df_actual[["AREA_COB_CLARO", "AREA_COB_MOVISTAR", "AREA_COB_TIGO", "AREA_COB_WOM"]]
-    .idxmax(axis=1)                       # obtiene el nombre de la columna con el valor máximo
-    .str.replace("AREA_COB_", "")          # quita el prefijo
-    .str.upper()                           # pone todo en mayúsculas (por estética)
-)
+    # Calcular el área de cobertura máxima entre los operadores para cada fila
+    df_actual["AREA_COB_MAX"] = matriz.maximo()
 
-# Calcular el máximo y la tecnología correspondiente por cada CPOB
-df_max_tecnologia = (
-    df_actual.loc[df_actual.groupby(['ANNO', 'TRIMESTRE', 'DEPARTAMENTO', 'MUNICIPIO', 'CPOB'])['AREA_COB_MAX'].idxmax()]
-    .copy()
-)
-# Renombrar la columna para mayor claridad
-df_max_tecnologia.rename(columns={'AREA_COB_MAX': 'AREA_COB_MAX_TECNOLOGIAS'}, inplace=True)
+    # Identificar de qué operador es ese máximo (el primero en empates)
+    df_actual["OPERADOR_MAX"] = pd.Series(matriz.operador_max(), index=df_actual.index, dtype='str')
+    return df_actual
 
-# Crear una columna que identifique la tecnología del máximo
-df_max_tecnologia['TECNOLOGIA_MAX'] = df_max_tecnologia['TECNOLOGIA']
 
-# Calcular el porcentaje de cobertura del operador con mayor área de cobertura en comparación con el área total del CPOB
-df_max_tecnologia['PORCENTAJE_COBERTURA'] = (df_max_tecnologia['AREA_COB_MAX_TECNOLOGIAS'] / df_max_tecnologia['AREA_CPOB']) * 100
-df_max_tecnologia = df_max_tecnologia.sort_values(by='PORCENTAJE_COBERTURA', ascending=True)
+@grafo.nodo('df_actual', depende=['actual_por_cpob', 'estrella'])
+def nombrar_actual(actual_por_cpob, estrella):
+    return estrella.con_nombres(actual_por_cpob)
+
+
+# Calcular el máximo y la tecnología correspondiente por cada CPOB
+@grafo.nodo('max_tecnologia_por_cpob', depende=['actual_por_cpob'])
+def calcular_max_tecnologia(df_actual):
+    # Fila de mayor área por CPOB. df_actual está en el orden de los nombres: en
+    # empates gana la primera tecnología por nombre ('2G'..'5G' antes que
+    # 'Ninguna'), como idxmax, y las posiciones ordenadas dejan los CPOB en ese orden
+    grupos, _ = codigos_grupo(df_actual, ['ID_PERIODO', 'ID_DEPARTAMENTO', 'ID_MUNICIPIO', 'ID_CPOB'])
+    posiciones = np.sort(argmax_grupo(grupos, df_actual['AREA_COB_MAX'].to_numpy()))
+    df_max_tecnologia = df_actual.iloc[posiciones].copy()
+    # Renombrar la columna para mayor claridad
+    df_max_tecnologia.rename(columns={'AREA_COB_MAX': 'AREA_COB_MAX_TECNOLOGIAS'}, inplace=True)
+
+    # Calcular el porcentaje de cobertura del operador con mayor área de cobertura en comparación con el área total del CPOB
+    df_max_tecnologia['PORCENTAJE_COBERTURA'] = (df_max_tecnologia['AREA_COB_MAX_TECNOLOGIAS'] / df_max_tecnologia['AREA_CPOB']) * 100
+    return df_max_tecnologia.sort_values(by='PORCENTAJE_COBERTURA', ascending=True)
+
+
+@grafo.nodo('df_max_tecnologia', depende=['max_tecnologia_por_cpob', 'estrella'])
+def nombrar_max_tecnologia(max_tecnologia_por_cpob, estrella):
+    df_max_tecnologia = estrella.con_nombres(max_tecnologia_por_cpob)
+    # Crear una columna que identifique la tecnología del máximo
+    df_max_tecnologia['TECNOLOGIA_MAX'] = df_max_tecnologia['TECNOLOGIA']
+    return df_max_tecnologia
+
 
 # --- Análisis por departamento ---
-df_departamento = df_max_tecnologia.groupby('DEPARTAMENTO', as_index=False).agg({
-    'PORCENTAJE_COBERTURA': 'mean',
-    'OPERADOR_MAX': lambda x: x.value_counts().idxmax()
-})
+@grafo.nodo('df_departamento', depende=['max_tecnologia_por_cpob', 'estrella'])
+def calcular_departamento(df_max_tecnologia, estrella):
+    df_departamento = df_max_tecnologia.groupby('ID_DEPARTAMENTO', as_index=False, observed=True).agg({
+        'PORCENTAJE_COBERTURA': 'mean'
+    })
+    # Operador más frecuente por departamento
+    grupos, _ = codigos_grupo(df_max_tecnologia, ['ID_DEPARTAMENTO'])
+    df_departamento['OPERADOR_MAX'] = moda_serie(grupos, df_max_tecnologia['OPERADOR_MAX'])
+    return estrella.con_nombres(estrella.ordenar(df_departamento))
+
 
-# Top 10 con menor y mayor cobertura
-top10_menor = df_departamento.sort_values(by='PORCENTAJE_COBERTURA', ascending=True).head(6)
-top10_mayor = df_departamento.sort_values(by='PORCENTAJE_COBERTURA', ascending=False).head(6)
+@grafo.nodo('df_comparativo', depende=['df_departamento'])
+def calcular_comparativo(df_departamento):
+    # Top 10 con menor y mayor cobertura
+    top10_menor = df_departamento.sort_values(by='PORCENTAJE_COBERTURA', ascending=True).head(6)
+    top10_mayor = df_departamento.sort_values(by='PORCENTAJE_COBERTURA', ascending=False).head(6)
 
-# Añadir signo negativo a los de menor cobertura (para gráfico espejo)
-top10_menor['PORCENTAJE_COBERTURA'] = -top10_menor['PORCENTAJE_COBERTURA']
+    # Añadir signo negativo a los de menor cobertura (para gráfico espejo)
+    top10_menor['PORCENTAJE_COBERTURA'] = -top10_menor['PORCENTAJE_COBERTURA']
+
+    # Unir ambos en un solo DataFrame
+    return pd.concat([top10_menor, top10_mayor])
 
-# Unir ambos en un solo DataFrame
-df_comparativo = pd.concat([top10_menor, top10_mayor])
 
 # --- Conteo por operador predominante ---
-conteo_operador = df_max_tecnologia['OPERADOR_MAX'].value_counts()
-porcentaje_operador = (conteo_operador / conteo_operador.sum()) * 100
+@grafo.nodo('conteo_operador', depende=['max_tecnologia_por_cpob'])
+def contar_operador(df_max_tecnologia):
+    return df_max_tecnologia['OPERADOR_MAX'].value_counts()
+
+
+@grafo.nodo('porcentaje_operador', depende=['conteo_operador'])
+def porcentaje_por_operador(conteo_operador):
+    return (conteo_operador / conteo_operador.sum()) * 100
+
 
 # --- Conteo por tecnología predominante ---
-conteo_tecnologia = df_max_tecnologia['TECNOLOGIA_MAX'].value_counts()
-porcentaje_tecnologia = (conteo_tecnologia / conteo_tecnologia.sum()) * 100
+@grafo.nodo('conteo_tecnologia', depende=['df_max_tecnologia'])
+def contar_tecnologia(df_max_tecnologia):
+    conteo_tecnologia = df_max_tecnologia['TECNOLOGIA_MAX'].value_counts()
+    return conteo_tecnologia[conteo_tecnologia > 0]  # las categóricas cuentan también las ausentes
+
+
+@grafo.nodo('porcentaje_tecnologia', depende=['conteo_tecnologia'])
+def porcentaje_por_tecnologia(conteo_tecnologia):
+    return (conteo_tecnologia / conteo_tecnologia.sum()) * 100
+
 
 # --- Operador predominante por municipio ---
-df_municipio = (
-    df_max_tecnologia
-    .groupby(['DEPARTAMENTO', 'MUNICIPIO', 'OPERADOR_MAX'], as_index=False)
-    .agg({'AREA_COB_MAX_TECNOLOGIAS': 'sum'})
-)
+@grafo.nodo('df_municipio_predominante', depende=['max_tecnologia_por_cpob', 'estrella'])
+def calcular_municipio_predominante(df_max_tecnologia, estrella):
+    df_municipio = (
+        df_max_tecnologia
+        .groupby(['ID_DEPARTAMENTO', 'ID_MUNICIPIO', 'OPERADOR_MAX'], as_index=False, observed=True)
+        .agg({'AREA_COB_MAX_TECNOLOGIAS': 'sum'})
+    )
+
+    grupos, _ = codigos_grupo(df_municipio, ['ID_DEPARTAMENTO', 'ID_MUNICIPIO'])
+    return estrella.con_nombres(estrella.ordenar(
+        df_municipio.iloc[
+            argmax_grupo(grupos, df_municipio['AREA_COB_MAX_TECNOLOGIAS'].to_numpy())
+        ][['ID_DEPARTAMENTO', 'ID_MUNICIPIO', 'OPERADOR_MAX']]
+    ))
 
-df_municipio_predominante = (
-    df_municipio.loc[
-        df_municipio.groupby(['DEPARTAMENTO', 'MUNICIPIO'])['AREA_COB_MAX_TECNOLOGIAS'].idxmax()
-    ][['DEPARTAMENTO', 'MUNICIPIO', 'OPERADOR_MAX']]
-)
 
 # --- Top departamentos por cantidad de registros ---
-df_filtrado = df[(df['ANNO'] == '2024') & (df['TRIMESTRE'] == '4')]
+@grafo.nodo('df_top', depende=['df', 'agregado_base'])
+def calcular_top(df, agregado_base):
+    # Seleccionar los top departamentos por cantidad de registros
+    registros = PLAN.resolver('registros_actual', agregado_base)
+    top_deptos = registros.sort_values('REGISTROS', ascending=False, kind='stable')['ID_DEPARTAMENTO'].head(30)
+    return df[(df['ID_PERIODO'] == ID_PERIODO_ACTUAL) & df['ID_DEPARTAMENTO'].isin(top_deptos)]
 
-# Seleccionar los top departamentos por cantidad de registros
-top_deptos = df_filtrado['DEPARTAMENTO'].value_counts().head(30).index
-df_top = df_filtrado[df_filtrado['DEPARTAMENTO'].isin(top_deptos)]
 
 # --- Lugares sin cobertura ---
-df_sin_tecnologia = df[(df['TECNOLOGIA'] == 'Ninguna')]
+@grafo.nodo('df_cuenta_sin_tecnologia', depende=['agregado_base', 'estrella'])
+def contar_sin_tecnologia(agregado_base, estrella):
+    # CPOB distintos sin tecnología por periodo; el año se obtiene del periodo
+    return resumir_sin_tecnologia(PLAN.resolver('cpob_sin_tecnologia', agregado_base), estrella)
+
+
+def resumir_sin_tecnologia(sin_tecnologia, estrella):
+    """Cuenta por año y departamento los CPOB distintos sin tecnología a partir de los pares por periodo."""
+    df_cuenta_sin_tecnologia = (
+        sin_tecnologia
+        .groupby([(sin_tecnologia['ID_PERIODO'] // 10).rename('ANNO'), 'ID_DEPARTAMENTO'], observed=True)['ID_CPOB']
+        .nunique()
+        .reset_index(name='NUM_CPOB_SIN_TEC')
+    )
+    df_cuenta_sin_tecnologia['ANNO'] = df_cuenta_sin_tecnologia['ANNO'].astype(str)
+    # Empates en el orden de los nombres de departamento (el ordenamiento por varias columnas es estable)
+    return estrella.con_nombres(
+        estrella.ordenar(df_cuenta_sin_tecnologia).sort_values(['ANNO', 'NUM_CPOB_SIN_TEC'], ascending=[True, False])
+    )
 
-df_cuenta_sin_tecnologia = (
-    df_sin_tecnologia
-    .groupby(['ANNO', 'DEPARTAMENTO'])['CPOB']
-    .nunique()
-    .reset_index(name='NUM_CPOB_SIN_TEC')
-)
-df_cuenta_sin_tecnologia = df_cuenta_sin_tecnologia.sort_values(['ANNO', 'NUM_CPOB_SIN_TEC'], ascending=[True, False])
 
 # --- Matriz de correlación ---
-cols_num = ['AREA_CPOB', 'AREA_COB_CLARO', 'AREA_COB_MOVISTAR', 'AREA_COB_TIGO', 'AREA_COB_WOM']
-corr_matrix = df[cols_num].corr()
+cols_num = ['AREA_CPOB', *COLUMNAS_AREA]
+
+
+@grafo.nodo('corr_matrix', depende=['hechos'])
+def calcular_correlacion(hechos):
+    return hechos[cols_num].corr()
+
+
+# Estadísticos suficientes por celda del cubo para la correlación con los filtros del sidebar
+@grafo.nodo('momentos', depende=['hechos'])
+def construir_momentos(hechos):
+    return MomentosCubo(hechos, cols_num)
+
 
 # --- Análisis temporal ---
-df_temp = (
-    df.groupby(["ANNO", "TRIMESTRE", "TECNOLOGIA"], as_index=False)
-    .agg({
-        "AREA_COB_CLARO": "sum",
-        "AREA_COB_MOVISTAR": "sum",
-        "AREA_COB_TIGO": "sum",
-        "AREA_COB_WOM": "sum"
-    })
-)
+@grafo.nodo('df_temp', depende=['agregado_base', 'estrella'])
+def calcular_temporal(agregado_base, estrella):
+    return nombrar_temporal(PLAN.resolver('temporal', agregado_base), estrella)
+
+
+def nombrar_temporal(temporal, estrella):
+    """Agrega nombres y la etiqueta PERIODO a las sumas por periodo y tecnología."""
+    df_temp = estrella.con_nombres(estrella.ordenar(temporal))
+
+    df_temp["PERIODO"] = df_temp["ANNO"].astype(str) + "-T" + df_temp["TRIMESTRE"].astype(str)
+    return df_temp
 
-df_temp["PERIODO"] = df_temp["ANNO"].astype(str) + "-T" + df_temp["TRIMESTRE"].astype(str)
 
 # Reorganizar a formato largo
-df_long = df_temp.melt(
-    id_vars=["PERIODO", "ANNO", "TRIMESTRE", "TECNOLOGIA"],
-    value_vars=cols_operadores,
-    var_name="OPERADOR",
-    value_name="AREA_COBERTURA"
-)
-df_long["OPERADOR"] = df_long["OPERADOR"].str.replace("AREA_COB_", "", regex=False)
+@grafo.nodo('df_long', depende=['df_temp'])
+def calcular_long(df_temp):
+    df_long = df_temp.melt(
+        id_vars=["PERIODO", "ANNO", "TRIMESTRE", "TECNOLOGIA"],
+        value_vars=cols_operadores,
+        var_name="OPERADOR",
+        value_name="AREA_COBERTURA"
+    )
+    df_long["OPERADOR"] = df_long["OPERADOR"].str.replace("AREA_COB_", "", regex=False)
+    return df_long
+
 
 # --- Datos en formato melt para análisis de distribución ---
-df_melt = df.melt(
-    value_vars=cols_operadores,
-    var_name='Operador',
-    value_name='Área Cobertura'
-)
-df_melt['Operador'] = df_melt['Operador'].str.replace("AREA_COB_", "", regex=False)
+@grafo.nodo('df_melt', depende=['hechos'])
+def calcular_melt(hechos):
+    df_melt = hechos.melt(
+        value_vars=cols_operadores,
+        var_name='Operador',
+        value_name='Área Cobertura'
+    )
+    df_melt['Operador'] = df_melt['Operador'].str.replace("AREA_COB_", "", regex=False)
+    return df_melt
+
 
 # ============================================================================
 # PROCESAMIENTO PARA MAPAS COROPLÉTICOS
 # ============================================================================
 
-import json
-from urllib.request import urlopen
-
-# Crear el DataFrame de Cobertura por tecnología 4G
-df_resumen_4g = (
-    df.groupby(['ANNO', 'TRIMESTRE', 'DEPARTAMENTO', 'CPOB', 'TECNOLOGIA'], as_index=False)
-    .agg({
-        'AREA_CPOB': 'first',
-        'AREA_COB_CLARO': 'sum',
-        'AREA_COB_MOVISTAR': 'sum',
-        'AREA_COB_TIGO': 'sum',
-        'AREA_COB_WOM': 'sum'
+# Crear el DataFrame de Cobertura por tecnología 4G (mismo resumen por CPOB que df_resumen)
+@grafo.nodo('pct_4g_por_cpob', depende=['resumen_por_cpob', 'estrella'])
+def calcular_pct_4g(df_resumen_4g, estrella):
+    df_4g = df_resumen_4g[df_resumen_4g['ID_TECNOLOGIA'].isin(estrella.ids('tecnologia', 'TECNOLOGIA', ['4G']))].copy()
+
+    # Calcular porcentajes de cobertura (los mayores a 100 se ajustan a 100)
+    matriz = MatrizOperadores.desde_df(df_4g)
+    return df_4g.assign(**matriz.columnas(matriz.porcentajes(df_4g['AREA_CPOB'], tope=100), PREFIJO_PCT))
+
+
+@grafo.nodo('df_4g', depende=['pct_4g_por_cpob', 'estrella'])
+def nombrar_4g(pct_4g_por_cpob, estrella):
+    return estrella.con_nombres(pct_4g_por_cpob)
+
+
+@grafo.nodo('df_cob_max_depto_4g', depende=['pct_4g_por_cpob', 'estrella'])
+def calcular_cob_max_depto_4g(df_4g, estrella):
+    # Crear DataFrame de Cobertura Máxima por Departamento
+    df_cob_max_cpob_4g = (
+        df_4g.groupby(['ID_DEPARTAMENTO', 'ID_CPOB'], observed=True)[COLUMNAS_PCT]
+        .max()
+        .reset_index()
+    )
+
+    # Promedio departamental de los PCT_COB máximos reportados
+    df_cob_max_depto_4g = estrella.con_nombres(estrella.ordenar(
+        df_cob_max_cpob_4g.groupby('ID_DEPARTAMENTO', observed=True)[COLUMNAS_PCT]
+        .mean()
+        .reset_index()
+    ))
+
+    # Renombrar columnas
+    return df_cob_max_depto_4g.rename(columns={
+        columna: columna.replace(PREFIJO_PCT, 'PCT_MAX_PROMEDIO_', 1) for columna in COLUMNAS_PCT
     })
-)
 
-df_4g = df_resumen_4g[df_resumen_4g['TECNOLOGIA'] == '4G'].copy()
 
-# Calcular porcentajes de cobertura
-df_4g['PCT_CLARO'] = (df_4g['AREA_COB_CLARO'] / df_4g['AREA_CPOB']) * 100
-df_4g['PCT_MOVISTAR'] = (df_4g['AREA_COB_MOVISTAR'] / df_4g['AREA_CPOB']) * 100
-df_4g['PCT_TIGO'] = (df_4g['AREA_COB_TIGO'] / df_4g['AREA_CPOB']) * 100
-df_4g['PCT_WOM'] = (df_4g['AREA_COB_WOM'] / df_4g['AREA_CPOB']) * 100
+# ============================================================================
+# ACTUALIZACIÓN INCREMENTAL POR PERIODO
+# ============================================================================
+
+def por_periodo(consulta):
+    """Función que calcula una consulta del plan sobre las filas de un periodo."""
+    plan = Planificador([consulta])
+    return lambda df: plan.resolver(consulta.nombre, plan.escanear(df))
+
+
+def dimension_por_periodo(dimension):
+    return lambda df: tabla_dimension(df, dimension).reset_index()
+
+
+# Agregados que se guardan por periodo en una base particionada. Al agregar un
+# trimestre solo se calculan los de ese trimestre; df_temp, df_long y
+# df_cuenta_sin_tecnologia se arman uniendo las particiones guardadas.
+AGREGADOS_POR_PERIODO = {
+    'temporal': por_periodo(PLAN.consultas['temporal']),
+    'cpob_sin_tecnologia': por_periodo(PLAN.consultas['cpob_sin_tecnologia']),
+    'dim_periodo': dimension_por_periodo('periodo'),
+    'dim_departamento': dimension_por_periodo('departamento'),
+    'dim_tecnologia': dimension_por_periodo('tecnologia'),
+}
+
+
+def estrella_de_base(base):
+    """Estrella con las dimensiones de periodo, departamento y tecnología guardadas en la base."""
+    dimensiones = {}
+    for dimension in ('periodo', 'departamento', 'tecnologia'):
+        nombre = 'dim_' + dimension
+        tabla = base.leer_agregado(nombre, AGREGADOS_POR_PERIODO[nombre])
+        llave = tabla.columns[0]
+        dimensiones[dimension] = tabla.drop_duplicates(subset=[llave]).set_index(llave).sort_index()
+    return Estrella.desde_dimensiones(dimensiones)
+
+
+def frames_de_base(base):
+    """df_temp y df_cuenta_sin_tecnologia calculados desde los agregados por periodo de la base."""
+    estrella = estrella_de_base(base)
+    temporal = base.leer_agregado('temporal', AGREGADOS_POR_PERIODO['temporal'])
+    sin_tecnologia = base.leer_agregado('cpob_sin_tecnologia', AGREGADOS_POR_PERIODO['cpob_sin_tecnologia'])
+    return {
+        'df_temp': nombrar_temporal(temporal, estrella),
+        'df_cuenta_sin_tecnologia': resumir_sin_tecnologia(sin_tecnologia, estrella),
+    }
 
-# Ajustar porcentajes mayores a 100
-df_4g[['PCT_CLARO', 'PCT_MOVISTAR', 'PCT_TIGO', 'PCT_WOM']] = (
-    df_4g[['PCT_CLARO', 'PCT_MOVISTAR', 'PCT_TIGO', 'PCT_WOM']].clip(upper=100)
-)
 
-# Crear DataFrame de Cobertura Máxima por Departamento
-df_cob_max_cpob_4g = (
-    df_4g.groupby(['DEPARTAMENTO', 'CPOB'])[['PCT_CLARO', 'PCT_MOVISTAR', 'PCT_TIGO', 'PCT_WOM']]
-    .max()
-    .reset_index()
-)
+def actualizar_base(ruta_csv, directorio):
+    """
+    Agrega a una base particionada los periodos de un CSV con el formato de datos.gov.co.
+
+    Todos los periodos del CSV deben ser nuevos; si alguno ya está cargado no
+    se escribe nada. Los periodos existentes no se leen ni se recalculan.
+
+    Parámetros:
+    - ruta_csv: CSV con las filas del trimestre (o trimestres) nuevos
+    - directorio: carpeta de la base
+
+    Retorna:
+    - list con los ID_PERIODO agregados
+    """
+    base = BaseParticionada(directorio)
+    nuevo = limpiar_datos(ruta_csv)
+    base.validar_nuevos(nuevo)
+    return [
+        base.agregar_periodo(filas.reset_index(drop=True), AGREGADOS_POR_PERIODO)
+        for _, filas in nuevo.groupby('ID_PERIODO', sort=True)
+    ]
 
-# Promedio departamental de los PCT_COB máximos reportados
-df_cob_max_depto_4g = (
-    df_cob_max_cpob_4g.groupby('DEPARTAMENTO')[['PCT_CLARO', 'PCT_MOVISTAR', 'PCT_TIGO', 'PCT_WOM']]
-    .mean()
-    .reset_index()
+
+# ============================================================================
+# REGISTRO Y ACCESO PEREZOSO
+# ============================================================================
+
+# Bytes antes y después de compactar cada nodo (solo con COBERTURA_COMPACTO=1)
+reporte_compacto = {}
+
+
+# Nodos internos (esquema estrella, intermedio del plan y estructuras de consulta): no se compactan
+NODOS_SIN_COMPACTAR = (
+    'estrella', 'dimensiones', 'hechos', 'agregado_base', 'indice', 'cubo', 'distintos', 'cuantiles', 'momentos',
+    'motor_duckdb'
 )
 
-# Renombrar columnas
-df_cob_max_depto_4g.rename(columns={
-    'PCT_CLARO': 'PCT_MAX_PROMEDIO_CLARO',
-    'PCT_MOVISTAR': 'PCT_MAX_PROMEDIO_MOVISTAR',
-    'PCT_TIGO': 'PCT_MAX_PROMEDIO_TIGO',
-    'PCT_WOM': 'PCT_MAX_PROMEDIO_WOM'
-}, inplace=True)
-
-# Cargar GeoJSON de Colombia
-url_geojson = 'https://gist.githubusercontent.com/john-guerra/43c7656821069d00dcbc/raw/be6a6e239cd5b5b803c6e7c2ec405b793a9064dd/Colombia.geo.json'
-
-try:
-    with urlopen(url_geojson) as response:
-        counties = json.load(response)
-    
-    # Mapeo de nombres de departamentos
-    mapeo_nombres = {
-        'ARCHIPIELAGO DE SAN ANDRES PROVIDENCIA Y SANTA CATALINA': 'SAN ANDRES',
-        'SANTAFE DE BOGOTA D.C': 'BOGOTÁ. D.C.',
-        'AMAZONAS': 'AMAZONAS',
-        'ANTIOQUIA': 'ANTIOQUIA',
-        'ARAUCA': 'ARAUCA',
-        'ATLANTICO': 'ATLÁNTICO',
-        'BOLIVAR': 'BOLÍVAR',
-        'BOYACA': 'BOYACÁ',
-        'CALDAS': 'CALDAS',
-        'CAQUETA': 'CAQUETÁ',
-        'CASANARE': 'CASANARE',
-        'CAUCA': 'CAUCA',
-        'CESAR': 'CESAR',
-        'CHOCO': 'CHOCÓ',
-        'CORDOBA': 'CÓRDOBA',
-        'CUNDINAMARCA': 'CUNDINAMARCA',
-        'GUAINIA': 'GUAINÍA',
-        'GUAVIARE': 'GUAVIARE',
-        'HUILA': 'HUILA',
-        'LA GUAJIRA': 'LA GUAJIRA',
-        'MAGDALENA': 'MAGDALENA',
-        'META': 'META',
-        'NARIÑO': 'NARIÑO',
-        'NORTE DE SANTANDER': 'NORTE DE SANTANDER',
-        'PUTUMAYO': 'PUTUMAYO',
-        'QUINDIO': 'QUINDÍO',
-        'RISARALDA': 'RISARALDA',
-        'SANTANDER': 'SANTANDER',
-        'SUCRE': 'SUCRE',
-        'TOLIMA': 'TOLIMA',
-        'VALLE DEL CAUCA': 'VALLE DEL CAUCA',
-        'VAUPES': 'VAUPÉS',
-        'VICHADA': 'VICHADA'
+
+def compactar_nodo(nombre, valor):
+    """Modo compacto: dimensiones categóricas y áreas en float32 en cada DataFrame calculado."""
+    if not COMPACTO or nombre in NODOS_SIN_COMPACTAR:
+        return valor
+    antes = bytes_en_memoria(valor)
+    valor = compactar(valor)
+    reporte_compacto[nombre] = (antes, bytes_en_memoria(valor))
+    return valor
+
+
+def crear_registro(ruta_csv=RUTA_CSV):
+    """
+    Crea un registro perezoso de todos los DataFrames para un CSV de cobertura
+    o para una base particionada por periodo (en ese caso la serie temporal y
+    los CPOB sin tecnología salen de los agregados guardados por periodo).
+    """
+    parametros = {'ruta_csv': ruta_csv}
+    if BaseParticionada.es_base(ruta_csv):
+        parametros.update(frames_de_base(BaseParticionada(ruta_csv)))
+    return Registro(grafo, parametros=parametros, postproceso=compactar_nodo)
+
+
+registro = crear_registro()
+
+# Versión vigente de los datos. `registro` nunca se modifica: la recarga en
+# caliente construye un registro nuevo y lo publica reemplazando la referencia
+version_datos = 1
+# Carpeta de la instantánea cuyos DataFrames usa `registro` (None si no usa ninguna)
+instantanea_actual = None
+# Nodos que se precalculan, y que se calculan de nuevo en cada recarga
+nodos_precalculados = None
+vigilante = None
+_candado_version = threading.Lock()
+
+
+def datos_actuales():
+    """
+    Registro de la versión vigente de los datos. Una ejecución del dashboard
+    lo toma una vez y usa solo ese: si entretanto se publica una versión
+    nueva, la ejecución termina con la anterior.
+    """
+    return registro
+
+
+# Prefijo de las tablas de dimensión en la instantánea (de ellas se arma el nodo 'dimensiones')
+PREFIJO_DIMENSION = 'dim_'
+
+
+def valores_instantanea(datos, nombres):
+    """
+    DataFrames y Series de `datos` que se publican para servir los nodos
+    `nombres`: los pedidos que son DataFrames o Series y, por cada nodo pedido
+    que no lo es (cubo, índice...), los DataFrames de los que se calcula; de
+    'dimensiones' se publican sus tablas. Los intermedios que no hacen falta
+    (el DataFrame base, el agregado del plan...) no se publican, y los hechos
+    tampoco si se publica el DataFrame base (se toman de él sin copiar).
+    """
+    valores = {}
+
+    def agregar(nombre):
+        if nombre in valores or nombre in datos.parametros:
+            return
+        valor = datos.obtener(nombre)
+        if isinstance(valor, (pd.DataFrame, pd.Series)):
+            valores[nombre] = valor
+        elif nombre == 'dimensiones':
+            valores.update({PREFIJO_DIMENSION + dimension: tabla for dimension, tabla in valor.dimensiones.items()})
+        else:
+            for dependencia in grafo.nodos[nombre].depende:
+                agregar(dependencia)
+
+    for nombre in nombres:
+        agregar(nombre)
+    if 'df' in valores:
+        valores.pop('hechos', None)
+    return valores
+
+
+def construir_instantanea(ruta_csv, nombres, trabajadores=TRABAJADORES):
+    """Calcula los nodos en un registro propio y retorna lo que se publica en la instantánea (ver valores_instantanea)."""
+    nuevo = crear_registro(ruta_csv)
+    nuevo.materializar(nombres, trabajadores=trabajadores)
+    return valores_instantanea(nuevo, nombres)
+
+
+def registro_desde_instantanea(parametros, nombres=None, trabajadores=TRABAJADORES):
+    """
+    Registro cuyos DataFrames vienen de la instantánea mapeada en memoria de
+    COBERTURA_INSTANTANEA (publicándola si no existe). Los nodos que no son
+    DataFrames (cubo, índice...) se calculan en cada proceso a partir de los
+    DataFrames mapeados.
+
+    Retorna:
+    - (registro, carpeta de la instantánea)
+    """
+    ruta = parametros['ruta_csv']
+    nombres = nodos_por_defecto() if nombres is None else list(nombres)
+    clave = clave_instantanea(huella_fuente(ruta), VERSION_LIMPIEZA, COMPACTO, nombres)
+    carpeta, valores = cargar_o_publicar(
+        DIR_INSTANTANEA, clave, lambda: construir_instantanea(ruta, nombres, trabajadores)
+    )
+    dimensiones = {
+        nombre[len(PREFIJO_DIMENSION):]: valores.pop(nombre)
+        for nombre in list(valores) if nombre.startswith(PREFIJO_DIMENSION)
     }
-    
-    # Aplicar mapeo
-    for feature in counties['features']:
-        nombre_geojson = feature['properties']['NOMBRE_DPT']
-        if nombre_geojson in mapeo_nombres:
-            feature['properties']['NOMBRE_DPT'] = mapeo_nombres[nombre_geojson]
-        feature['id'] = feature['properties']['NOMBRE_DPT']
-    
-except Exception as e:
-    print(f"Error al cargar GeoJSON: {e}")
-    counties = None
+    if dimensiones:
+        valores['dimensiones'] = Estrella.desde_dimensiones(dimensiones)
+    return Registro(grafo, parametros=dict(parametros, **valores), postproceso=compactar_nodo), carpeta
+
+
+def usar_instantanea(nombres=None, trabajadores=TRABAJADORES):
+    """Reemplaza `registro` por uno con los DataFrames de la instantánea compartida."""
+    global registro, instantanea_actual
+    with _candado_version:
+        if instantanea_actual is None:
+            registro, instantanea_actual = registro_desde_instantanea(registro.parametros, nombres, trabajadores)
+
+
+def construir_version(ruta_csv, nombres=None, trabajadores=TRABAJADORES):
+    """
+    Registro nuevo para la fuente, con los nodos `nombres` ya calculados
+    (los de nodos_por_defecto() si es None).
+
+    Retorna:
+    - (registro, carpeta de la instantánea o None)
+    """
+    nombres = nodos_por_defecto() if nombres is None else nombres
+    nuevo = crear_registro(ruta_csv)
+    carpeta = None
+    if DIR_INSTANTANEA is not None:
+        nuevo, carpeta = registro_desde_instantanea(nuevo.parametros, nombres, trabajadores)
+    nuevo.materializar(nombres, trabajadores=trabajadores)
+    nuevo.liberar(nombres)
+    return nuevo, carpeta
+
+
+def publicar_version(nuevo, carpeta=None):
+    """
+    Publica `nuevo` como la versión vigente. El registro anterior (y su
+    instantánea) se libera cuando ya ninguna ejecución del dashboard lo usa.
+    """
+    global registro, instantanea_actual, version_datos
+    with _candado_version:
+        anterior, carpeta_anterior = registro, instantanea_actual
+        version_datos += 1
+        version = nuevo.version = version_datos
+        registro, instantanea_actual = nuevo, carpeta
+    weakref.finalize(anterior, liberar_version, version - 1, carpeta_anterior)
+    logger.info("Versión %d de los datos publicada", version)
+
+
+def liberar_version(version, carpeta):
+    """Suelta la instantánea de una versión que ya no usa ninguna ejecución (se borra si ningún proceso la usa)."""
+    logger.info("Versión %d de los datos liberada", version)
+    if carpeta is not None:
+        soltar_instantanea(carpeta)
+
+
+def recargar(trabajadores=TRABAJADORES):
+    """Construye la versión de los datos de la fuente actual y la publica."""
+    ruta = registro.parametros['ruta_csv']
+    inicio = time.perf_counter()
+    nuevo, carpeta = construir_version(ruta, nodos_precalculados, trabajadores)
+    logger.info("Versión nueva de %s construida en %.3f s", ruta, time.perf_counter() - inicio)
+    publicar_version(nuevo, carpeta)
+
+
+def iniciar_recarga(intervalo=RECARGA_SEGUNDOS):
+    """Arranca (una sola vez) el hilo que recarga los datos cuando cambia la fuente."""
+    global vigilante
+    with _candado_version:
+        if vigilante is None:
+            ruta = registro.parametros['ruta_csv']
+            vigilante = Vigilante(lambda: huella_fuente(ruta, con_hash=False), recargar, intervalo)
+            vigilante.start()
+            logger.info("Recarga en caliente de %s cada %s s", ruta, intervalo)
+
+
+def precalcular(nombres=None, trabajadores=TRABAJADORES):
+    """
+    Calcula de una vez los nodos indicados (si nombres es None, todos menos
+    el motor DuckDB cuando COBERTURA_MOTOR no lo elige) y descarta los demás
+    valores calculados para llegar a ellos.
+
+    Con COBERTURA_TRABAJADORES > 1 las ramas independientes (mapas 4G,
+    predominancia 2024-T4, correlación, cobertura general...) se calculan en
+    paralelo compartiendo el mismo DataFrame base. Con COBERTURA_INSTANTANEA
+    los DataFrames salen de la instantánea compartida entre procesos, y con
+    COBERTURA_RECARGA_SEGUNDOS > 0 se vuelven a calcular cuando cambia la fuente.
+    Con COBERTURA_COMPACTO=1 el ahorro de memoria de cada nodo queda en el log.
+    """
+    global nodos_precalculados
+    nombres = nodos_por_defecto() if nombres is None else nombres
+    nodos_precalculados = nombres
+    abrir_instantanea = DIR_INSTANTANEA is not None and instantanea_actual is None
+    if abrir_instantanea:
+        usar_instantanea(nombres, trabajadores)
+    datos = datos_actuales()
+    previos = set(datos.materializados())
+    datos.materializar(nombres, trabajadores=trabajadores)
+    calculados = set(datos.materializados()) - previos
+    # Los intermedios (DataFrame base, hechos, agregado del plan...) no se conservan
+    datos.liberar(nombres)
+    if abrir_instantanea:
+        logger.info("Memoria del proceso con la instantánea: %s", memoria_instantanea())
+    # Cada ejecución del dashboard vuelve a llamar a precalcular(): el reporte solo
+    # se escribe cuando se calculó algo
+    if COMPACTO and calculados:
+        reporte_memoria()
+    if RECARGA_SEGUNDOS > 0:
+        iniciar_recarga()
+
+
+def memoria_instantanea():
+    """Memoria del proceso (bytes) y la parte que son páginas de la instantánea, según /proc."""
+    return memoria_proceso(carpeta=DIR_INSTANTANEA)
+
+
+def reporte_memoria():
+    """Escribe en el log los bytes antes y después del modo compacto de los nodos calculados."""
+    return registrar_reporte(reporte_compacto)
+
+
+def __getattr__(nombre):
+    # Acceso perezoso: `read_csv.df_top` calcula el nodo la primera vez que se pide
+    if nombre in grafo.nodos:
+        return registro.obtener(nombre)
+    raise AttributeError(f"module {__name__!r} has no attribute {nombre!r}")
@@ -0,0 +1,64 @@
+"""
+Recarga en caliente de los datos cuando cambia la fuente.
+
+Un hilo en segundo plano revisa cada cierto tiempo la huella rápida de la
+fuente (tamaño y fecha de modificación del CSV, o de cada archivo de una base
+particionada). Cuando cambia y se mantiene igual en la revisión siguiente (el
+archivo terminó de copiarse), construye la versión nueva de los datos fuera
+del camino de las peticiones y la publica. Si la construcción falla se
+conserva la versión anterior y se vuelve a intentar con el siguiente cambio.
+"""
+
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class Vigilante(threading.Thread):
+    """
+    Hilo que llama `recargar()` cuando la huella de la fuente cambia.
+
+    Parámetros:
+    - huella: función sin argumentos que retorna la huella actual de la fuente
+    - recargar: función sin argumentos que construye y publica la versión nueva
+    - intervalo: segundos entre revisiones
+    """
+
+    def __init__(self, huella, recargar, intervalo):
+        super().__init__(name='recarga-datos', daemon=True)
+        self.huella = huella
+        self.recargar = recargar
+        self.intervalo = intervalo
+        self._detener = threading.Event()
+        self._ultima = huella()
+
+    def detener(self):
+        self._detener.set()
+
+    def revisar(self, pendiente=None):
+        """
+        Una revisión: retorna la huella pendiente de confirmar (cambió en esta
+        revisión) o None. Recarga si la huella cambió y ya estaba pendiente.
+        """
+        try:
+            actual = self.huella()
+        except OSError as e:
+            # La fuente puede no existir un momento mientras se reemplaza
+            logger.warning("No se pudo leer la huella de la fuente: %s", e)
+            return None
+        if actual == self._ultima:
+            return None
+        if actual != pendiente:
+            return actual
+        self._ultima = actual
+        try:
+            self.recargar()
+        except Exception:
+            logger.exception("No se pudo recargar los datos; se conserva la versión anterior")
+        return None
+
+    def run(self):
+        pendiente = None
+        while not self._detener.wait(self.intervalo):
+            pendiente = self.revisar(pendiente)
@@ -0,0 +1,218 @@
+"""
+Registro perezoso de DataFrames derivados con dependencias declaradas.
+
+Cada DataFrame derivado se declara como un nodo de un Grafo con el nombre de
+los nodos de los que depende. Un Registro es una instancia del grafo para una
+fuente de datos concreta: calcula cada nodo la primera vez que se pide (y solo
+los nodos que necesita), guarda el resultado y anota cuánto tardó y cuánta
+memoria ocupa.
+
+Las ramas independientes del grafo pueden calcularse en paralelo con
+Registro.materializar(trabajadores=N). Se usan hilos para que todos compartan
+el mismo DataFrame base sin copiarlo; pandas y NumPy liberan el GIL en buena
+parte de las agrupaciones y operaciones vectorizadas.
+"""
+
+import logging
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import pandas as pd
+
+from dashboard_code.compacto import bytes_en_memoria
+
+logger = logging.getLogger(__name__)
+
+
+class Nodo:
+    """Definición de un nodo: nombre, función y nombres de sus dependencias."""
+
+    def __init__(self, nombre, funcion, depende):
+        self.nombre = nombre
+        self.funcion = funcion
+        self.depende = tuple(depende)
+
+    def __repr__(self):
+        return f"Nodo({self.nombre!r}, depende={list(self.depende)})"
+
+
+class Grafo:
+    """Conjunto de definiciones de nodos."""
+
+    def __init__(self):
+        self.nodos = {}
+
+    def nodo(self, nombre, depende=()):
+        """
+        Decorador que registra una función como nodo.
+
+        La función recibe como argumentos posicionales los valores de los
+        nodos de `depende`, en el mismo orden.
+        """
+        def decorador(funcion):
+            if nombre in self.nodos:
+                raise ValueError(f"El nodo '{nombre}' ya está definido")
+            self.nodos[nombre] = Nodo(nombre, funcion, depende)
+            return funcion
+        return decorador
+
+    def validar(self, parametros=()):
+        """Lanza ValueError si alguna dependencia no está definida o hay ciclos."""
+        conocidos = set(self.nodos) | set(parametros)
+        for nodo in self.nodos.values():
+            faltantes = [d for d in nodo.depende if d not in conocidos]
+            if faltantes:
+                raise ValueError(f"El nodo '{nodo.nombre}' depende de nodos no definidos: {faltantes}")
+        self.orden(list(self.nodos), parametros)
+
+    def orden(self, nombres, parametros=()):
+        """Retorna los nodos necesarios para calcular `nombres` en orden topológico."""
+        resultado = []
+        estado = {}  # nombre -> 'visitando' | 'listo'
+
+        def visitar(nombre, camino):
+            if nombre in parametros or estado.get(nombre) == 'listo':
+                return
+            if estado.get(nombre) == 'visitando':
+                raise ValueError(f"Dependencia circular: {' -> '.join(camino + [nombre])}")
+            estado[nombre] = 'visitando'
+            for dep in self.nodos[nombre].depende:
+                visitar(dep, camino + [nombre])
+            estado[nombre] = 'listo'
+            resultado.append(nombre)
+
+        for nombre in nombres:
+            visitar(nombre, [])
+        return resultado
+
+
+class Registro:
+    """
+    Instancia memoizada de un Grafo.
+
+    Parámetros:
+    - grafo: Grafo con las definiciones
+    - parametros: dict con valores fijos que los nodos pueden declarar como dependencia
+    - postproceso: función opcional (nombre, valor) -> valor aplicada a cada resultado
+    - version: número de versión de los datos (lo asigna quien publica el registro)
+    """
+
+    def __init__(self, grafo, parametros=None, postproceso=None, version=1):
+        self.grafo = grafo
+        self.version = version
+        self.parametros = dict(parametros or {})
+        self.postproceso = postproceso
+        self.grafo.validar(self.parametros)
+        self._valores = {}
+        self._costos = {}
+        # Un candado por nodo: dos hilos no calculan el mismo nodo, pero sí nodos distintos.
+        # Los candados se toman siguiendo las dependencias (un DAG), así que no hay bloqueos mutuos.
+        self._candados = {nombre: threading.Lock() for nombre in self.grafo.nodos}
+
+    def __contains__(self, nombre):
+        return nombre in self.grafo.nodos or nombre in self.parametros
+
+    def obtener(self, nombre):
+        """Retorna el valor del nodo, calculándolo (con sus dependencias) si hace falta."""
+        if nombre in self.parametros:
+            return self.parametros[nombre]
+        if nombre in self._valores:
+            return self._valores[nombre]
+        if nombre not in self.grafo.nodos:
+            raise KeyError(f"Nodo desconocido: {nombre}")
+
+        with self._candados[nombre]:
+            if nombre not in self._valores:
+                self._calcular(nombre)
+        return self._valores[nombre]
+
+    def _calcular(self, nombre):
+        nodo = self.grafo.nodos[nombre]
+        argumentos = [self.obtener(dep) for dep in nodo.depende]
+        inicio = time.perf_counter()
+        valor = nodo.funcion(*argumentos)
+        if self.postproceso is not None:
+            valor = self.postproceso(nombre, valor)
+        segundos = time.perf_counter() - inicio
+        self._valores[nombre] = valor
+        self._costos[nombre] = {'segundos': segundos, 'bytes': bytes_en_memoria(valor)}
+        logger.debug("Nodo %s calculado en %.3f s", nombre, segundos)
+
+    def materializar(self, nombres=None, trabajadores=1):
+        """
+        Calcula los nodos indicados (todos si nombres es None) y sus dependencias.
+
+        Con trabajadores > 1 cada nodo se envía a un pool de hilos en cuanto sus
+        dependencias están listas, de modo que las ramas independientes del grafo
+        se calculan a la vez. El resultado es el mismo que el cálculo en serie.
+        """
+        nombres = list(self.grafo.nodos) if nombres is None else list(nombres)
+        # Los nodos ya calculados no se recorren: sus dependencias pueden haberse liberado
+        orden = self.grafo.orden(nombres, set(self.parametros) | set(self._valores))
+        if trabajadores <= 1 or len(orden) <= 1:
+            for nombre in orden:
+                self.obtener(nombre)
+            return
+
+        faltan = {
+            nombre: {dep for dep in self.grafo.nodos[nombre].depende if dep in orden}
+            for nombre in orden
+        }
+        dependientes = {nombre: [] for nombre in orden}
+        for nombre, deps in faltan.items():
+            for dep in deps:
+                dependientes[dep].append(nombre)
+
+        inicio = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=trabajadores, thread_name_prefix='registro') as pool:
+            en_curso = {
+                pool.submit(self.obtener, nombre): nombre
+                for nombre, deps in faltan.items() if not deps
+            }
+            while en_curso:
+                terminados, _ = wait(en_curso, return_when=FIRST_COMPLETED)
+                for futuro in terminados:
+                    nombre = en_curso.pop(futuro)
+                    futuro.result()  # propaga la excepción del nodo
+                    for siguiente in dependientes[nombre]:
+                        faltan[siguiente].discard(nombre)
+                        if not faltan[siguiente]:
+                            en_curso[pool.submit(self.obtener, siguiente)] = siguiente
+        logger.info(
+            "%d nodos calculados con %d hilos en %.3f s",
+            len(orden), trabajadores, time.perf_counter() - inicio
+        )
+
+    def liberar(self, conservar):
+        """
+        Descarta los valores calculados que no están en `conservar` (por
+        ejemplo los intermedios de los nodos que se consultan). Un nodo
+        descartado se calcula de nuevo si se vuelve a pedir.
+        """
+        conservar = set(conservar)
+        for nombre in self.materializados():
+            if nombre not in conservar:
+                self._valores.pop(nombre, None)
+
+    def materializados(self):
+        """Retorna los nombres de los nodos ya calculados, en el orden en que se calcularon."""
+        return list(self._valores)
+
+    def costos(self):
+        """Retorna dict {nombre: {'segundos': float, 'bytes': int}} de los nodos calculados."""
+        return {nombre: dict(costo) for nombre, costo in self._costos.items()}
+
+    def reporte(self):
+        """Retorna un DataFrame con el estado, tiempo propio y memoria de cada nodo."""
+        filas = []
+        for nombre, nodo in self.grafo.nodos.items():
+            costo = self._costos.get(nombre, {})
+            filas.append({
+                'NODO': nombre,
+                'MATERIALIZADO': nombre in self._valores,
+                'SEGUNDOS': costo.get('segundos'),
+                'BYTES': costo.get('bytes'),
+                'DEPENDE': ', '.join(nodo.depende),
+            })
+        return pd.DataFrame(filas)
@@ -0,0 +1,195 @@
+"""
+Caché de resultados de los gráficos compartida entre sesiones.
+
+El preprocesamiento de cada gráfico (conteos del cubo, CPOB distintos,
+series temporales...) depende solo de la versión de los datos y del estado
+de los filtros del sidebar, y la mayoría de los usuarios llega con los
+filtros por defecto. La caché guarda cada resultado bajo (versión, gráfico,
+filtros normalizados) y la comparten todas las sesiones del proceso.
+
+Se expulsa por bytes y no por número de entradas: cuando el total supera
+COBERTURA_CACHE_RESULTADOS_MB se descartan los resultados usados hace más
+tiempo (LRU). Al llegar una versión nueva de los datos se vacía. Los
+resultados son compartidos y no deben modificarse.
+
+La misma estructura guarda las figuras de Plotly ya construidas (FIGURAS)
+para los gráficos que lo piden: la clave es el tipo de gráfico, una huella de
+los datos y los argumentos del gráfico, y una figura repetida no se vuelve a
+construir ni a validar.
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict, namedtuple
+
+import numpy as np
+import pandas as pd
+
+from dashboard_code.compacto import bytes_en_memoria
+from dashboard_code.config import MAX_BYTES_FIGURAS, MAX_BYTES_RESULTADOS
+
+# Clave de un resultado: versión de los datos, identificador del gráfico y filtros normalizados
+ClaveResultado = namedtuple('ClaveResultado', ['version', 'grafico', 'estado'])
+
+
+def normalizar(valor):
+    """
+    Forma hashable y canónica de un estado de filtros: los dict se ordenan por
+    llave y las selecciones (listas, arrays, Index) se ordenan, porque el
+    orden en que se eligen los valores no cambia el resultado.
+    """
+    if isinstance(valor, dict):
+        return tuple(sorted((llave, normalizar(v)) for llave, v in valor.items()))
+    if isinstance(valor, (list, tuple, set, np.ndarray, pd.Index, pd.Series)):
+        return tuple(sorted(normalizar(v) for v in valor))
+    if isinstance(valor, np.generic):
+        return valor.item()
+    return valor
+
+
+def congelar(valor):
+    """
+    Forma hashable de los argumentos de un gráfico conservando el orden de las
+    listas (en category_orders o en una escala de colores el orden importa).
+    Los datos (DataFrame, Series, arrays) se reemplazan por su huella, y los
+    objetos que traen su propia huella (el GeoJSON del almacén de geometrías)
+    por esa huella, sin recorrerlos.
+    """
+    huella = getattr(valor, 'huella', None)
+    if huella is not None:
+        return ('huella', congelar(huella))
+    if isinstance(valor, dict):
+        return tuple(sorted((str(llave), congelar(v)) for llave, v in valor.items()))
+    if isinstance(valor, (list, tuple)):
+        return tuple(congelar(v) for v in valor)
+    if isinstance(valor, (pd.DataFrame, pd.Series, pd.Index, np.ndarray)):
+        return huella_datos(valor)
+    if isinstance(valor, np.generic):
+        return valor.item()
+    try:
+        hash(valor)
+    except TypeError:
+        return repr(valor)
+    return valor
+
+
+def huella_datos(datos):
+    """Huella del contenido de un DataFrame, Series, Index o array (valores, índice, columnas y tipos)."""
+    h = hashlib.blake2b(digest_size=16)
+    if isinstance(datos, np.ndarray):
+        h.update(repr((datos.dtype.str, datos.shape)).encode('utf-8'))
+        h.update(np.ascontiguousarray(datos).tobytes() if datos.dtype != object else repr(datos.tolist()).encode('utf-8'))
+        return h.hexdigest()
+    if isinstance(datos, pd.Index):
+        datos = datos.to_series(index=pd.RangeIndex(len(datos)))
+    h.update(pd.util.hash_pandas_object(datos, index=True).to_numpy().tobytes())
+    if isinstance(datos, pd.DataFrame):
+        h.update(repr([(str(c), str(t)) for c, t in datos.dtypes.items()]).encode('utf-8'))
+    else:
+        h.update(repr((datos.name, str(datos.dtype))).encode('utf-8'))
+    return h.hexdigest()
+
+
+def clave_resultado(version, grafico, *estados):
+    """Clave de la caché para un gráfico con la versión de los datos y el estado de los filtros que usa."""
+    return ClaveResultado(version, grafico, tuple(normalizar(estado) for estado in estados))
+
+
+class CacheResultados:
+    """
+    Caché LRU acotada por bytes.
+
+    Parámetros:
+    - max_bytes: bytes máximos de los resultados guardados (0 desactiva la caché)
+    - medir: función que retorna los bytes de un resultado
+    """
+
+    def __init__(self, max_bytes, medir=bytes_en_memoria):
+        self.max_bytes = max_bytes
+        self.medir = medir
+        self.version = None
+        self.bytes = 0
+        self.aciertos = 0
+        self.fallos = 0
+        self._entradas = OrderedDict()  # clave -> (valor, bytes)
+        self._candado = threading.Lock()
+
+    def limpiar(self):
+        with self._candado:
+            self._entradas.clear()
+            self.bytes = 0
+
+    def obtener_o_calcular(self, clave, calcular):
+        """
+        Retorna el resultado guardado bajo `clave` o lo calcula con `calcular()`.
+
+        Una clave de una versión más nueva que la guardada vacía la caché; el
+        resultado de una ejecución que sigue con una versión anterior se
+        calcula pero no se guarda. Las claves con versión None dependen solo de
+        su contenido y se guardan con cualquier versión. Un resultado None o
+        más grande que max_bytes tampoco se guarda.
+        """
+        with self._candado:
+            if clave.version is not None and (self.version is None or clave.version > self.version):
+                self._entradas.clear()
+                self.bytes = 0
+                self.version = clave.version
+            entrada = self._entradas.get(clave)
+            if entrada is not None:
+                self._entradas.move_to_end(clave)
+                self.aciertos += 1
+                return entrada[0]
+            self.fallos += 1
+
+        # Se calcula fuera del candado: las demás sesiones no esperan
+        valor = calcular()
+        if valor is None:
+            return valor
+        tamano = self.medir(valor)
+        with self._candado:
+            vigente = clave.version is None or clave.version == self.version
+            if not vigente or tamano > self.max_bytes or clave in self._entradas:
+                return valor
+            self._entradas[clave] = (valor, tamano)
+            self.bytes += tamano
+            while self.bytes > self.max_bytes:
+                _, (_, liberados) = self._entradas.popitem(last=False)
+                self.bytes -= liberados
+        return valor
+
+    def estadisticas(self):
+        """dict con aciertos, fallos, tasa de aciertos, entradas y bytes residentes."""
+        with self._candado:
+            consultas = self.aciertos + self.fallos
+            return {
+                'ACIERTOS': self.aciertos,
+                'FALLOS': self.fallos,
+                'TASA_ACIERTOS': self.aciertos / consultas if consultas else 0.0,
+                'ENTRADAS': len(self._entradas),
+                'BYTES': self.bytes,
+                'MAX_BYTES': self.max_bytes,
+                'VERSION': self.version,
+            }
+
+
+def bytes_figura(figura):
+    """Bytes de una figura de Plotly: el tamaño de su JSON."""
+    import plotly.io
+
+    return len(plotly.io.to_json(figura, validate=False))
+
+
+def clave_figura(tipo, datos, argumentos, cache_clave=None):
+    """
+    Clave de una figura: el tipo de gráfico, la huella de los datos y los
+    argumentos congelados. Si los datos salen de la caché de resultados su
+    clave (versión, gráfico y filtros) sirve de huella sin recorrerlos.
+    """
+    if cache_clave is not None:
+        return ClaveResultado(cache_clave.version, ('figura', tipo, cache_clave), congelar(argumentos))
+    return ClaveResultado(None, ('figura', tipo, congelar(datos)), congelar(argumentos))
+
+
+# Cachés del proceso, compartidas por todas las sesiones de Streamlit
+RESULTADOS = CacheResultados(MAX_BYTES_RESULTADOS)
+FIGURAS = CacheResultados(MAX_BYTES_FIGURAS, medir=bytes_figura)
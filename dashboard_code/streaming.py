@@ -0,0 +1,244 @@
+"""
+Lectura por bloques para históricos de cobertura que no caben en memoria.
+
+El CSV se lee en bloques de a lo sumo FILAS_POR_BLOQUE filas con el mismo
+esquema y la misma limpieza que la carga completa. Cada bloque se reduce a
+agregados parciales que se combinan en acumuladores; el bloque se descarta
+antes de leer el siguiente. La memoria queda acotada por el tamaño del bloque
+más el estado de los acumuladores, que crece con el número de llaves
+distintas (departamentos, CPOB, periodos), no con el número de filas.
+
+Los acumuladores alimentan las mismas funciones de read_csv que producen
+df_final_sorted, df_temp, df_long, df_cob_max_depto_4g y corr_matrix, así que
+los resultados coinciden con la carga completa (la correlación, salvo
+redondeo, con los mismos pares completos que DataFrame.corr()).
+
+Uso:
+    python -m dashboard_code.streaming [ruta_csv] [filas_por_bloque]
+"""
+
+import logging
+import resource
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from dashboard_code.config import RUTA_CSV, FILAS_POR_BLOQUE
+from dashboard_code.estrella import Estrella, agregar_id_periodo
+from dashboard_code.planificador import COMBINAR, Consulta
+from dashboard_code import read_csv
+
+logger = logging.getLogger(__name__)
+
+
+class Acumulador:
+    """
+    Agregado de una Consulta que se combina bloque a bloque.
+
+    Solo admite agregaciones que se pueden recombinar (sum, size, max, min,
+    first). Una Consulta sin medidas acumula las combinaciones distintas de
+    sus llaves; los conteos de distintos se obtienen al final agrupando ese
+    resultado.
+    """
+
+    def __init__(self, consulta):
+        for columna, agregacion in consulta.medidas.values():
+            if agregacion not in COMBINAR:
+                raise ValueError(f"Agregación no combinable en {consulta.nombre}: {agregacion}")
+        self.consulta = consulta
+        self.estado = None
+
+    def _reducir(self, datos, combinar):
+        llaves = self.consulta.llaves
+        if not self.consulta.medidas:
+            return datos[llaves].drop_duplicates()
+        agregaciones = {}
+        for salida, (columna, agregacion) in self.consulta.medidas.items():
+            if combinar:
+                agregaciones[salida] = (salida, COMBINAR[agregacion])
+            elif agregacion == 'size':
+                agregaciones[salida] = (llaves[0], 'size')
+            else:
+                agregaciones[salida] = (columna, agregacion)
+        return datos.groupby(llaves, as_index=False, observed=True).agg(**agregaciones)
+
+    def agregar(self, bloque):
+        """Reduce un bloque y lo combina con el estado acumulado."""
+        parcial = self._reducir(self.consulta.filtrar(bloque), combinar=False)
+        if self.estado is None:
+            self.estado = parcial
+        else:
+            self.estado = self._reducir(pd.concat([self.estado, parcial], ignore_index=True), combinar=True)
+
+    def resultado(self):
+        """Retorna el agregado final ordenado por las llaves (como un groupby sobre todos los datos)."""
+        llaves = self.consulta.llaves
+        if self.estado is None:
+            columnas = llaves + list(self.consulta.medidas)
+            return pd.DataFrame(columns=columnas)
+        return self.estado.sort_values(llaves, kind='stable').reset_index(drop=True)
+
+
+class Comomentos:
+    """
+    Medias, sumas de cuadrados y comomentos de un conjunto de columnas
+    numéricas, combinables por bloques (fórmula de Chan et al.). Como
+    DataFrame.corr() (y MomentosCubo), cada par de columnas usa solo las filas
+    donde ambas tienen valor, así que los estadísticos se guardan por par: para
+    el par (i, j), n[i, j] es el número de filas con ambas columnas y
+    media[i, j] y m2[i, j] la media y la suma de cuadrados de las desviaciones
+    de la columna i en esas filas.
+    """
+
+    def __init__(self, columnas):
+        self.columnas = list(columnas)
+        k = len(self.columnas)
+        self.n = np.zeros((k, k))
+        self.media = np.zeros((k, k))
+        self.m2 = np.zeros((k, k))
+        self.comomentos = np.zeros((k, k))
+
+    def agregar(self, bloque):
+        valores = bloque[self.columnas].to_numpy(dtype=np.float64)
+        presentes = ~np.isnan(valores)
+        k = len(self.columnas)
+        n_b = np.zeros((k, k))
+        media_b = np.zeros((k, k))
+        m2_b = np.zeros((k, k))
+        comomentos_b = np.zeros((k, k))
+        for i in range(k):
+            for j in range(i, k):
+                filas = presentes[:, i] & presentes[:, j]
+                if not filas.any():
+                    continue
+                x, y = valores[filas, i], valores[filas, j]
+                media_b[i, j], media_b[j, i] = x.mean(), y.mean()
+                dx, dy = x - media_b[i, j], y - media_b[j, i]
+                n_b[i, j] = n_b[j, i] = len(x)
+                m2_b[i, j], m2_b[j, i] = dx @ dx, dy @ dy
+                comomentos_b[i, j] = comomentos_b[j, i] = dx @ dy
+
+        n = self.n + n_b
+        with np.errstate(invalid='ignore', divide='ignore'):
+            peso = np.where(n > 0, self.n * n_b / n, 0.0)
+            proporcion = np.where(n > 0, n_b / n, 0.0)
+        delta = media_b - self.media
+        # Media de la columna j en las filas del par (i, j) es media[j, i]
+        self.m2 += m2_b + delta ** 2 * peso
+        self.comomentos += comomentos_b + delta * delta.T * peso
+        self.media += delta * proporcion
+        self.n = n
+
+    def correlacion(self):
+        """Retorna la matriz de correlación de Pearson como DataFrame (NaN si un par tiene menos de dos filas)."""
+        with np.errstate(invalid='ignore', divide='ignore'):
+            corr = self.comomentos / np.sqrt(self.m2 * self.m2.T)
+        corr = np.where(self.n >= 2, np.clip(corr, -1, 1), np.nan)
+        return pd.DataFrame(corr, index=self.columnas, columns=self.columnas)
+
+
+# Tablas de dimensión que necesitan los DataFrames finales: llave -> columnas de nombre
+DIMENSIONES = {
+    'periodo': ('ID_PERIODO', ['ANNO', 'TRIMESTRE']),
+    'departamento': ('ID_DEPARTAMENTO', ['DEPARTAMENTO']),
+    'tecnologia': ('ID_TECNOLOGIA', ['TECNOLOGIA']),
+}
+
+
+def crear_acumuladores():
+    """Acumuladores para los DataFrames que produce procesar_por_bloques()."""
+    acumuladores = {
+        # CPOB distintos por departamento, en total y con alguna tecnología
+        'cpob': Acumulador(Consulta('cpob', ['ID_DEPARTAMENTO', 'ID_CPOB'])),
+        'cpob_con_internet': Acumulador(Consulta(
+            'cpob_con_internet', ['ID_DEPARTAMENTO', 'ID_CPOB'],
+            excluir={'ID_TECNOLOGIA': [read_csv.ID_SIN_TECNOLOGIA]}
+        )),
+        # Sumas por periodo y tecnología (df_temp / df_long)
+        'temporal': Acumulador(read_csv.PLAN.consultas['temporal']),
+        # Resumen por CPOB solo de 4G (df_cob_max_depto_4g)
+        'resumen_4g': Acumulador(Consulta(
+            'resumen_4g', ['ID_PERIODO', 'ID_DEPARTAMENTO', 'ID_CPOB', 'ID_TECNOLOGIA'],
+            {'AREA_CPOB': 'first', **read_csv.SUMAS_OPERADORES},
+            filtro={'TECNOLOGIA': ['4G']}
+        )),
+    }
+    # Dimensiones: primer nombre visto de cada código
+    for dimension, (llave, nombres) in DIMENSIONES.items():
+        acumuladores[dimension] = Acumulador(
+            Consulta(dimension, [llave], {nombre: 'first' for nombre in nombres})
+        )
+    return acumuladores
+
+
+def leer_bloques(ruta_csv, filas_por_bloque):
+    """Itera sobre el CSV en bloques limpios (mismos tipos y ID_PERIODO que la carga completa)."""
+    for bloque in read_csv.ESQUEMA.leer_por_bloques(ruta_csv, filas_por_bloque):
+        yield agregar_id_periodo(bloque)
+
+
+def procesar_por_bloques(ruta_csv=RUTA_CSV, filas_por_bloque=FILAS_POR_BLOQUE):
+    """
+    Calcula los DataFrames derivados principales leyendo el CSV por bloques.
+
+    Parámetros:
+    - ruta_csv: ruta del CSV de cobertura
+    - filas_por_bloque: máximo de filas en memoria a la vez
+
+    Retorna:
+    - dict con df_final_sorted, df_temp, df_long, df_cob_max_depto_4g y corr_matrix
+    """
+    acumuladores = crear_acumuladores()
+    comomentos = Comomentos(read_csv.cols_num)
+
+    inicio = time.perf_counter()
+    filas = bloques = 0
+    for bloque in leer_bloques(ruta_csv, filas_por_bloque):
+        for acumulador in acumuladores.values():
+            acumulador.agregar(bloque)
+        comomentos.agregar(bloque)
+        filas += len(bloque)
+        bloques += 1
+    logger.info("%d filas leídas en %d bloques en %.3f s", filas, bloques, time.perf_counter() - inicio)
+
+    estrella = Estrella.desde_dimensiones({
+        dimension: acumuladores[dimension].resultado().set_index(llave)
+        for dimension, (llave, _) in DIMENSIONES.items()
+    })
+
+    def distintos_por_depto(nombre, salida):
+        cpob = acumuladores[nombre].resultado()
+        return cpob.groupby('ID_DEPARTAMENTO', as_index=False, observed=True).agg(**{salida: ('ID_CPOB', 'nunique')})
+
+    df_final = read_csv.combinar_final(
+        distintos_por_depto('cpob', 'NUM_CPOB'),
+        distintos_por_depto('cpob_con_internet', 'CPOB_CON_INTERNET')
+    )
+    df_temp = read_csv.nombrar_temporal(acumuladores['temporal'].resultado(), estrella)
+    pct_4g = read_csv.calcular_pct_4g(acumuladores['resumen_4g'].resultado(), estrella)
+
+    return {
+        'df_final_sorted': read_csv.ordenar_final(df_final, estrella),
+        'df_temp': df_temp,
+        'df_long': read_csv.calcular_long(df_temp),
+        'df_cob_max_depto_4g': read_csv.calcular_cob_max_depto_4g(pct_4g, estrella),
+        'corr_matrix': comomentos.correlacion(),
+    }
+
+
+def main(argumentos):
+    logging.basicConfig(level=logging.INFO, format='%(levelname)s %(name)s: %(message)s')
+    ruta_csv = argumentos[0] if argumentos else RUTA_CSV
+    filas_por_bloque = int(argumentos[1]) if len(argumentos) > 1 else FILAS_POR_BLOQUE
+    resultados = procesar_por_bloques(ruta_csv, filas_por_bloque)
+    for nombre, frame in resultados.items():
+        print(f"{nombre}: {frame.shape[0]} filas x {frame.shape[1]} columnas")
+    # ru_maxrss está en KB en Linux
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"Memoria máxima del proceso: {pico:.1f} MB")
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
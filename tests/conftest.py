@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# Los módulos del dashboard se importan desde la raíz del repositorio, como en app.py
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
@@ -0,0 +1,115 @@
+"""
+Datos de prueba con las columnas del CSV de cobertura limpio y selecciones del sidebar.
+"""
+
+import numpy as np
+import pandas as pd
+
+from dashboard_code.operadores import COLUMNAS_AREA, OPERADORES
+
+DEPARTAMENTOS = {5: 'ANTIOQUIA', 8: 'ATLÁNTICO', 11: 'BOGOTÁ. D.C.', 76: 'VALLE DEL CAUCA', 91: 'AMAZONAS'}
+TECNOLOGIAS = {0: 'Ninguna', 2: '2G', 3: '3G', 4: '4G', 5: '5G'}
+PERIODOS = [('2023', '3'), ('2023', '4'), ('2024', '1'), ('2024', '4')]
+
+# Agrupaciones por llaves del cubo que se prueban en las consultas
+AGRUPACIONES = [
+    [], ['ID_PERIODO'], ['ID_DEPARTAMENTO'], ['ID_TECNOLOGIA'],
+    ['ID_PERIODO', 'ID_TECNOLOGIA'], ['ID_DEPARTAMENTO', 'ID_TECNOLOGIA'],
+]
+
+# Columnas del CSV publicado, en orden
+COLUMNAS_CSV = [
+    'ANNO', 'TRIMESTRE', 'ID_DEPARTAMENTO', 'DEPARTAMENTO', 'ID_MUNICIPIO', 'MUNICIPIO', 'ID_CPOB', 'CPOB',
+    'AREA_CPOB', 'ID_TECNOLOGIA', 'TECNOLOGIA', 'NIVEL_SENAL', *COLUMNAS_AREA
+]
+
+
+def datos_cobertura(filas=3000, semilla=0):
+    """DataFrame con las columnas del CSV limpio: varias filas por CPOB, áreas faltantes y CPOB de área 0."""
+    generador = np.random.default_rng(semilla)
+    periodo = generador.integers(len(PERIODOS), size=filas)
+    departamento = generador.choice(list(DEPARTAMENTOS), size=filas)
+    municipio = departamento * 1000 + generador.integers(1, 6, size=filas)
+    cpob = municipio * 1000 + generador.integers(0, 8, size=filas)
+    tecnologia = generador.choice(list(TECNOLOGIAS), size=filas)
+    # El área es del CPOB; algunos CPOB tienen área 0
+    area = np.where(cpob % 7 == 0, 0.0, (cpob % 97) / 10 + 0.5)
+    df = pd.DataFrame({
+        'ANNO': [PERIODOS[p][0] for p in periodo],
+        'TRIMESTRE': [PERIODOS[p][1] for p in periodo],
+        'ID_DEPARTAMENTO': departamento,
+        'DEPARTAMENTO': [DEPARTAMENTOS[d] for d in departamento],
+        'ID_MUNICIPIO': municipio,
+        'MUNICIPIO': [f'MUNICIPIO {m}' for m in municipio],
+        'ID_CPOB': cpob,
+        'CPOB': [f'CPOB {c}' for c in cpob],
+        'AREA_CPOB': area,
+        'ID_TECNOLOGIA': tecnologia,
+        'TECNOLOGIA': [TECNOLOGIAS[t] for t in tecnologia],
+    })
+    for columna in COLUMNAS_AREA:
+        # Hasta 1.3 veces el área del CPOB (áreas que se solapan) y algunos faltantes
+        valores = area * generador.uniform(0, 1.3, size=filas)
+        valores[generador.random(filas) < 0.1] = np.nan
+        df[columna] = valores
+    return df
+
+
+def escribir_csv(df, ruta):
+    """Escribe df con el formato del CSV publicado: separador ';', coma decimal y NIVEL_SENAL."""
+    crudo = df.assign(NIVEL_SENAL=np.where(df['ID_TECNOLOGIA'] == 0, 0, 3))
+    crudo[COLUMNAS_CSV].to_csv(ruta, sep=';', decimal=',', index=False)
+    return ruta
+
+
+def selecciones():
+    """Selecciones del sidebar (año, trimestre, departamentos, tecnologías)."""
+    generador = np.random.default_rng(1)
+    resultado = [(None, None, None, None), ('2024', '4', ['BOGOTÁ. D.C.'], ['4G']), ('2022', None, None, None)]
+    for _ in range(12):
+        resultado.append((
+            generador.choice(['2023', '2024']) if generador.random() < 0.5 else None,
+            generador.choice(['1', '3', '4']) if generador.random() < 0.5 else None,
+            list(generador.choice(list(DEPARTAMENTOS.values()), size=2, replace=False)) if generador.random() < 0.5 else None,
+            list(generador.choice(list(TECNOLOGIAS.values()), size=3, replace=False)) if generador.random() < 0.5 else None,
+        ))
+    return resultado
+
+
+def filtrar(df, anno, trimestre, departamentos, tecnologias):
+    """Filas de `df` de la selección del sidebar, filtrando por nombre."""
+    mascara = pd.Series(True, index=df.index)
+    if anno is not None:
+        mascara &= df['ANNO'] == anno
+    if trimestre is not None:
+        mascara &= df['TRIMESTRE'] == trimestre
+    if departamentos:
+        mascara &= df['DEPARTAMENTO'].isin(departamentos)
+    if tecnologias:
+        mascara &= df['TECNOLOGIA'].isin(tecnologias)
+    if 'ID_PERIODO' not in df:
+        df = df.assign(ID_PERIODO=df['ANNO'].astype(int) * 10 + df['TRIMESTRE'].astype(int))
+    return df[mascara]
+
+
+def cuantiles_esperados(filas, por, metodo='linear'):
+    """
+    p10, mediana y p90 del % de cobertura por operador calculados con np.quantile (con
+    `metodo`): una fila por periodo, CPOB y tecnología, porcentajes topados en 100 y sin
+    los CPOB de área 0.
+    """
+    resumen = filas.groupby(['ID_PERIODO', 'ID_DEPARTAMENTO', 'ID_CPOB', 'ID_TECNOLOGIA']).agg(
+        AREA_CPOB=('AREA_CPOB', 'first'), **{c: (c, 'sum') for c in COLUMNAS_AREA}
+    ).reset_index()
+    resumen = resumen[resumen['AREA_CPOB'] != 0]
+    esperado = []
+    for operador, columna in zip(OPERADORES, COLUMNAS_AREA):
+        porcentaje = (resumen[columna] / resumen['AREA_CPOB'] * 100).clip(0, 100)
+        grupos = porcentaje.groupby([resumen[llave] for llave in por]) if por else [((), porcentaje)]
+        for llave, valores in grupos:
+            fila = dict(zip(por, llave if isinstance(llave, tuple) else (llave,)))
+            fila.update(OPERADOR=operador, N=len(valores))
+            fila.update({f'P{p}': np.quantile(valores, p / 100, method=metodo) for p in (10, 50, 90)} if len(valores) else {})
+            esperado.append(fila)
+    esperado = pd.DataFrame(esperado, columns=por + ['OPERADOR', 'N', 'P10', 'P50', 'P90'])
+    return esperado[esperado['N'] > 0].reset_index(drop=True)
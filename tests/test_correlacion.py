@@ -0,0 +1,60 @@
+"""
+La correlación armada uniendo momentos por celda del cubo es la de
+DataFrame.corr() sobre las filas seleccionadas, con faltantes.
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from dashboard_code.correlacion import MomentosCubo
+from dashboard_code.cubo import Cubo
+from dashboard_code.estrella import Estrella
+from dashboard_code.read_csv import cols_num
+from tests.datos import datos_cobertura, filtrar, selecciones
+
+
+@pytest.fixture(scope='module')
+def df():
+    df = datos_cobertura(filas=5000, semilla=2)
+    # Faltantes también en AREA_CPOB, en filas distintas a las de las áreas de los operadores
+    df.loc[df.index[::11], 'AREA_CPOB'] = np.nan
+    return df
+
+
+@pytest.fixture(scope='module')
+def estrella(df):
+    return Estrella(df.copy())
+
+
+@pytest.fixture(scope='module')
+def momentos(estrella):
+    return MomentosCubo(estrella.hechos, cols_num)
+
+
+@pytest.fixture(scope='module')
+def traducir(estrella):
+    return Cubo(estrella.hechos, Estrella.desde_dimensiones(estrella.dimensiones)).filtros_sidebar
+
+
+@pytest.mark.parametrize('seleccion', selecciones())
+def test_correlacion(df, momentos, traducir, seleccion):
+    esperado = filtrar(df, *seleccion)[cols_num].corr()
+    obtenido = momentos.correlacion(traducir(*seleccion))
+    pd.testing.assert_frame_equal(obtenido, esperado, rtol=1e-9, atol=1e-12)
+
+
+def test_pocas_filas():
+    # Pares con menos de dos filas completas o sin variación dan NaN, como corr()
+    hechos = pd.DataFrame({
+        'ID_PERIODO': [20241, 20241, 20244, 20244],
+        'ID_DEPARTAMENTO': [5, 5, 5, 8],
+        'ID_TECNOLOGIA': [4, 4, 4, 4],
+        'A': [1.0, 2.0, 3.0, np.nan],
+        'B': [2.0, np.nan, 1.0, 4.0],
+        'C': [1.0, 1.0, 1.0, 1.0],
+    })
+    momentos = MomentosCubo(hechos, ['A', 'B', 'C'])
+    pd.testing.assert_frame_equal(momentos.correlacion(), hechos[['A', 'B', 'C']].corr())
+    solo_20241 = hechos[hechos['ID_PERIODO'] == 20241][['A', 'B', 'C']].corr()
+    pd.testing.assert_frame_equal(momentos.correlacion({'ID_PERIODO': [20241]}), solo_20241)
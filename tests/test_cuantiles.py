@@ -0,0 +1,82 @@
+"""
+Los cuantiles de los histogramas de 200 cubetas quedan a lo sumo a una
+cubeta (0.5 puntos porcentuales) del cuantil empírico exacto: el menor
+porcentaje cuyo acumulado alcanza p (np.quantile con method='inverted_cdf').
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from dashboard_code.cubo import Cubo
+from dashboard_code.cuantiles import ANCHO, BINS, HistogramaCuantiles
+from dashboard_code.estrella import Estrella
+from dashboard_code.operadores import COLUMNAS_AREA
+from tests.datos import AGRUPACIONES, cuantiles_esperados, datos_cobertura, filtrar, selecciones
+
+
+@pytest.fixture(scope='module')
+def df():
+    return datos_cobertura(filas=6000)
+
+
+@pytest.fixture(scope='module')
+def estrella(df):
+    return Estrella(df.copy())
+
+
+@pytest.fixture(scope='module')
+def histogramas(estrella):
+    # El mismo resumen por CPOB y tecnología que el nodo resumen_por_cpob
+    resumen = estrella.hechos.groupby(['ID_PERIODO', 'ID_DEPARTAMENTO', 'ID_CPOB', 'ID_TECNOLOGIA'], as_index=False).agg(
+        AREA_CPOB=('AREA_CPOB', 'first'), **{c: (c, 'sum') for c in COLUMNAS_AREA}
+    )
+    return HistogramaCuantiles(resumen)
+
+
+@pytest.fixture(scope='module')
+def traducir(estrella):
+    return Cubo(estrella.hechos, Estrella.desde_dimensiones(estrella.dimensiones)).filtros_sidebar
+
+
+def test_ancho_de_cubeta():
+    assert BINS == 200
+    assert ANCHO == 0.5
+
+
+@pytest.mark.parametrize('seleccion', selecciones())
+@pytest.mark.parametrize('por', AGRUPACIONES)
+def test_error_acotado(df, histogramas, traducir, seleccion, por):
+    esperado = cuantiles_esperados(filtrar(df, *seleccion), por, metodo='inverted_cdf')
+    obtenido = histogramas.cuantiles(por, traducir(*seleccion))
+    assert list(obtenido.columns) == list(esperado.columns)
+    assert len(obtenido) == len(esperado)
+    for columna in por + ['OPERADOR', 'N']:
+        np.testing.assert_array_equal(obtenido[columna].to_numpy(), esperado[columna].to_numpy())
+    diferencia = np.abs(
+        obtenido[['P10', 'P50', 'P90']].to_numpy(dtype=np.float64)
+        - esperado[['P10', 'P50', 'P90']].to_numpy(dtype=np.float64)
+    )
+    assert diferencia.max(initial=0) <= ANCHO + 1e-9
+
+
+def test_error_acotado_continuo():
+    # Porcentajes continuos en todo el rango, incluidos los topados en 100: con
+    # muchos CPOB el cuantil interpolado también queda a una cubeta
+    generador = np.random.default_rng(4)
+    n = 20000
+    area = generador.uniform(1, 10, n)
+    resumen = pd.DataFrame({
+        'ID_PERIODO': generador.choice([20241, 20244], n),
+        'ID_DEPARTAMENTO': generador.integers(1, 4, n),
+        'ID_TECNOLOGIA': 4,
+        'AREA_CPOB': area,
+        **{c: area * generador.beta(0.7, 0.5, n) * 1.1 for c in COLUMNAS_AREA},
+    })
+    obtenido = HistogramaCuantiles(resumen).cuantiles(['ID_DEPARTAMENTO'], probabilidades=(0.01, 0.25, 0.5, 0.75, 0.99))
+    for (depto, operador), fila in obtenido.set_index(['ID_DEPARTAMENTO', 'OPERADOR']).iterrows():
+        filas = resumen[resumen['ID_DEPARTAMENTO'] == depto]
+        porcentaje = (filas[f'AREA_COB_{operador}'] / filas['AREA_CPOB'] * 100).clip(0, 100)
+        for p in (1, 25, 50, 75, 99):
+            for metodo in ('inverted_cdf', 'linear'):
+                assert abs(fila[f'P{p:02d}'] - np.quantile(porcentaje, p / 100, method=metodo)) <= ANCHO
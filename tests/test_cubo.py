@@ -0,0 +1,56 @@
+"""
+El cubo responde los conteos y las sumas de cualquier selección del sidebar
+igual que agrupar las filas filtradas con pandas.
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from dashboard_code.cubo import COLUMNA_FILAS, Cubo
+from dashboard_code.estrella import Estrella
+from dashboard_code.operadores import COLUMNAS_AREA
+from tests.datos import AGRUPACIONES, datos_cobertura, filtrar, selecciones
+
+
+@pytest.fixture(scope='module')
+def df():
+    return datos_cobertura()
+
+
+@pytest.fixture(scope='module')
+def cubo(df):
+    estrella = Estrella(df.copy())
+    return Cubo(estrella.hechos, Estrella.desde_dimensiones(estrella.dimensiones))
+
+
+@pytest.mark.parametrize('seleccion', selecciones())
+@pytest.mark.parametrize('por', AGRUPACIONES)
+def test_consultar(df, cubo, seleccion, por):
+    filas = filtrar(df, *seleccion)
+    obtenido = cubo.consultar(por, cubo.filtros_sidebar(*seleccion))
+    if por:
+        esperado = filas.groupby(por).agg(
+            **{COLUMNA_FILAS: ('ID_CPOB', 'size')}, **{c: (c, 'sum') for c in COLUMNAS_AREA}
+        ).reset_index()
+    else:
+        esperado = pd.DataFrame([{COLUMNA_FILAS: len(filas), **filas[COLUMNAS_AREA].sum()}])
+    assert list(obtenido.columns) == por + [COLUMNA_FILAS] + COLUMNAS_AREA
+    assert len(obtenido) == len(esperado)
+    for columna in por + [COLUMNA_FILAS]:
+        np.testing.assert_array_equal(obtenido[columna].to_numpy(), esperado[columna].to_numpy())
+    np.testing.assert_allclose(obtenido[COLUMNAS_AREA].to_numpy(), esperado[COLUMNAS_AREA].to_numpy(), rtol=1e-9)
+
+
+def test_orden_de_por(df, cubo):
+    # Las llaves salen en el orden pedido, no en el de los ejes del cubo
+    obtenido = cubo.consultar(['ID_TECNOLOGIA', 'ID_PERIODO'], medidas=[COLUMNA_FILAS])
+    esperado = filtrar(df, None, None, None, None).groupby(['ID_TECNOLOGIA', 'ID_PERIODO']).size().reset_index(name=COLUMNA_FILAS)
+    pd.testing.assert_frame_equal(obtenido, esperado, check_dtype=False)
+
+
+def test_totales(df, cubo):
+    totales = cubo.totales(cubo.filtros_sidebar(tecnologias=['4G', '5G']))
+    filas = df[df['TECNOLOGIA'].isin(['4G', '5G'])]
+    assert totales[COLUMNA_FILAS] == len(filas)
+    np.testing.assert_allclose(totales[COLUMNAS_AREA].to_numpy(dtype=np.float64), filas[COLUMNAS_AREA].sum().to_numpy())
@@ -0,0 +1,100 @@
+"""
+Conteo de CPOB distintos: exacto con bitsets y dentro del error esperado con HyperLogLog.
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from dashboard_code.cubo import Cubo
+from dashboard_code.distintos import LIMITE_EXACTO, ConteoDistintos
+from dashboard_code.estrella import Estrella
+from tests.datos import AGRUPACIONES, datos_cobertura, filtrar, selecciones
+
+
+@pytest.fixture(scope='module')
+def df():
+    return datos_cobertura()
+
+
+@pytest.fixture(scope='module')
+def estrella(df):
+    return Estrella(df.copy())
+
+
+@pytest.fixture(scope='module')
+def traducir(estrella):
+    # Los filtros del sidebar se traducen a llaves igual que en el cubo
+    return Cubo(estrella.hechos, Estrella.desde_dimensiones(estrella.dimensiones)).filtros_sidebar
+
+
+@pytest.mark.parametrize('seleccion', selecciones())
+@pytest.mark.parametrize('por', AGRUPACIONES)
+def test_bitset_exacto(df, estrella, traducir, seleccion, por):
+    distintos = ConteoDistintos(estrella.hechos, modo='bitset')
+    assert distintos.error_relativo() == 0
+    filas = filtrar(df, *seleccion)
+    obtenido = distintos.contar(por, traducir(*seleccion))
+    if not por:
+        assert obtenido == filas['ID_CPOB'].nunique()
+        return
+    esperado = filas.groupby(por)['ID_CPOB'].nunique().reset_index(name='DISTINTOS')
+    pd.testing.assert_frame_equal(obtenido, esperado, check_dtype=False)
+
+
+@pytest.mark.parametrize('seleccion', selecciones())
+def test_hll_selecciones_pequenas_exactas(df, estrella, traducir, seleccion):
+    # Menos de LIMITE_EXACTO CPOB: las listas exactas de las celdas se unen sin error
+    distintos = ConteoDistintos(estrella.hechos, modo='hll')
+    filas = filtrar(df, *seleccion)
+    assert distintos.contar((), traducir(*seleccion)) == filas['ID_CPOB'].nunique()
+    esperado = filas.groupby('ID_DEPARTAMENTO')['ID_CPOB'].nunique().to_numpy()
+    obtenido = distintos.contar(['ID_DEPARTAMENTO'], traducir(*seleccion))['DISTINTOS'].to_numpy()
+    np.testing.assert_array_equal(obtenido, esperado)
+
+
+@pytest.fixture(scope='module')
+def hechos_grandes():
+    """Hechos con decenas de miles de CPOB: las uniones superan LIMITE_EXACTO y se estiman."""
+    generador = np.random.default_rng(11)
+    n = 200_000
+    return pd.DataFrame({
+        'ID_PERIODO': generador.choice([20233, 20234, 20241, 20244], n),
+        'ID_DEPARTAMENTO': generador.integers(1, 9, n),
+        'ID_TECNOLOGIA': generador.choice([0, 2, 3, 4, 5], n),
+        'ID_CPOB': generador.integers(0, 60_000, n) * 7919 + 13,
+    })
+
+
+@pytest.mark.parametrize('precision', [10, 12])
+def test_hll_error(hechos_grandes, precision):
+    distintos = ConteoDistintos(hechos_grandes, precision=precision, modo='hll')
+    sigma = distintos.error_relativo()
+    assert sigma == pytest.approx(1.04 / np.sqrt(2 ** precision))
+
+    exacto = hechos_grandes['ID_CPOB'].nunique()
+    assert exacto > LIMITE_EXACTO
+    assert abs(distintos.contar() - exacto) <= 2.3 * sigma * exacto
+
+    por = ['ID_PERIODO', 'ID_TECNOLOGIA']
+    obtenido = distintos.contar(por)
+    esperado = hechos_grandes.groupby(por)['ID_CPOB'].nunique().reset_index(name='DISTINTOS')
+    pd.testing.assert_frame_equal(obtenido[por], esperado[por], check_dtype=False)
+    errores = (obtenido['DISTINTOS'] - esperado['DISTINTOS']) / esperado['DISTINTOS']
+    # Cada estimación dentro de 2.3 desviaciones estándar (~98 %) y el error
+    # cuadrático medio del orden de la desviación teórica
+    assert (errores.abs() <= 2.3 * sigma).all()
+    assert np.sqrt(np.mean(errores ** 2)) <= 1.5 * sigma
+
+    filtros = {'ID_DEPARTAMENTO': [1, 2, 3], 'ID_TECNOLOGIA': [4, 5]}
+    filas = hechos_grandes[
+        hechos_grandes['ID_DEPARTAMENTO'].isin([1, 2, 3]) & hechos_grandes['ID_TECNOLOGIA'].isin([4, 5])
+    ]
+    exacto = filas['ID_CPOB'].nunique()
+    assert abs(distintos.contar((), filtros) - exacto) <= 2.3 * sigma * exacto
+
+
+def test_sin_filas(estrella):
+    distintos = ConteoDistintos(estrella.hechos)
+    assert distintos.contar((), {'ID_PERIODO': [19991]}) == 0
+    assert len(distintos.contar(['ID_DEPARTAMENTO'], {'ID_PERIODO': [19991]})) == 0
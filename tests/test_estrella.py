@@ -0,0 +1,197 @@
+"""
+Los DataFrames calculados sobre el modelo estrella (llaves enteras, nombres
+unidos al final) son los mismos que los del cálculo original por nombres,
+con las mismas filas en el mismo orden, cuando cada código tiene un solo nombre.
+"""
+
+import pandas as pd
+import pytest
+
+from dashboard_code import read_csv
+from tests.datos import datos_cobertura, escribir_csv
+
+
+def linea_base(ruta_csv):
+    """DataFrames del dashboard calculados como en la versión original de read_csv.py (agrupando por nombres)."""
+    df = pd.read_csv(ruta_csv, sep=';')
+    cols = ['AREA_COB_CLARO', 'AREA_COB_MOVISTAR', 'AREA_COB_TIGO', 'AREA_COB_WOM', 'AREA_CPOB']
+    df[cols] = df[cols].apply(lambda x: x.astype(str).str.replace(',', '.', regex=False)).astype(float)
+    for col in ['ANNO', 'TRIMESTRE', 'ID_DEPARTAMENTO', 'DEPARTAMENTO', 'ID_MUNICIPIO', 'MUNICIPIO', 'CPOB', 'ID_TECNOLOGIA']:
+        df[col] = df[col].astype(str)
+
+    cols_operadores = ['AREA_COB_CLARO', 'AREA_COB_MOVISTAR', 'AREA_COB_TIGO', 'AREA_COB_WOM']
+    cols_pct = ['PCT_CLARO', 'PCT_MOVISTAR', 'PCT_TIGO', 'PCT_WOM']
+    sumas = {'AREA_CPOB': 'first', **{col: 'sum' for col in cols_operadores}}
+    f = {}
+
+    f['df_sennal'] = df.groupby(
+        ['ANNO', 'TRIMESTRE', 'DEPARTAMENTO', 'MUNICIPIO', 'CPOB', 'TECNOLOGIA'], as_index=False
+    )[cols_operadores].sum()
+
+    df_resumen = df.groupby(['ANNO', 'TRIMESTRE', 'DEPARTAMENTO', 'CPOB', 'TECNOLOGIA'], as_index=False).agg(sumas)
+    for pct, col in zip(cols_pct, cols_operadores):
+        df_resumen[pct] = (df_resumen[col] / df_resumen['AREA_CPOB']) * 100
+    df_resumen['PCT_PROMEDIO'] = df_resumen[cols_pct].mean(axis=1)
+    f['df_resumen'] = df_resumen.round(2)
+
+    total = df[['DEPARTAMENTO', 'CPOB']].drop_duplicates().groupby('DEPARTAMENTO').size().reset_index(name='NUM_CPOB')
+    con_internet = (
+        df[df['TECNOLOGIA'].isin(['2G', '3G', '4G', '5G'])][['DEPARTAMENTO', 'CPOB']]
+        .drop_duplicates().groupby('DEPARTAMENTO').size().reset_index(name='CPOB_CON_INTERNET')
+    )
+    df_final = total.merge(con_internet, on='DEPARTAMENTO', how='left')
+    df_final['CPOB_SIN_INTERNET'] = df_final['NUM_CPOB'] - df_final['CPOB_CON_INTERNET'].fillna(0)
+    df_final['%_CON_INTERNET'] = (df_final['CPOB_CON_INTERNET'] / df_final['NUM_CPOB']) * 100
+    df_final['%_SIN_INTERNET'] = (df_final['CPOB_SIN_INTERNET'] / df_final['NUM_CPOB']) * 100
+    f['df_final_sorted'] = df_final.sort_values(by='CPOB_SIN_INTERNET', ascending=False)
+
+    df_actual = df[(df['ANNO'] == '2024') & (df['TRIMESTRE'] == '4')].copy()
+    df_actual = df_actual.groupby(
+        ['ANNO', 'TRIMESTRE', 'DEPARTAMENTO', 'MUNICIPIO', 'CPOB', 'TECNOLOGIA'], as_index=False
+    ).agg(sumas)
+    df_actual['AREA_COB_MAX'] = df_actual[cols_operadores].max(axis=1)
+    df_actual['OPERADOR_MAX'] = df_actual[cols_operadores].idxmax(axis=1).str.replace('AREA_COB_', '').str.upper()
+    f['df_actual'] = df_actual
+
+    df_max_tecnologia = df_actual.loc[
+        df_actual.groupby(['ANNO', 'TRIMESTRE', 'DEPARTAMENTO', 'MUNICIPIO', 'CPOB'])['AREA_COB_MAX'].idxmax()
+    ].copy()
+    df_max_tecnologia.rename(columns={'AREA_COB_MAX': 'AREA_COB_MAX_TECNOLOGIAS'}, inplace=True)
+    df_max_tecnologia['TECNOLOGIA_MAX'] = df_max_tecnologia['TECNOLOGIA']
+    df_max_tecnologia['PORCENTAJE_COBERTURA'] = (
+        df_max_tecnologia['AREA_COB_MAX_TECNOLOGIAS'] / df_max_tecnologia['AREA_CPOB']
+    ) * 100
+    df_max_tecnologia = df_max_tecnologia.sort_values(by='PORCENTAJE_COBERTURA', ascending=True)
+    f['df_max_tecnologia'] = df_max_tecnologia
+
+    df_departamento = df_max_tecnologia.groupby('DEPARTAMENTO', as_index=False).agg({
+        'PORCENTAJE_COBERTURA': 'mean',
+        'OPERADOR_MAX': lambda x: x.value_counts().idxmax()
+    })
+    f['df_departamento'] = df_departamento
+    top10_menor = df_departamento.sort_values(by='PORCENTAJE_COBERTURA', ascending=True).head(6)
+    top10_mayor = df_departamento.sort_values(by='PORCENTAJE_COBERTURA', ascending=False).head(6)
+    top10_menor['PORCENTAJE_COBERTURA'] = -top10_menor['PORCENTAJE_COBERTURA']
+    f['df_comparativo'] = pd.concat([top10_menor, top10_mayor])
+
+    f['conteo_operador'] = df_max_tecnologia['OPERADOR_MAX'].value_counts()
+    f['porcentaje_operador'] = (f['conteo_operador'] / f['conteo_operador'].sum()) * 100
+    f['conteo_tecnologia'] = df_max_tecnologia['TECNOLOGIA_MAX'].value_counts()
+    f['porcentaje_tecnologia'] = (f['conteo_tecnologia'] / f['conteo_tecnologia'].sum()) * 100
+
+    df_municipio = df_max_tecnologia.groupby(
+        ['DEPARTAMENTO', 'MUNICIPIO', 'OPERADOR_MAX'], as_index=False
+    ).agg({'AREA_COB_MAX_TECNOLOGIAS': 'sum'})
+    f['df_municipio_predominante'] = df_municipio.loc[
+        df_municipio.groupby(['DEPARTAMENTO', 'MUNICIPIO'])['AREA_COB_MAX_TECNOLOGIAS'].idxmax()
+    ][['DEPARTAMENTO', 'MUNICIPIO', 'OPERADOR_MAX']]
+
+    df_filtrado = df[(df['ANNO'] == '2024') & (df['TRIMESTRE'] == '4')]
+    top_deptos = df_filtrado['DEPARTAMENTO'].value_counts().head(30).index
+    f['df_top'] = df_filtrado[df_filtrado['DEPARTAMENTO'].isin(top_deptos)]
+
+    df_cuenta_sin_tecnologia = (
+        df[df['TECNOLOGIA'] == 'Ninguna'].groupby(['ANNO', 'DEPARTAMENTO'])['CPOB']
+        .nunique().reset_index(name='NUM_CPOB_SIN_TEC')
+    )
+    f['df_cuenta_sin_tecnologia'] = df_cuenta_sin_tecnologia.sort_values(
+        ['ANNO', 'NUM_CPOB_SIN_TEC'], ascending=[True, False]
+    )
+
+    f['corr_matrix'] = df[['AREA_CPOB', *cols_operadores]].corr()
+
+    df_temp = df.groupby(['ANNO', 'TRIMESTRE', 'TECNOLOGIA'], as_index=False).agg(
+        {col: 'sum' for col in cols_operadores}
+    )
+    df_temp['PERIODO'] = df_temp['ANNO'].astype(str) + '-T' + df_temp['TRIMESTRE'].astype(str)
+    f['df_temp'] = df_temp
+    df_long = df_temp.melt(
+        id_vars=['PERIODO', 'ANNO', 'TRIMESTRE', 'TECNOLOGIA'], value_vars=cols_operadores,
+        var_name='OPERADOR', value_name='AREA_COBERTURA'
+    )
+    df_long['OPERADOR'] = df_long['OPERADOR'].str.replace('AREA_COB_', '', regex=False)
+    f['df_long'] = df_long
+
+    df_melt = df.melt(value_vars=cols_operadores, var_name='Operador', value_name='Área Cobertura')
+    df_melt['Operador'] = df_melt['Operador'].str.replace('AREA_COB_', '', regex=False)
+    f['df_melt'] = df_melt
+
+    df_resumen_4g = df.groupby(['ANNO', 'TRIMESTRE', 'DEPARTAMENTO', 'CPOB', 'TECNOLOGIA'], as_index=False).agg(sumas)
+    df_4g = df_resumen_4g[df_resumen_4g['TECNOLOGIA'] == '4G'].copy()
+    for pct, col in zip(cols_pct, cols_operadores):
+        df_4g[pct] = (df_4g[col] / df_4g['AREA_CPOB']) * 100
+    df_4g[cols_pct] = df_4g[cols_pct].clip(upper=100)
+    f['df_4g'] = df_4g
+    df_cob_max_cpob_4g = df_4g.groupby(['DEPARTAMENTO', 'CPOB'])[cols_pct].max().reset_index()
+    df_cob_max_depto_4g = df_cob_max_cpob_4g.groupby('DEPARTAMENTO')[cols_pct].mean().reset_index()
+    f['df_cob_max_depto_4g'] = df_cob_max_depto_4g.rename(
+        columns={pct: pct.replace('PCT_', 'PCT_MAX_PROMEDIO_') for pct in cols_pct}
+    )
+    return f
+
+
+NODOS = [
+    'df_sennal', 'df_resumen', 'df_final_sorted', 'df_actual', 'df_max_tecnologia', 'df_departamento',
+    'df_comparativo', 'conteo_operador', 'porcentaje_operador', 'conteo_tecnologia', 'porcentaje_tecnologia',
+    'df_municipio_predominante', 'df_top', 'df_cuenta_sin_tecnologia', 'corr_matrix', 'df_temp', 'df_long',
+    'df_melt', 'df_4g', 'df_cob_max_depto_4g',
+]
+
+
+@pytest.fixture(scope='module')
+def ruta_csv(tmp_path_factory):
+    return escribir_csv(datos_cobertura(semilla=3), tmp_path_factory.mktemp('csv') / 'cobertura.csv')
+
+
+@pytest.fixture(scope='module')
+def esperados(ruta_csv):
+    return linea_base(ruta_csv)
+
+
+@pytest.fixture(scope='module')
+def registro(ruta_csv):
+    usar_cache = read_csv.USAR_CACHE
+    read_csv.USAR_CACHE = False
+    try:
+        registro = read_csv.crear_registro(ruta_csv)
+        registro.materializar(NODOS)
+    finally:
+        read_csv.USAR_CACHE = usar_cache
+    return registro
+
+
+def comparables(frame, columnas):
+    """Columnas de la línea base (los códigos DIVIPOLA se comparan como texto), sin el índice."""
+    frame = frame[columnas].reset_index(drop=True)
+    return frame.assign(**{c: frame[c].astype(str) for c in columnas if c.startswith('ID_')})
+
+
+@pytest.mark.parametrize('nombre', NODOS)
+def test_igual_a_linea_base(registro, esperados, nombre):
+    esperado = esperados[nombre]
+    obtenido = registro.obtener(nombre)
+    if isinstance(esperado, pd.Series):
+        pd.testing.assert_series_equal(
+            obtenido, esperado, check_dtype=False, check_index_type=False, check_names=False
+        )
+    elif nombre == 'corr_matrix':
+        pd.testing.assert_frame_equal(obtenido, esperado)
+    else:
+        # NIVEL_SENAL no se carga (ver COLUMNAS_USADAS)
+        columnas = [col for col in esperado.columns if col != 'NIVEL_SENAL']
+        pd.testing.assert_frame_equal(
+            comparables(obtenido, columnas), comparables(esperado, columnas), check_dtype=False
+        )
+
+
+def test_empates_de_tecnologia(registro):
+    # En los CPOB de área 0 todas las tecnologías empatan: como en la línea base
+    # gana la primera por nombre ('2G'..'5G' antes que 'Ninguna')
+    df_actual = registro.obtener('df_actual')
+    df_max = registro.obtener('df_max_tecnologia')
+    empatados = df_max[df_max['AREA_CPOB'] == 0].set_index(['DEPARTAMENTO', 'MUNICIPIO', 'CPOB'])
+    assert len(empatados) > 0
+    primera = df_actual.groupby(['DEPARTAMENTO', 'MUNICIPIO', 'CPOB'])['TECNOLOGIA'].min()
+    pd.testing.assert_series_equal(
+        empatados['TECNOLOGIA_MAX'], primera.loc[empatados.index], check_names=False
+    )
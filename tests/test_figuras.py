@@ -0,0 +1,114 @@
+"""
+Compactación de las figuras: los valores que se dibujan no cambian (salvo el
+redondeo a DECIMALES_FIGURA) y los mapas conservan la llave de cada feature.
+"""
+
+import base64
+import json
+
+import numpy as np
+import plotly.express as px
+import plotly.io
+import pytest
+
+from dashboard_code.config import DECIMALES_FIGURA
+from dashboard_code.figuras import TAMANOS, compactar
+
+# GeoJSON con una propiedad llave, otras que sobran y un feature que no se dibuja
+GEOJSON = {
+    'type': 'FeatureCollection',
+    'features': [
+        {
+            'type': 'Feature', 'id': codigo,
+            'properties': {'DPTO': f'{codigo:02d}', 'NOMBRE_DPT': nombre, 'AREA': 1.5 * codigo},
+            'geometry': {'type': 'Polygon', 'coordinates': [[[-75 + codigo, 5], [-74 + codigo, 5], [-74 + codigo, 6], [-75 + codigo, 5]]]},
+        }
+        for codigo, nombre in [(5, 'ANTIOQUIA'), (8, 'ATLÁNTICO'), (11, 'BOGOTÁ'), (13, 'BOLÍVAR')]
+    ],
+}
+
+
+def enviado(fig):
+    """Trazas del JSON que recibe el navegador, con los arrays binarios tipados decodificados."""
+    def decodificar(valor):
+        if isinstance(valor, dict) and 'bdata' in valor:
+            array = np.frombuffer(base64.b64decode(valor['bdata']), dtype=valor['dtype'])
+            return array.reshape([int(n) for n in str(valor['shape']).split(',')]) if 'shape' in valor else array
+        if isinstance(valor, dict):
+            return {llave: decodificar(hijo) for llave, hijo in valor.items()}
+        if isinstance(valor, list):
+            return [decodificar(hijo) for hijo in valor]
+        return valor
+
+    return decodificar(json.loads(plotly.io.to_json(fig)))['data']
+
+
+def test_valores_dibujados():
+    generador = np.random.default_rng(0)
+    x = np.arange(50)
+    y = generador.random(50) * 100
+    conteos = generador.integers(0, 300, size=50)
+    fig = px.scatter(x=x, y=y, size=conteos, custom_data=[y])
+    compactar(fig, 'dispersion')
+    traza = enviado(fig)[0]
+
+    # Los enteros viajan en el tipo entero más pequeño, los flotantes redondeados
+    assert traza['x'].dtype == np.int8
+    np.testing.assert_array_equal(traza['x'], x)
+    assert traza['marker']['size'].dtype == np.int16
+    np.testing.assert_array_equal(traza['marker']['size'], conteos)
+    assert traza['y'].dtype == np.float32
+    np.testing.assert_allclose(traza['y'], np.round(y, DECIMALES_FIGURA), rtol=1e-6)
+    # customdata se puede mostrar sin formato: conserva float64
+    assert traza['customdata'].dtype == np.float64
+    np.testing.assert_array_equal(traza['customdata'][:, 0], np.round(y, DECIMALES_FIGURA))
+
+    # La plantilla solo trae los valores por defecto de las trazas usadas
+    plantilla = fig.layout.template.to_plotly_json()
+    assert set(plantilla['data']) == {'scatter'}
+    assert 'geo' not in plantilla['layout']
+    antes, despues = TAMANOS['dispersion']
+    assert despues < antes
+
+
+def test_enteros_y_faltantes():
+    fig = px.bar(x=['2G', '3G', '4G', '5G'], y=[1.00004, 2.0, 70000.0, 3.0], text=[0.5, 1.0, 2.0, np.nan])
+    compactar(fig)
+    traza = enviado(fig)[0]
+    # Redondeados a DECIMALES_FIGURA son enteros: se envían como enteros
+    assert traza['y'].dtype == np.int32
+    np.testing.assert_array_equal(traza['y'], [1, 2, 70000, 3])
+    assert traza['x'] == ['2G', '3G', '4G', '5G']
+    # Con faltantes se conservan los flotantes
+    np.testing.assert_array_equal(traza['text'], [0.5, 1.0, 2.0, np.nan])
+
+
+@pytest.mark.parametrize('featureidkey', [None, 'properties.DPTO', 'properties.NOMBRE_DPT'])
+def test_geojson(featureidkey):
+    llave = featureidkey and featureidkey[len('properties.'):]
+    dibujados = GEOJSON['features'][:3]
+    ubicaciones = [f['id'] if llave is None else f['properties'][llave] for f in dibujados]
+    colores = [12.345678, 50.0, 99.99999]
+    argumentos = {} if featureidkey is None else {'featureidkey': featureidkey}
+    fig = px.choropleth(geojson=GEOJSON, locations=ubicaciones, color=colores, **argumentos)
+    compactar(fig, 'mapa')
+    traza = enviado(fig)[0]
+
+    # Solo quedan los features dibujados, con su llave y su geometría
+    features = traza['geojson']['features']
+    assert len(features) == len(dibujados)
+    for feature, original in zip(features, dibujados):
+        assert feature['geometry'] == original['geometry']
+        if llave is None:
+            assert feature['id'] == original['id']
+            assert 'properties' not in feature
+        else:
+            assert feature['properties'] == {llave: original['properties'][llave]}
+    assert list(traza['locations']) == ubicaciones
+    np.testing.assert_allclose(traza['z'], np.round(colores, DECIMALES_FIGURA), rtol=1e-6)
+    antes, despues = TAMANOS['mapa']
+    assert despues < antes
+
+
+def test_sin_figura():
+    assert compactar(None) is None
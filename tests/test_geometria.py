@@ -0,0 +1,85 @@
+"""
+Almacén de geometrías: variantes simplificadas y carga con construcción si falta.
+"""
+
+import json
+
+import pytest
+
+from dashboard_code import geometria
+from dashboard_code.geometria import ErrorGeometria, VARIANTES, cargar, construir, ruta_variante
+
+
+def cuadrado(x, y, lado, puntos=50):
+    """Anillo cerrado con `puntos` vértices por lado (casi todos colineales)."""
+    borde = [(x + lado * i / puntos, y) for i in range(puntos)]
+    borde += [(x + lado, y + lado * i / puntos) for i in range(puntos)]
+    borde += [(x + lado - lado * i / puntos, y + lado) for i in range(puntos)]
+    borde += [(x, y + lado - lado * i / puntos) for i in range(puntos)]
+    return [list(p) for p in borde + [borde[0]]]
+
+
+@pytest.fixture
+def origen(tmp_path):
+    ruta = tmp_path / 'colombia.geo.json'
+    ruta.write_text(json.dumps({
+        'type': 'FeatureCollection',
+        'features': [
+            {
+                'type': 'Feature',
+                'properties': {'NOMBRE_DPT': 'ATLANTICO', 'DPTO': '08', 'AREA': 1.0},
+                'geometry': {'type': 'Polygon', 'coordinates': [cuadrado(-75.0, 10.5, 0.5)]},
+            },
+            {
+                'type': 'Feature',
+                'properties': {'NOMBRE_DPT': 'SANTAFE DE BOGOTA D.C', 'DPTO': '11', 'AREA': 2.0},
+                'geometry': {'type': 'MultiPolygon', 'coordinates': [[cuadrado(-74.2, 4.5, 0.3)]]},
+            },
+        ],
+    }), encoding='utf-8')
+    return ruta
+
+
+@pytest.fixture(autouse=True)
+def sin_cache():
+    geometria._leer_variante.cache_clear()
+    yield
+    geometria._leer_variante.cache_clear()
+
+
+def test_construir(origen, tmp_path):
+    rutas = construir(origen, tmp_path / 'almacen')
+    assert set(rutas) == set(VARIANTES)
+    for variante, ruta in rutas.items():
+        geojson = json.loads(ruta.read_text(encoding='utf-8'))
+        assert [f['id'] for f in geojson['features']] == ['ATLÁNTICO', 'BOGOTÁ. D.C.']
+        assert geojson['features'][0]['properties'] == {'NOMBRE_DPT': 'ATLÁNTICO', 'DPTO': '08'}
+    # Los lados colineales se reducen a las esquinas
+    assert geometria.contar_puntos(json.loads(rutas['media'].read_text())) == 10
+    assert geometria.contar_puntos(json.loads(rutas['original'].read_text())) == 402
+
+
+def test_cargar_construye_si_falta(origen, tmp_path, monkeypatch):
+    monkeypatch.setattr(geometria, 'url_geojson', str(origen))
+    directorio = tmp_path / 'almacen'
+    geojson = cargar('baja', directorio)
+    assert ruta_variante('media', directorio).exists()
+    assert geojson.huella['ruta'] == str(ruta_variante('baja', directorio))
+    # Se lee una sola vez por proceso
+    assert cargar('baja', directorio) is geojson
+
+
+def test_fallo_no_se_recuerda(origen, tmp_path, monkeypatch):
+    monkeypatch.setattr(geometria, 'url_geojson', str(tmp_path / 'no_existe.geo.json'))
+    directorio = tmp_path / 'almacen'
+    with pytest.raises(ErrorGeometria):
+        cargar('media', directorio)
+
+    # Con el origen disponible la siguiente llamada construye y carga
+    monkeypatch.setattr(geometria, 'url_geojson', str(origen))
+    assert len(cargar('media', directorio)['features']) == 2
+
+
+def test_variante_desconocida(tmp_path):
+    with pytest.raises(ErrorGeometria):
+        cargar('ultra', tmp_path)
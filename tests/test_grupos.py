@@ -0,0 +1,99 @@
+"""
+Los kernels por grupo dan lo mismo que groupby de pandas, con empates,
+faltantes y columnas categóricas.
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from dashboard_code.grupos import argmax_grupo, argmin_grupo, codigos_grupo, moda_serie
+
+OPERADORES = ['CLARO', 'MOVISTAR', 'TIGO', 'WOM']
+
+
+@pytest.fixture(params=['enteras', 'texto', 'categoricas'])
+def df(request):
+    generador = np.random.default_rng(7)
+    n = 4000
+    df = pd.DataFrame({
+        'DEPTO': generador.choice([91, 5, 76, 8, 11], n),
+        'MUNICIPIO': generador.integers(0, 40, n),
+        # Valores con muchos empates y faltantes
+        'AREA': generador.integers(0, 5, n).astype(np.float64),
+        'OPERADOR': generador.choice(OPERADORES, n),
+    })
+    df.loc[generador.random(n) < 0.1, 'AREA'] = np.nan
+    if request.param == 'texto':
+        df['DEPTO'] = 'D' + df['DEPTO'].astype(str)
+    elif request.param == 'categoricas':
+        # Categorías fuera de orden y sin usar, como deja el modo compacto
+        df['DEPTO'] = pd.Categorical(df['DEPTO'], categories=[76, 5, 99, 91, 11, 8])
+        df['OPERADOR'] = pd.Categorical(df['OPERADOR'], categories=['WOM', 'OTRO', 'TIGO', 'CLARO', 'MOVISTAR'])
+    return df
+
+
+LLAVES = [['DEPTO'], ['MUNICIPIO'], ['DEPTO', 'MUNICIPIO']]
+
+
+@pytest.mark.parametrize('llaves', LLAVES)
+def test_codigos_grupo(df, llaves):
+    codigos, representantes = codigos_grupo(df, llaves)
+    esperado = df.groupby(llaves, observed=True, sort=True).ngroup().to_numpy()
+    np.testing.assert_array_equal(codigos, esperado)
+    np.testing.assert_array_equal(codigos[representantes], np.arange(esperado.max() + 1))
+
+
+@pytest.mark.parametrize('llaves', LLAVES)
+@pytest.mark.parametrize('maximo', [True, False], ids=['argmax', 'argmin'])
+def test_extremo_grupo(df, llaves, maximo):
+    codigos, _ = codigos_grupo(df, llaves)
+    agrupado = df.groupby(llaves, observed=True, sort=True)['AREA']
+    esperado = (agrupado.idxmax() if maximo else agrupado.idxmin()).to_numpy()
+    funcion = argmax_grupo if maximo else argmin_grupo
+    np.testing.assert_array_equal(funcion(codigos, df['AREA'].to_numpy()), esperado)
+
+
+def test_argmax_desempate(df):
+    codigos, _ = codigos_grupo(df, ['DEPTO', 'MUNICIPIO'])
+    desempate = np.random.default_rng(3).integers(0, 3, len(df))
+    # Mayor valor, luego menor desempate y luego la primera posición
+    esperado = (
+        df.assign(GRUPO=codigos, DESEMPATE=desempate)
+        .sort_values(['GRUPO', 'AREA', 'DESEMPATE'], ascending=[True, False, True], kind='stable')
+        .groupby('GRUPO').head(1)
+        .index.to_numpy()
+    )
+    np.testing.assert_array_equal(argmax_grupo(codigos, df['AREA'].to_numpy(), desempate), esperado)
+
+
+def test_grupo_sin_valores():
+    valores = np.array([1.0, np.nan, np.nan])
+    grupos = np.array([0, 1, 1])
+    with pytest.raises(ValueError):
+        pd.Series(valores).groupby(grupos).idxmax()
+    with pytest.raises(ValueError):
+        argmax_grupo(grupos, valores)
+
+
+@pytest.mark.parametrize('llaves', LLAVES)
+def test_moda_serie(df, llaves):
+    codigos, _ = codigos_grupo(df, llaves)
+    obtenido = moda_serie(codigos, df['OPERADOR'])
+    # El código original sobre los valores sin compactar: value_counts() desempata por orden de aparición
+    operador = df['OPERADOR'].astype(str)
+    esperado = operador.groupby([df[llave] for llave in llaves], observed=True, sort=True).agg(
+        lambda x: x.value_counts().idxmax()
+    )
+    assert list(np.asarray(obtenido, dtype=object)) == list(esperado)
+    if isinstance(df['OPERADOR'].dtype, pd.CategoricalDtype):
+        assert obtenido.dtype == df['OPERADOR'].dtype
+
+
+def test_moda_empate_por_aparicion():
+    serie = pd.Series(['TIGO', 'CLARO', 'CLARO', 'TIGO', 'WOM'])
+    grupos = np.zeros(len(serie), dtype=np.int64)
+    assert list(moda_serie(grupos, serie)) == ['TIGO']
+    # Con categorías el empate también lo gana el primero que aparece, no la primera categoría
+    categorica = serie.astype(pd.CategoricalDtype(['CLARO', 'TIGO', 'WOM']))
+    assert list(moda_serie(grupos, categorica)) == ['TIGO']
@@ -0,0 +1,68 @@
+"""
+El índice de bitmaps selecciona las mismas filas que las máscaras de pandas.
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from dashboard_code.compacto import compactar
+from dashboard_code.indice import IndiceBitmap
+from dashboard_code.read_csv import filtrar_datos, grafo
+from dashboard_code.registro import Registro
+from tests.datos import datos_cobertura, filtrar, selecciones
+
+
+@pytest.fixture(scope='module', params=[False, True], ids=['normal', 'compacto'])
+def df(request):
+    df = datos_cobertura()
+    return compactar(df) if request.param else df
+
+
+def filtros_indice(anno, trimestre, departamentos, tecnologias):
+    return {
+        'ANNO': None if anno is None else [anno],
+        'TRIMESTRE': None if trimestre is None else [trimestre],
+        'DEPARTAMENTO': departamentos or None,
+        'TECNOLOGIA': tecnologias or None,
+    }
+
+
+@pytest.mark.parametrize('seleccion', selecciones())
+def test_seleccion(df, seleccion):
+    indice = IndiceBitmap(df)
+    bitmap = indice.seleccion(filtros_indice(*seleccion))
+    esperado = filtrar(df, *seleccion)
+    np.testing.assert_array_equal(indice.posiciones(bitmap), df.index.get_indexer(esperado.index))
+    pd.testing.assert_frame_equal(indice.aplicar(df, bitmap), df.loc[esperado.index])
+
+
+def test_seleccion_inicial(df):
+    # AND de una selección ya resuelta con otro filtro
+    indice = IndiceBitmap(df)
+    base = indice.seleccion({'ANNO': ['2024'], 'DEPARTAMENTO': ['ANTIOQUIA', 'ATLÁNTICO']})
+    seleccion = indice.seleccion({'TECNOLOGIA': ['4G', '5G']}, inicial=base)
+    esperado = filtrar(df, '2024', None, ['ANTIOQUIA', 'ATLÁNTICO'], ['4G', '5G'])
+    np.testing.assert_array_equal(indice.posiciones(seleccion), df.index.get_indexer(esperado.index))
+
+
+def test_sin_filtros_no_copia(df):
+    indice = IndiceBitmap(df)
+    todos = indice.seleccion(filtros_indice(None, None, None, None))
+    assert indice.completo(todos)
+    assert indice.aplicar(df, todos) is df
+    assert len(indice.aplicar(df, todos, limite=10)) == 10
+
+
+def test_valores_desconocidos(df):
+    indice = IndiceBitmap(df)
+    assert len(indice.posiciones(indice.seleccion({'DEPARTAMENTO': ['NO EXISTE']}))) == 0
+    assert indice.valores('TRIMESTRE') == sorted(df['TRIMESTRE'].unique())
+
+
+@pytest.mark.parametrize('seleccion', selecciones())
+def test_filtrar_datos(df, seleccion):
+    datos = Registro(grafo, parametros={'ruta_csv': 'sin_fuente.csv', 'df': df})
+    esperado = filtrar(df, *seleccion)
+    pd.testing.assert_frame_equal(filtrar_datos(datos, *seleccion), df.loc[esperado.index])
+    pd.testing.assert_frame_equal(filtrar_datos(datos, *seleccion, limite=5), df.loc[esperado.index[:5]])
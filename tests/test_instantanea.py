@@ -0,0 +1,114 @@
+"""
+Instantánea compartida: se publica una vez, se mapea en cada proceso y solo
+guarda los DataFrames que los nodos pedidos necesitan.
+"""
+
+import json
+
+import pandas as pd
+import pytest
+
+from dashboard_code import read_csv
+from dashboard_code.instantanea import MANIFIESTO, _uso, soltar_instantanea
+from dashboard_code.read_csv import crear_registro, registro_desde_instantanea
+from tests.datos import datos_cobertura, escribir_csv
+
+# Nodos como los del dashboard: DataFrames finales y estructuras que se calculan de los hechos
+NODOS = ['df_final_sorted', 'df_top', 'conteo_operador', 'dimensiones', 'cubo', 'distintos']
+INTERMEDIOS = ['df', 'estrella', 'agregado_base', 'resumen_por_cpob', 'actual_por_cpob', 'max_tecnologia_por_cpob']
+
+
+@pytest.fixture
+def fuente(tmp_path, monkeypatch):
+    monkeypatch.setattr(read_csv, 'USAR_CACHE', False)
+    monkeypatch.setattr(read_csv, 'DIR_INSTANTANEA', tmp_path / 'instantaneas')
+    return escribir_csv(datos_cobertura(), tmp_path / 'datos.csv')
+
+
+@pytest.fixture
+def construcciones(monkeypatch):
+    """Nodos pedidos en cada construcción de una instantánea."""
+    llamadas = []
+    construir = read_csv.construir_instantanea
+
+    def construir_y_anotar(ruta_csv, nombres, *args, **kwargs):
+        llamadas.append(list(nombres))
+        return construir(ruta_csv, nombres, *args, **kwargs)
+
+    monkeypatch.setattr(read_csv, 'construir_instantanea', construir_y_anotar)
+    return llamadas
+
+
+def manifiesto(carpeta):
+    return json.loads((carpeta / MANIFIESTO).read_text(encoding='utf-8'))
+
+
+def test_sin_intermedios(fuente, construcciones):
+    datos, carpeta = registro_desde_instantanea({'ruta_csv': fuente}, NODOS, trabajadores=1)
+    try:
+        publicados = set(manifiesto(carpeta))
+        assert {'df_final_sorted', 'df_top', 'conteo_operador', 'hechos', 'dim_periodo'} <= publicados
+        assert publicados.isdisjoint(INTERMEDIOS + ['dimensiones', 'cubo', 'distintos'])
+
+        esperado = crear_registro(fuente)
+        for nombre in ['df_final_sorted', 'df_top']:
+            pd.testing.assert_frame_equal(datos.obtener(nombre), esperado.obtener(nombre))
+        pd.testing.assert_series_equal(datos.obtener('conteo_operador'), esperado.obtener('conteo_operador'))
+        # El cubo se calcula de los hechos y las dimensiones mapeados, sin leer la fuente
+        seleccion = ('2024', None, ['ANTIOQUIA', 'CUNDINAMARCA'], ['4G', '5G'])
+        cubo, referencia = datos.obtener('cubo'), esperado.obtener('cubo')
+        por = ['ID_DEPARTAMENTO', 'ID_TECNOLOGIA']
+        pd.testing.assert_frame_equal(
+            cubo.consultar(por, cubo.filtros_sidebar(*seleccion)),
+            referencia.consultar(por, referencia.filtros_sidebar(*seleccion))
+        )
+        assert 'df' not in datos.materializados()
+        assert construcciones == [NODOS]
+    finally:
+        soltar_instantanea(carpeta)
+
+
+def test_con_df(fuente):
+    # Si se pide el DataFrame base (tabla filtrada) los hechos se toman de él sin publicarlos
+    nombres = ['df', 'indice', 'cubo']
+    datos, carpeta = registro_desde_instantanea({'ruta_csv': fuente}, nombres, trabajadores=1)
+    try:
+        publicados = set(manifiesto(carpeta))
+        assert 'df' in publicados
+        assert 'hechos' not in publicados
+        pd.testing.assert_frame_equal(datos.obtener('df'), crear_registro(fuente).obtener('df'))
+        datos.materializar(nombres, trabajadores=1)
+        assert datos.obtener('cubo').totales()['FILAS'] == len(datos.obtener('df'))
+    finally:
+        soltar_instantanea(carpeta)
+
+
+def test_reutiliza_y_borra(fuente, construcciones):
+    primero, carpeta = registro_desde_instantanea({'ruta_csv': fuente}, NODOS, trabajadores=1)
+    segundo, misma = registro_desde_instantanea({'ruta_csv': fuente}, NODOS, trabajadores=1)
+    # La segunda apertura mapea la instantánea publicada por la primera
+    assert misma == carpeta
+    assert len(construcciones) == 1
+    pd.testing.assert_frame_equal(primero.obtener('df_top'), segundo.obtener('df_top'))
+
+    # Se borra cuando la suelta el último que la usa
+    assert not soltar_instantanea(carpeta)
+    assert (carpeta / MANIFIESTO).exists()
+    assert soltar_instantanea(carpeta)
+    assert not carpeta.exists()
+    assert not _uso(carpeta).exists()
+
+
+def test_fuente_cambiada(fuente, construcciones):
+    _, carpeta = registro_desde_instantanea({'ruta_csv': fuente}, NODOS, trabajadores=1)
+    escribir_csv(datos_cobertura(semilla=1), fuente)
+    datos, nueva = registro_desde_instantanea({'ruta_csv': fuente}, NODOS, trabajadores=1)
+    try:
+        assert nueva != carpeta
+        assert len(construcciones) == 2
+        pd.testing.assert_frame_equal(
+            datos.obtener('df_final_sorted'), crear_registro(fuente).obtener('df_final_sorted')
+        )
+    finally:
+        soltar_instantanea(carpeta)
+        soltar_instantanea(nueva)
@@ -0,0 +1,122 @@
+"""
+Paridad del motor DuckDB con pandas.
+
+Cada consulta del motor se compara con la misma agregación hecha con pandas
+sobre las filas del DataFrame de cobertura filtradas directamente por los
+nombres del sidebar (sin pasar por las llaves, el cubo ni los resúmenes).
+"""
+
+import gc
+
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip('duckdb')
+
+from dashboard_code.estrella import Estrella
+from dashboard_code.motor_duckdb import COLUMNAS_CORRELACION, MotorDuckDB
+from dashboard_code.operadores import COLUMNAS_AREA
+from tests.datos import AGRUPACIONES, cuantiles_esperados, datos_cobertura, filtrar, selecciones
+
+
+@pytest.fixture(scope='module')
+def df():
+    return datos_cobertura()
+
+
+@pytest.fixture(scope='module')
+def motor(df, tmp_path_factory):
+    estrella = Estrella(df.copy())
+    ruta = tmp_path_factory.mktemp('duckdb') / 'cobertura.duckdb'
+    return MotorDuckDB(estrella.hechos, Estrella.desde_dimensiones(estrella.dimensiones), ruta)
+
+
+@pytest.mark.parametrize('seleccion', selecciones())
+@pytest.mark.parametrize('por', AGRUPACIONES)
+def test_consultar(df, motor, seleccion, por):
+    filas = filtrar(df, *seleccion)
+    obtenido = motor.consultar(por, motor.filtros_sidebar(*seleccion))
+    if por:
+        esperado = filas.groupby(por).agg(FILAS=('ID_CPOB', 'size'), **{c: (c, 'sum') for c in COLUMNAS_AREA})
+        esperado = esperado.reset_index()
+        assert len(obtenido) == len(esperado)
+        for llave in por:
+            np.testing.assert_array_equal(obtenido[llave].to_numpy(), esperado[llave].to_numpy())
+    else:
+        esperado = pd.DataFrame([{'FILAS': len(filas), **filas[COLUMNAS_AREA].sum()}])
+    np.testing.assert_array_equal(obtenido['FILAS'].to_numpy(), esperado['FILAS'].to_numpy())
+    np.testing.assert_allclose(obtenido[COLUMNAS_AREA].to_numpy(), esperado[COLUMNAS_AREA].to_numpy(), rtol=1e-9)
+
+
+@pytest.mark.parametrize('seleccion', selecciones())
+@pytest.mark.parametrize('por', AGRUPACIONES)
+def test_contar(df, motor, seleccion, por):
+    filas = filtrar(df, *seleccion)
+    obtenido = motor.contar(por, motor.filtros_sidebar(*seleccion))
+    if not por:
+        assert obtenido == filas['ID_CPOB'].nunique()
+        return
+    esperado = filas.groupby(por)['ID_CPOB'].nunique().reset_index()
+    assert len(obtenido) == len(esperado)
+    for llave in por:
+        np.testing.assert_array_equal(obtenido[llave].to_numpy(), esperado[llave].to_numpy())
+    np.testing.assert_array_equal(obtenido['DISTINTOS'].to_numpy(), esperado['ID_CPOB'].to_numpy())
+
+
+@pytest.mark.parametrize('seleccion', selecciones())
+@pytest.mark.parametrize('por', [[], ['ID_DEPARTAMENTO'], ['ID_PERIODO', 'ID_TECNOLOGIA']])
+def test_cuantiles(df, motor, seleccion, por):
+    esperado = cuantiles_esperados(filtrar(df, *seleccion), por)
+    obtenido = motor.cuantiles(por, motor.filtros_sidebar(*seleccion))
+    assert list(obtenido.columns) == list(esperado.columns)
+    assert len(obtenido) == len(esperado)
+    for columna in por + ['OPERADOR', 'N']:
+        np.testing.assert_array_equal(obtenido[columna].to_numpy(), esperado[columna].to_numpy())
+    np.testing.assert_allclose(
+        obtenido[['P10', 'P50', 'P90']].to_numpy(dtype=np.float64),
+        esperado[['P10', 'P50', 'P90']].to_numpy(dtype=np.float64),
+        rtol=1e-9, atol=1e-9
+    )
+
+
+@pytest.mark.parametrize('seleccion', selecciones())
+def test_correlacion(df, motor, seleccion):
+    filas = filtrar(df, *seleccion)
+    esperado = filas[COLUMNAS_CORRELACION].corr()
+    obtenido = motor.correlacion(motor.filtros_sidebar(*seleccion))
+    assert list(obtenido.index) == list(esperado.index)
+    np.testing.assert_allclose(obtenido.to_numpy(), esperado.to_numpy(), rtol=1e-9, atol=1e-9)
+
+
+def test_archivo_por_version(df, tmp_path):
+    import duckdb
+
+    estrella = Estrella(df.copy())
+    dimensiones = Estrella.desde_dimensiones(estrella.dimensiones)
+    ruta = tmp_path / 'cobertura-1.duckdb'
+    motor = MotorDuckDB(estrella.hechos, dimensiones, ruta)
+    escrito = ruta.stat().st_mtime_ns
+
+    # Otro motor de la misma versión abre el archivo ya escrito, sin volver a copiar los hechos
+    otro = MotorDuckDB(estrella.hechos.iloc[:0], dimensiones, ruta)
+    assert ruta.stat().st_mtime_ns == escrito
+    assert otro.totales()['FILAS'] == len(df)
+
+    # Los procesos del dashboard solo leen el archivo de una versión
+    with pytest.raises(duckdb.Error):
+        motor.conexion.execute('DELETE FROM hechos')
+
+    # Una versión nueva usa su propio archivo y no cambia la anterior
+    nuevo = MotorDuckDB(estrella.hechos.iloc[:100], dimensiones, tmp_path / 'cobertura-2.duckdb')
+    assert nuevo.totales()['FILAS'] == 100
+    assert motor.totales()['FILAS'] == len(df)
+
+    # El archivo se borra cuando ningún motor lo usa
+    del motor
+    gc.collect()
+    assert ruta.exists()
+    del otro
+    gc.collect()
+    assert not ruta.exists()
+    assert (tmp_path / 'cobertura-2.duckdb').exists()
@@ -0,0 +1,122 @@
+"""
+Reducción de series: los histogramas del servidor dan las mismas alturas que
+px.histogram y LTTB conserva los extremos de cada serie.
+"""
+
+import numpy as np
+import pandas as pd
+import plotly.express as px
+import pytest
+
+from dashboard_code.muestreo import binear, lttb, reducir_series
+
+HISTNORMS = [None, 'percent', 'probability', 'density', 'probability density']
+
+
+@pytest.fixture(scope='module')
+def datos():
+    generador = np.random.default_rng(0)
+    filas = 5000
+    datos = pd.DataFrame({
+        'OPERADOR': generador.choice(['CLARO', 'MOVISTAR', 'TIGO'], size=filas, p=[0.5, 0.3, 0.2]),
+        'TECNOLOGIA': generador.choice(['2G', '3G', '4G', '5G'], size=filas),
+        'COBERTURA': generador.gamma(2.0, 20.0, size=filas),
+    })
+    datos.loc[generador.random(filas) < 0.05, 'COBERTURA'] = np.nan
+    return datos
+
+
+def alturas_plotly(valores, bordes, histnorm):
+    """Alturas de las barras como las calcula plotly.js para una traza de px.histogram con esas cubetas."""
+    conteos, _ = np.histogram(valores[~np.isnan(valores)], bordes)
+    total, anchos = conteos.sum(), np.diff(bordes)
+    return {
+        None: conteos,
+        'percent': 100 * conteos / total,
+        'probability': conteos / total,
+        'density': conteos / anchos,
+        'probability density': conteos / total / anchos,
+    }[histnorm]
+
+
+@pytest.mark.parametrize('histnorm', HISTNORMS)
+@pytest.mark.parametrize('color', [None, 'OPERADOR'])
+def test_binear_numerico(datos, color, histnorm):
+    barras = binear(datos, 'COBERTURA', color, nbins=30, histnorm=histnorm)
+    altura = histnorm or 'count'
+    bordes = np.append(barras['INICIO'].unique(), barras['FIN'].iloc[-1])
+    # Cada traza de px.histogram (una por color) se normaliza por separado
+    fig = px.histogram(datos, x='COBERTURA', color=color, nbins=30, histnorm=histnorm)
+    assert len(fig.data) == (1 if color is None else datos[color].nunique())
+    for traza in fig.data:
+        assert traza.histnorm == histnorm
+        parte = barras if color is None else barras[barras[color] == traza.name]
+        np.testing.assert_allclose(
+            parte[altura].to_numpy(), alturas_plotly(np.asarray(traza.x, dtype=np.float64), bordes, histnorm)
+        )
+        np.testing.assert_allclose(parte['COBERTURA'], (bordes[:-1] + bordes[1:]) / 2)
+
+    if histnorm == 'probability density':
+        for _, parte in (barras.groupby(color) if color else [(None, barras)]):
+            grupo = datos if color is None else datos[datos[color] == parte[color].iloc[0]]
+            densidad, _ = np.histogram(grupo['COBERTURA'].dropna(), bordes, density=True)
+            np.testing.assert_allclose(parte[altura], densidad)
+
+
+@pytest.mark.parametrize('histnorm', HISTNORMS)
+def test_binear_categorico(datos, histnorm):
+    barras = binear(datos, 'TECNOLOGIA', 'OPERADOR', histnorm=histnorm)
+    altura = histnorm or 'count'
+    assert 'INICIO' not in barras
+    for operador, grupo in datos.groupby('OPERADOR'):
+        conteos = grupo['TECNOLOGIA'].value_counts()
+        esperado = {
+            None: conteos, 'percent': 100 * conteos / conteos.sum(), 'probability': conteos / conteos.sum(),
+            # Sin ancho de cubeta plotly.js usa 1: density es el conteo
+            'density': conteos, 'probability density': conteos / conteos.sum(),
+        }[histnorm]
+        parte = barras[barras['OPERADOR'] == operador].set_index('TECNOLOGIA')[altura]
+        pd.testing.assert_series_equal(
+            parte.sort_index(), esperado.sort_index().astype(parte.dtype), check_names=False, check_index_type=False
+        )
+
+
+def test_lttb():
+    generador = np.random.default_rng(1)
+    x = np.sort(generador.random(2000))
+    y = np.sin(x * 20) + generador.normal(0, 0.1, 2000)
+    indices = lttb(x, y, 100)
+    assert len(indices) == 100
+    assert indices[0] == 0 and indices[-1] == len(x) - 1
+    assert (np.diff(indices) > 0).all()
+    # El pico de la serie cae en alguna cubeta y LTTB lo conserva
+    assert np.argmax(y) in indices
+    # Con menos puntos que el umbral no se descarta ninguno
+    np.testing.assert_array_equal(lttb(x[:50], y[:50], 100), np.arange(50))
+
+
+def test_reducir_series_extremos():
+    generador = np.random.default_rng(2)
+    partes = []
+    for operador, filas in [('CLARO', 3000), ('MOVISTAR', 1500), ('TIGO', 40)]:
+        partes.append(pd.DataFrame({
+            'FECHA': pd.date_range('2020-01-01', periods=filas, freq='h'),
+            'OPERADOR': operador,
+            'VALOR': generador.normal(size=filas).cumsum(),
+        }))
+    datos = pd.concat(partes, ignore_index=True)
+    datos.loc[datos.index[::97], 'VALOR'] = np.nan
+    # Filas desordenadas: LTTB recorre cada serie ordenada por fecha
+    datos = datos.sample(frac=1, random_state=0)
+
+    reducidos = reducir_series(datos, 'FECHA', 'VALOR', 'OPERADOR', puntos_maximos=300)
+    assert len(reducidos) <= 300
+    assert reducidos['VALOR'].notna().all()
+    for operador, serie in datos.dropna(subset=['VALOR']).groupby('OPERADOR'):
+        elegidos = reducidos[reducidos['OPERADOR'] == operador]
+        # Las filas elegidas de cada serie conservan su orden original
+        assert (np.diff(datos.index.get_indexer(elegidos.index)) > 0).all()
+        # Primer y último punto de cada serie (la de 40 puntos cabe entera)
+        assert elegidos['FECHA'].min() == serie['FECHA'].min()
+        assert elegidos['FECHA'].max() == serie['FECHA'].max()
+        assert len(elegidos) == min(len(serie), 100)
@@ -0,0 +1,87 @@
+"""
+Poda de particiones: los filtros de año y trimestre leen solo las particiones elegidas.
+"""
+
+import pandas as pd
+import pytest
+
+from dashboard_code import read_csv
+from dashboard_code.estrella import agregar_id_periodo
+from dashboard_code.particiones import BaseParticionada
+from dashboard_code.read_csv import filtrar_datos, grafo
+from dashboard_code.registro import Registro
+from tests.datos import PERIODOS, datos_cobertura, filtrar, selecciones
+
+
+@pytest.fixture(scope='module')
+def base(tmp_path_factory):
+    base = BaseParticionada(tmp_path_factory.mktemp('base'))
+    df = agregar_id_periodo(datos_cobertura())
+    for _, filas in df.groupby('ID_PERIODO', sort=True):
+        base.agregar_periodo(filas.reset_index(drop=True))
+    return base
+
+
+@pytest.fixture
+def lecturas(monkeypatch):
+    """Rutas de los archivos Parquet leídos durante la prueba."""
+    leidas = []
+    leer = pd.read_parquet
+
+    def leer_y_anotar(ruta, *args, **kwargs):
+        leidas.append(str(ruta))
+        return leer(ruta, *args, **kwargs)
+
+    read_csv.particion_indexada.cache_clear()
+    monkeypatch.setattr(pd, 'read_parquet', leer_y_anotar)
+    yield leidas
+    read_csv.particion_indexada.cache_clear()
+
+
+def test_periodos_para(base):
+    todos = base.periodos()
+    assert len(todos) == len(PERIODOS)
+    assert base.periodos_para() == todos
+    assert base.periodos_para('2024', '4') == [20244]
+    assert base.periodos_para('2023') == [20233, 20234]
+    assert base.periodos_para(trimestre='4') == [20234, 20244]
+    assert base.periodos_para('2022') == []
+
+
+@pytest.mark.parametrize('seleccion', selecciones())
+def test_filtrar_datos(base, lecturas, seleccion):
+    datos = Registro(grafo, parametros={'ruta_csv': base.directorio})
+    esperado = filtrar(base.leer(), *seleccion).reset_index(drop=True)
+    lecturas.clear()
+
+    obtenido = filtrar_datos(datos, *seleccion)
+    pd.testing.assert_frame_equal(obtenido.reset_index(drop=True), esperado, check_dtype=False)
+    # Solo se leen las particiones del año y trimestre elegidos
+    anno, trimestre = seleccion[:2]
+    assert sorted(lecturas) == sorted(str(base.ruta_parte(p)) for p in base.periodos_para(anno, trimestre))
+    # y el DataFrame completo nunca se calcula
+    assert datos.materializados() == []
+
+
+def test_limite(base, lecturas):
+    datos = Registro(grafo, parametros={'ruta_csv': base.directorio})
+    primera = base.leer_periodo(base.periodos()[0])
+    lecturas.clear()
+    obtenido = filtrar_datos(datos, limite=100)
+    pd.testing.assert_frame_equal(obtenido.reset_index(drop=True), primera.head(100))
+    # Con 100 filas de la primera partición basta: las demás no se leen
+    assert lecturas == [str(base.ruta_parte(base.periodos()[0]))]
+
+    # Las particiones ya leídas se recuerdan
+    filtrar_datos(datos, limite=100)
+    assert len(lecturas) == 1
+
+
+def test_sin_periodos(base, lecturas):
+    datos = Registro(grafo, parametros={'ruta_csv': base.directorio})
+    columnas = list(base.leer_periodo(base.periodos()[0]).columns)
+    lecturas.clear()
+    obtenido = filtrar_datos(datos, '2022')
+    assert len(obtenido) == 0
+    assert list(obtenido.columns) == columnas
+    assert lecturas == []
@@ -0,0 +1,157 @@
+"""
+Recarga en caliente: el vigilante recarga cuando la huella de la fuente cambia
+y se estabiliza, y la versión anterior (con su instantánea) se libera cuando
+ya nadie la usa.
+"""
+
+import gc
+import time
+
+import pandas as pd
+import pytest
+
+from dashboard_code import read_csv
+from dashboard_code.instantanea import MANIFIESTO, soltar_instantanea
+from dashboard_code.recarga import Vigilante
+from dashboard_code.read_csv import crear_registro, datos_actuales
+from tests.datos import datos_cobertura, escribir_csv
+
+NODOS = ['df_final_sorted', 'df_top', 'dimensiones', 'cubo']
+
+
+class Fuente:
+    """Huella falsa que la prueba cambia a mano; cuenta las recargas."""
+
+    def __init__(self, fallar=False):
+        self.actual = 'v1'
+        self.recargas = []
+        self.fallar = fallar
+
+    def huella(self):
+        if self.actual is None:
+            raise FileNotFoundError('reemplazándose')
+        return self.actual
+
+    def recargar(self):
+        self.recargas.append(self.actual)
+        if self.fallar:
+            raise ValueError('CSV corrupto')
+
+
+def test_revisar_espera_huella_estable():
+    fuente = Fuente()
+    vigilante = Vigilante(fuente.huella, fuente.recargar, intervalo=1)
+    assert vigilante.revisar() is None
+
+    # El primer cambio queda pendiente; se recarga cuando se repite
+    fuente.actual = 'v2'
+    pendiente = vigilante.revisar()
+    assert pendiente == 'v2'
+    assert fuente.recargas == []
+    # Si sigue cambiando (el archivo se está copiando) se espera de nuevo
+    fuente.actual = 'v3'
+    pendiente = vigilante.revisar(pendiente)
+    assert pendiente == 'v3'
+    assert fuente.recargas == []
+    assert vigilante.revisar(pendiente) is None
+    assert fuente.recargas == ['v3']
+    # Sin cambios no se vuelve a recargar
+    assert vigilante.revisar() is None
+    assert fuente.recargas == ['v3']
+
+
+def test_revisar_errores():
+    fuente = Fuente(fallar=True)
+    vigilante = Vigilante(fuente.huella, fuente.recargar, intervalo=1)
+    # La fuente no existe un momento: no cuenta como cambio
+    fuente.actual = None
+    assert vigilante.revisar() is None
+    # Una recarga fallida no detiene al vigilante ni se repite hasta el siguiente cambio
+    fuente.actual = 'v2'
+    assert vigilante.revisar(vigilante.revisar()) is None
+    assert vigilante.revisar() is None
+    assert fuente.recargas == ['v2']
+    fuente.actual = 'v3'
+    vigilante.revisar(vigilante.revisar())
+    assert fuente.recargas == ['v2', 'v3']
+
+
+def test_hilo():
+    fuente = Fuente()
+    vigilante = Vigilante(fuente.huella, fuente.recargar, intervalo=0.01)
+    vigilante.start()
+    try:
+        fuente.actual = 'v2'
+        esperar(lambda: fuente.recargas == ['v2'])
+    finally:
+        vigilante.detener()
+        vigilante.join(timeout=5)
+    assert not vigilante.is_alive()
+
+
+def esperar(condicion, segundos=30):
+    limite = time.monotonic() + segundos
+    while not condicion():
+        assert time.monotonic() < limite, 'tiempo de espera agotado'
+        time.sleep(0.01)
+
+
+@pytest.fixture
+def fuente_csv(tmp_path, monkeypatch):
+    """CSV de prueba como fuente de `read_csv.registro`, con instantánea en tmp_path."""
+    ruta = escribir_csv(datos_cobertura(), tmp_path / 'datos.csv')
+    monkeypatch.setattr(read_csv, 'USAR_CACHE', False)
+    monkeypatch.setattr(read_csv, 'RECARGA_SEGUNDOS', 0)
+    monkeypatch.setattr(read_csv, 'DIR_INSTANTANEA', tmp_path / 'instantaneas')
+    monkeypatch.setattr(read_csv, 'registro', crear_registro(ruta))
+    monkeypatch.setattr(read_csv, 'instantanea_actual', None)
+    monkeypatch.setattr(read_csv, 'nodos_precalculados', None)
+    monkeypatch.setattr(read_csv, 'vigilante', None)
+    monkeypatch.setattr(read_csv, 'version_datos', 1)
+    read_csv.precalcular(NODOS, trabajadores=1)
+    yield ruta
+    if read_csv.vigilante is not None:
+        read_csv.vigilante.detener()
+        read_csv.vigilante.join(timeout=5)
+    soltar_instantanea(read_csv.instantanea_actual)
+
+
+def test_recargar_libera_version_anterior(fuente_csv):
+    anterior = datos_actuales()
+    carpeta_anterior = read_csv.instantanea_actual
+    assert (carpeta_anterior / MANIFIESTO).exists()
+
+    escribir_csv(datos_cobertura(semilla=1), fuente_csv)
+    read_csv.recargar(trabajadores=1)
+    nuevo = datos_actuales()
+    assert nuevo is not anterior
+    assert nuevo.version == read_csv.version_datos == 2
+    assert read_csv.instantanea_actual != carpeta_anterior
+    pd.testing.assert_frame_equal(
+        nuevo.obtener('df_final_sorted'), crear_registro(fuente_csv).obtener('df_final_sorted')
+    )
+
+    # Una ejecución que aún usa la versión anterior la mantiene viva
+    assert carpeta_anterior.exists()
+    anterior.obtener('df_top')
+    del anterior
+    gc.collect()
+    assert not carpeta_anterior.exists()
+    assert (read_csv.instantanea_actual / MANIFIESTO).exists()
+
+
+def test_recarga_en_caliente(fuente_csv):
+    anterior = datos_actuales()
+    carpeta_anterior = read_csv.instantanea_actual
+    read_csv.iniciar_recarga(intervalo=0.02)
+    assert read_csv.vigilante.is_alive()
+
+    escribir_csv(datos_cobertura(filas=2000, semilla=2), fuente_csv)
+    esperar(lambda: datos_actuales() is not anterior)
+    assert read_csv.version_datos == 2
+    pd.testing.assert_frame_equal(
+        datos_actuales().obtener('df_top'), crear_registro(fuente_csv).obtener('df_top')
+    )
+    # El hilo suelta su referencia a la versión anterior al terminar de publicar
+    del anterior
+    esperar(lambda: gc.collect() is not None and not carpeta_anterior.exists())
@@ -0,0 +1,80 @@
+"""
+Registro perezoso de los DataFrames del dashboard.
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from dashboard_code import read_csv
+from dashboard_code.estrella import agregar_id_periodo
+from dashboard_code.read_csv import grafo, nodos_por_defecto
+from dashboard_code.registro import Registro
+from tests.datos import datos_cobertura
+
+
+def test_nodos_por_defecto(monkeypatch):
+    # Sin COBERTURA_MOTOR=duckdb el motor DuckDB no se calcula (duckdb es opcional)
+    monkeypatch.setattr(read_csv, 'MOTOR', 'pandas')
+    assert 'motor_duckdb' not in nodos_por_defecto()
+    assert set(nodos_por_defecto()) == set(grafo.nodos) - {'motor_duckdb'}
+
+    monkeypatch.setattr(read_csv, 'MOTOR', 'duckdb')
+    assert nodos_por_defecto() == list(grafo.nodos)
+
+
+def iguales(a, b, nombre):
+    """Compara dos valores de un nodo: DataFrames, arrays y los atributos de las estructuras de consulta."""
+    if isinstance(a, pd.DataFrame):
+        pd.testing.assert_frame_equal(a, b, obj=nombre)
+    elif isinstance(a, pd.Series):
+        pd.testing.assert_series_equal(a, b, obj=nombre)
+    elif isinstance(a, pd.Index):
+        pd.testing.assert_index_equal(a, b, obj=nombre)
+    elif isinstance(a, np.ndarray):
+        np.testing.assert_array_equal(a, b, err_msg=nombre)
+    elif isinstance(a, dict):
+        assert set(a) == set(b), nombre
+        for llave in a:
+            iguales(a[llave], b[llave], f'{nombre}[{llave!r}]')
+    elif isinstance(a, (list, tuple)):
+        assert len(a) == len(b), nombre
+        for i, (x, y) in enumerate(zip(a, b)):
+            iguales(x, y, f'{nombre}[{i}]')
+    elif hasattr(a, '__dict__'):
+        assert type(a) is type(b), nombre
+        iguales(vars(a), vars(b), nombre)
+    else:
+        assert a == b or (a != a and b != b), nombre
+
+
+def registro_de_prueba():
+    df = agregar_id_periodo(datos_cobertura())
+    return Registro(grafo, parametros={'ruta_csv': 'sin_fuente.csv', 'df': df})
+
+
+@pytest.mark.parametrize('trabajadores', [2, 4])
+def test_paralelo_igual_a_serie(trabajadores):
+    nombres = nodos_por_defecto()
+    serie = registro_de_prueba()
+    serie.materializar(nombres)
+    paralelo = registro_de_prueba()
+    paralelo.materializar(nombres, trabajadores=trabajadores)
+
+    assert set(paralelo.materializados()) == set(serie.materializados())
+    for nombre in serie.materializados():
+        iguales(paralelo.obtener(nombre), serie.obtener(nombre), nombre)
+
+
+def test_paralelo_con_nodos_calculados():
+    # Los nodos ya calculados son hojas: sus dependencias liberadas no se recalculan
+    datos = registro_de_prueba()
+    datos.materializar(['df_max_tecnologia'])
+    datos.liberar(['df_max_tecnologia'])
+    datos.materializar(['df_max_tecnologia', 'df_departamento', 'df_temp'], trabajadores=3)
+    assert 'max_tecnologia_por_cpob' in datos.materializados()
+    assert 'df_max_tecnologia' in datos.materializados()
+
+    serie = registro_de_prueba()
+    for nombre in ('df_max_tecnologia', 'df_departamento', 'df_temp'):
+        iguales(datos.obtener(nombre), serie.obtener(nombre), nombre)
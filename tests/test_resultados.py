@@ -0,0 +1,113 @@
+"""
+Caché de resultados compartida entre sesiones: LRU acotada por bytes que se
+vacía cuando llega una versión nueva de los datos, y claves de las figuras
+que no dependen del orden en que se eligieron los filtros.
+"""
+
+import numpy as np
+import pandas as pd
+
+from dashboard_code.resultados import CacheResultados, ClaveResultado, clave_figura, clave_resultado
+
+
+def cache(max_bytes):
+    """Caché que mide cada resultado por su valor (un entero = sus bytes)."""
+    return CacheResultados(max_bytes, medir=lambda valor: valor)
+
+
+def calculos(cache, clave, valor):
+    """Guarda o lee `valor` bajo `clave`; retorna cuántas veces se calculó (0 o 1)."""
+    llamadas = []
+    cache.obtener_o_calcular(clave, lambda: llamadas.append(clave) or valor)
+    return len(llamadas)
+
+
+def test_expulsion_lru_por_bytes():
+    resultados = cache(100)
+    claves = [clave_resultado(1, grafico) for grafico in 'abcd']
+    for clave in claves[:3]:
+        assert calculos(resultados, clave, 40) == 1
+    # Con 'c' se pasó de 100 bytes: se expulsó el usado hace más tiempo ('a')
+    assert resultados.bytes == 80
+    assert calculos(resultados, claves[1], 40) == 0
+    assert calculos(resultados, claves[0], 40) == 1
+    # 'b' se leyó después de 'c': ahora el más antiguo es 'c'
+    assert calculos(resultados, claves[1], 40) == 0
+    assert calculos(resultados, claves[2], 40) == 1
+    assert resultados.estadisticas()['ENTRADAS'] == 2
+
+    # Un resultado más grande que el máximo no se guarda ni expulsa a los demás
+    assert calculos(resultados, claves[3], 101) == 1
+    assert calculos(resultados, claves[3], 101) == 1
+    assert resultados.bytes == 80
+    # Los resultados de varios tamaños expulsan lo necesario para caber
+    assert calculos(resultados, claves[3], 90) == 1
+    assert resultados.bytes == 90
+    assert resultados.estadisticas()['ENTRADAS'] == 1
+
+
+def test_version_nueva_vacia():
+    resultados = cache(100)
+    assert calculos(resultados, clave_resultado(1, 'a'), 10) == 1
+    assert calculos(resultados, clave_resultado(1, 'b'), 10) == 1
+    assert calculos(resultados, clave_resultado(2, 'a'), 10) == 1
+    estadisticas = resultados.estadisticas()
+    assert (estadisticas['VERSION'], estadisticas['ENTRADAS'], estadisticas['BYTES']) == (2, 1, 10)
+    assert calculos(resultados, clave_resultado(1, 'b'), 10) == 1
+    # Una ejecución que sigue con la versión anterior calcula pero no guarda
+    assert calculos(resultados, clave_resultado(1, 'b'), 10) == 1
+    assert resultados.estadisticas()['VERSION'] == 2
+    assert calculos(resultados, clave_resultado(2, 'a'), 10) == 0
+
+    # Las claves sin versión se guardan con la versión vigente y se vacían con ella
+    sin_version = ClaveResultado(None, 'figura', ())
+    assert calculos(resultados, sin_version, 10) == 1
+    assert calculos(resultados, sin_version, 10) == 0
+    assert calculos(resultados, clave_resultado(3, 'a'), 10) == 1
+    assert calculos(resultados, sin_version, 10) == 1
+
+
+def test_sin_cache_y_none():
+    desactivada = cache(0)
+    assert calculos(desactivada, clave_resultado(1, 'a'), 10) == 1
+    assert calculos(desactivada, clave_resultado(1, 'a'), 10) == 1
+    assert desactivada.bytes == 0
+
+    resultados = CacheResultados(1 << 20)
+    assert resultados.obtener_o_calcular(clave_resultado(1, 'a'), lambda: None) is None
+    assert resultados.estadisticas()['ENTRADAS'] == 0
+    # Con la medida por defecto un DataFrame cuenta sus bytes en memoria
+    df = pd.DataFrame({'x': range(1000)})
+    assert resultados.obtener_o_calcular(clave_resultado(1, 'b'), lambda: df) is df
+    assert resultados.bytes >= df['x'].nbytes
+    estadisticas = resultados.estadisticas()
+    assert (estadisticas['ACIERTOS'], estadisticas['FALLOS']) == (0, 2)
+
+
+def test_clave_figura_orden_de_filtros():
+    # Los mismos filtros elegidos en otro orden (y con otros tipos de colección) dan la misma clave
+    filtros = {'ID_DEPARTAMENTO': np.array([5, 8, 11]), 'ID_TECNOLOGIA': [2, 3]}
+    reordenados = {'ID_TECNOLOGIA': pd.Index([3, 2]), 'ID_DEPARTAMENTO': [np.int64(11), 5, 8]}
+    clave = clave_resultado(1, 'grafico', filtros, ['2024'])
+    assert clave == clave_resultado(1, 'grafico', reordenados, ('2024',))
+    assert clave != clave_resultado(1, 'grafico', dict(filtros, ID_TECNOLOGIA=[2]), ['2024'])
+
+    argumentos = {'x': 'TECNOLOGIA', 'color': 'OPERADOR', 'labels': {'x': 'Tecnología', 'y': 'Cantidad'}}
+    mismos = {'labels': {'y': 'Cantidad', 'x': 'Tecnología'}, 'color': 'OPERADOR', 'x': 'TECNOLOGIA'}
+    reordenada = clave_resultado(1, 'grafico', reordenados, ['2024'])
+    assert clave_figura('bar', None, argumentos, clave) == clave_figura('bar', None, mismos, reordenada)
+    assert clave_figura('bar', None, argumentos, clave) != clave_figura('pie', None, argumentos, clave)
+    # En los argumentos el orden de las listas sí importa (category_orders, escalas de colores)
+    ordenes = dict(argumentos, category_orders={'TECNOLOGIA': ['2G', '3G', '4G']})
+    invertidos = dict(argumentos, category_orders={'TECNOLOGIA': ['4G', '3G', '2G']})
+    assert clave_figura('bar', None, ordenes, clave) != clave_figura('bar', None, invertidos, clave)
+
+
+def test_clave_figura_por_datos():
+    datos = pd.DataFrame({'TECNOLOGIA': ['4G', '5G'], 'CANTIDAD': [3, 4]})
+    argumentos = {'x': 'TECNOLOGIA', 'y': 'CANTIDAD'}
+    clave = clave_figura('bar', datos, argumentos)
+    assert clave.version is None
+    assert clave == clave_figura('bar', datos.copy(), dict(reversed(argumentos.items())))
+    assert clave != clave_figura('bar', datos.assign(CANTIDAD=[3, 5]), argumentos)
+    assert clave != clave_figura('bar', datos.astype({'CANTIDAD': 'float64'}), argumentos)
@@ -0,0 +1,53 @@
+"""
+La lectura por bloques produce los mismos DataFrames que la carga completa.
+"""
+
+import pandas as pd
+import pytest
+
+from dashboard_code import read_csv
+from dashboard_code.streaming import Comomentos, procesar_por_bloques
+from tests.datos import datos_cobertura, escribir_csv
+
+
+@pytest.fixture(scope='module')
+def ruta_csv(tmp_path_factory):
+    return escribir_csv(datos_cobertura(), tmp_path_factory.mktemp('csv') / 'cobertura.csv')
+
+
+@pytest.fixture(scope='module')
+def completo(ruta_csv):
+    usar_cache = read_csv.USAR_CACHE
+    read_csv.USAR_CACHE = False
+    try:
+        return read_csv.crear_registro(ruta_csv)
+    finally:
+        read_csv.USAR_CACHE = usar_cache
+
+
+@pytest.mark.parametrize('filas_por_bloque', [250, 1000, 10000])
+def test_igual_a_carga_completa(ruta_csv, completo, filas_por_bloque):
+    resultados = procesar_por_bloques(ruta_csv, filas_por_bloque)
+    for nombre, frame in resultados.items():
+        pd.testing.assert_frame_equal(
+            frame.reset_index(drop=True), completo.obtener(nombre).reset_index(drop=True),
+            check_dtype=False, obj=nombre
+        )
+
+
+def test_correlacion_con_faltantes():
+    # Faltantes en columnas distintas: cada par usa sus propias filas completas
+    df = datos_cobertura(filas=2000, semilla=5)
+    df.loc[df.index[::3], 'AREA_CPOB'] = float('nan')
+    comomentos = Comomentos(read_csv.cols_num)
+    for inicio in range(0, len(df), 300):
+        comomentos.agregar(df.iloc[inicio:inicio + 300])
+    pd.testing.assert_frame_equal(comomentos.correlacion(), df[read_csv.cols_num].corr())
+
+
+def test_par_sin_filas():
+    df = pd.DataFrame({'A': [1.0, 2.0, None, None], 'B': [None, None, 3.0, 5.0]})
+    comomentos = Comomentos(['A', 'B'])
+    comomentos.agregar(df.iloc[:2])
+    comomentos.agregar(df.iloc[2:])
+    pd.testing.assert_frame_equal(comomentos.correlacion(), df.corr())